@@ -0,0 +1,475 @@
+"""
+Benchmark suite of the microgrid simulation, using the pymgrid config datasets.
+
+Measures step throughput (single and batched), full-year episode wall time,
+environment construction time, peak memory, optimal dispatch time, MPC
+decision latency, synthetic data generation time, reset latency with
+stochastic scenarios, full-year episodes at several resolutions, steps of
+20 years horizons and steps with battery degradation, and writes the results as
+JSON so that they can be compared across commits:
+
+    python benchmarks/run_benchmarks.py --output results.json
+"""
+import argparse
+import copy
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from easygrid.batch import BatchMicrogrid
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.data.synthetic import generate_pv, generate_timeseries
+from easygrid.env import GridEnv, VectorGridEnv
+from easygrid.microgrid import Microgrid
+from easygrid.solver import MPCController, solve_dispatch
+from easygrid.types import DegradationConfig, ScenarioConfig
+
+N_GRIDS = 256
+
+
+def best_time(func: Callable[[], None], repeat: int) -> float:
+    """
+    Args:
+        func (Callable[[], None]): The function to time
+        repeat (int): The number of repetitions
+
+    Returns:
+        float: The best wall time (s) over the repetitions
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def random_actions(n_steps: int, n_grids: Optional[int] = None) -> np.ndarray:
+    """
+    Args:
+        n_steps (int): The number of steps
+        n_grids (Optional[int], optional): The number of grids. Defaults to None.
+
+    Returns:
+        np.ndarray: Seeded random actions in [-1, 1]
+    """
+    shape = (n_steps, 2) if n_grids is None else (n_steps, n_grids, 2)
+    return np.random.default_rng(0).uniform(-1, 1, size=shape)
+
+
+def bench_microgrid_step(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Steps per second of Microgrid.run_timestep, with and without logging
+    """
+    results = {}
+    actions = random_actions(n_steps)
+    for logging in (True, False):
+        microgrid = Microgrid(mg_config)
+
+        def run(microgrid=microgrid, logging=logging):
+            microgrid.reset(reset_logs=True)
+            for action in actions:
+                microgrid.run_timestep(action, logging=logging)
+
+        name = "steps_per_s" if logging else "steps_per_s_no_logging"
+        results[name] = n_steps / best_time(run, repeat)
+    microgrid = Microgrid(mg_config)
+    results["obs_per_s"] = n_steps / best_time(
+        lambda: [microgrid.obs for _ in range(n_steps)], repeat
+    )
+    return results
+
+
+def bench_env_step(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Steps per second of GridEnv.step
+    """
+    env = GridEnv(mg_config)
+    actions = random_actions(n_steps)
+
+    def run():
+        env.reset()
+        for action in actions:
+            env.step(action)
+
+    return {"steps_per_s": n_steps / best_time(run, repeat)}
+
+
+def bench_batch_step(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Grid-steps per second of BatchMicrogrid.run_timestep and VectorGridEnv.step
+    """
+    results = {"n_grids": N_GRIDS}
+    actions = random_actions(n_steps, N_GRIDS)
+    batch = BatchMicrogrid(mg_config, n_grids=N_GRIDS)
+
+    def run_batch():
+        batch.reset()
+        for action in actions:
+            batch.run_timestep(action)
+
+    results["grid_steps_per_s"] = N_GRIDS * n_steps / best_time(run_batch, repeat)
+    env = VectorGridEnv(mg_config, num_envs=N_GRIDS)
+
+    def run_env():
+        env.reset()
+        for action in actions:
+            env.step(action)
+
+    results["env_steps_per_s"] = N_GRIDS * n_steps / best_time(run_env, repeat)
+    env.close()
+    return results
+
+
+def bench_episode(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Wall time of a full episode, stepped with and without logging, and \
+        evaluated at once
+    """
+    results = {}
+    microgrid = Microgrid(mg_config)
+    n_steps = microgrid.MAX_TIMESTEP - 2
+    actions = random_actions(n_steps)
+    for logging in (True, False):
+
+        def run(logging=logging):
+            microgrid.reset(reset_logs=True)
+            for action in actions:
+                microgrid.run_timestep(action, logging=logging)
+
+        name = "episode_s" if logging else "episode_s_no_logging"
+        results[name] = best_time(run, repeat)
+
+    def evaluate():
+        microgrid.reset(reset_logs=True)
+        microgrid.evaluate_actions(actions)
+
+    results["evaluate_actions_s"] = best_time(evaluate, repeat)
+    return results
+
+
+def bench_construction(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Construction time of the environments, and config read time
+    """
+    microgrid = Microgrid(mg_config)
+    return {
+        "microgrid_s": best_time(lambda: Microgrid(mg_config), repeat),
+        "env_s": best_time(lambda: GridEnv(mg_config), repeat),
+        "config_read_us": best_time(
+            lambda: [microgrid.config for _ in range(n_steps)], repeat
+        )
+        / n_steps
+        * 1e6,
+    }
+
+
+def bench_components(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Per-instance memory of the components (timeseries excluded, as they are \
+        shared between copies) and Battery.charge_discharge calls per second
+    """
+    microgrid = Microgrid(mg_config)
+    components = [microgrid.battery, microgrid.grid, microgrid.pv, microgrid.load]
+    n_copies = 1000
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    copies = [
+        [copy.copy(component) for component in components] for _ in range(n_copies)
+    ]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del copies
+    battery = microgrid.battery
+    energies = random_actions(n_steps)[:, 0] * battery.max_output
+
+    def run():
+        battery.reset()
+        for energy in energies.tolist():
+            battery.charge_discharge(energy)
+
+    return {
+        "bytes_per_microgrid_components": size / n_copies,
+        "charge_discharge_per_s": n_steps / best_time(run, repeat),
+    }
+
+
+def bench_memory(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Peak memory (traced python allocations) of the construction of an \
+        environment and of a full logged episode
+    """
+    # pylint: disable=unused-argument
+    tracemalloc.start()
+    microgrid = Microgrid(mg_config)
+    construction_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    for action in random_actions(microgrid.MAX_TIMESTEP - 2):
+        microgrid.run_timestep(action)
+    episode_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "construction_peak_mb": construction_peak / 2**20,
+        "episode_peak_mb": episode_peak / 2**20,
+    }
+
+
+def bench_dispatch(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Wall time of the full-year optimal dispatch, and decision latency of the \
+        MPC controller (horizon 48)
+    """
+    microgrid = Microgrid(mg_config)
+    results = {"solve_dispatch_s": best_time(lambda: solve_dispatch(microgrid), repeat)}
+    controller = MPCController(microgrid, latency_budget=None)
+    for _ in range(n_steps):
+        microgrid.run_timestep(controller.act(), logging=False, observe=False)
+    solve_times = np.array(controller.solve_times) * 1e3
+    results["mpc_median_ms"] = float(np.median(solve_times))
+    results["mpc_p99_ms"] = float(np.percentile(solve_times, 99))
+    return results
+
+
+def bench_synthetic(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Wall time of the generation of 1000 synthetic years of prices (daily and \
+        weekly seasonality, noise and spikes) and of pv production
+    """
+    # pylint: disable=unused-argument  # fixed workload
+    n_scenarios = 1000
+    return {
+        "prices_1000_years_s": best_time(
+            lambda: generate_timeseries(
+                n_scenarios,
+                mean=8,
+                daily_amplitude=2,
+                daily_peak=15,
+                weekly_amplitude=1,
+                noise=0.5,
+                spike_probability=0.01,
+                spike_scale=5,
+                min_value=0,
+                seed=0,
+            ),
+            repeat,
+        ),
+        "pv_1000_years_s": best_time(lambda: generate_pv(n_scenarios, seed=0), repeat),
+    }
+
+
+def bench_scenarios(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Reset latency of one week episodes without and with stochastic scenarios \
+        (all perturbations, amortized over the batch draws), and wall time of a\
+        batch draw
+    """
+    # pylint: disable=unused-argument  # fixed workload
+    n_resets = 100
+    results = {}
+    for name, scenarios in (
+        ("reset_us", None),
+        (
+            "scenario_reset_us",
+            ScenarioConfig(
+                noise=0.05,
+                forecast_error=0.1,
+                bootstrap_window=14,
+                regime_swap_probability=0.1,
+                seed=0,
+            ),
+        ),
+    ):
+        config = mg_config.copy(deep=True)
+        config.scenarios = scenarios
+        config.episode_length = 168
+        config.start_sampler = "daily"
+        microgrid = Microgrid(config)
+
+        def run(microgrid=microgrid):
+            for _ in range(n_resets):
+                microgrid.reset()
+
+        results[name] = best_time(run, repeat) / n_resets * 1e6
+    results["scenario_draw_ms"] = (
+        best_time(microgrid.scenario_sampler.draw, repeat) * 1e3
+    )
+    return results
+
+
+def bench_resolution(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Wall time of the construction (resampled datasets cached on disk) and of a \
+        full-year evaluated episode at daily, hourly and quarter-hourly \
+        resolutions
+    """
+    # pylint: disable=unused-argument  # fixed workload
+    results = {}
+    for name, delta_t in (("daily", 24), ("hourly", 1), ("quarter_hourly", 0.25)):
+        config = mg_config.copy(deep=True)
+        config.delta_t = delta_t
+        results[f"{name}_construction_s"] = best_time(
+            lambda config=config: Microgrid(config), repeat
+        )
+        microgrid = Microgrid(config)
+        actions = random_actions(microgrid.MAX_TIMESTEP - 2)
+
+        def evaluate(microgrid=microgrid, actions=actions):
+            microgrid.reset(reset_logs=True)
+            microgrid.evaluate_actions(actions)
+
+        results[f"{name}_episode_s"] = best_time(evaluate, repeat)
+    return results
+
+
+def bench_loops(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Steps per second in the first and last years of a 20 years horizon looping \
+        over the yearly timeseries, and peak memory of its construction
+    """
+    config = mg_config.copy(deep=True)
+    config.loops = 20
+    config.episode_length = n_steps
+    tracemalloc.start()
+    microgrid = Microgrid(config)
+    construction_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    actions = random_actions(n_steps)
+    results = {"construction_peak_mb": construction_peak / 2**20}
+    for name, year in (("first_year", 0), ("last_year", config.loops - 1)):
+
+        def run(year=year):
+            # pylint: disable=protected-access
+            microgrid._set_start(year * microgrid.period)
+            for action in actions:
+                microgrid.run_timestep(action, logging=False)
+
+        results[f"{name}_steps_per_s"] = n_steps / best_time(run, repeat)
+    return results
+
+
+def bench_degradation(n_steps: int, repeat: int) -> Dict[str, float]:
+    """
+    Steps per second of Microgrid.run_timestep and grid-steps per second of \
+        BatchMicrogrid.run_timestep with battery degradation, in the first \
+        steps and after a 20 years horizon of cycles
+    """
+    config = mg_config.copy(deep=True)
+    config.battery.degradation = DegradationConfig()
+    config.loops = 20
+    results = {"n_grids": N_GRIDS}
+    actions = random_actions(n_steps)
+    microgrid = Microgrid(config)
+    batch = BatchMicrogrid(config, n_grids=N_GRIDS)
+    batch_actions = random_actions(n_steps, N_GRIDS)
+    for name in ("first", "after_20_years"):
+        if name != "first":
+            for action in random_actions(microgrid.MAX_TIMESTEP - n_steps - 2):
+                microgrid.run_timestep(action, logging=False)
+        state = microgrid.get_state()
+
+        def run(state=state):
+            microgrid.set_state(state)
+            for action in actions:
+                microgrid.run_timestep(action, logging=False)
+
+        results[f"{name}_steps_per_s"] = n_steps / best_time(run, repeat)
+
+    def run_batch():
+        batch.reset()
+        for action in batch_actions:
+            batch.run_timestep(action)
+
+    results["grid_steps_per_s"] = N_GRIDS * n_steps / best_time(run_batch, repeat)
+    return results
+
+
+BENCHMARKS = {
+    "microgrid_step": bench_microgrid_step,
+    "env_step": bench_env_step,
+    "batch_step": bench_batch_step,
+    "episode": bench_episode,
+    "construction": bench_construction,
+    "memory": bench_memory,
+    "components": bench_components,
+    "dispatch": bench_dispatch,
+    "synthetic": bench_synthetic,
+    "scenarios": bench_scenarios,
+    "resolution": bench_resolution,
+    "loops": bench_loops,
+    "degradation": bench_degradation,
+}
+
+
+def get_commit() -> Optional[str]:
+    """
+    Returns:
+        Optional[str]: The current git commit, if available
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    names: Optional[List[str]] = None, n_steps: int = 2000, repeat: int = 3
+) -> dict:
+    """
+    Run the benchmarks
+
+    Args:
+        names (Optional[List[str]], optional): The benchmarks to run. \
+            Defaults to None (all).
+        n_steps (int, optional): The number of steps for throughput benchmarks.\
+            Defaults to 2000.
+        repeat (int, optional): The number of repetitions, the best is kept.\
+            Defaults to 3.
+
+    Returns:
+        dict: The results, with metadata
+    """
+    results = {
+        "commit": get_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "n_steps": n_steps,
+        "repeat": repeat,
+        "benchmarks": {},
+    }
+    for name in names or BENCHMARKS:
+        results["benchmarks"][name] = BENCHMARKS[name](n_steps, repeat)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="JSON file to write, stdout by default")
+    parser.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run"
+    )
+    parser.add_argument("--n-steps", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    results = run_benchmarks(args.only, args.n_steps, args.repeat)
+    output = json.dumps(results, indent=4)
+    if args.output is None:
+        print(output)
+    else:
+        with open(args.output, "w", encoding="utf-8") as json_file:
+            json_file.write(output)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,14 +1,23 @@
 """
-Example of operating the microgrid using gym environment
+Example of operating the microgrid using gym environment, and command line \
+interface of the scenario sweeps:
+
+    python -m easygrid sweep --output results.csv --battery-durations 2 4 8
 """
-from easygrid.config.pymgrid_config import mg_config
+import argparse
+import sys
+from typing import Dict, List, Optional, Sequence
+
 from easygrid.env import GridEnv
 
 
-def main():
+def example():
     """
     Example of microgrid operation
     """
+    # pylint: disable=import-outside-toplevel
+    from easygrid.config.pymgrid_config import mg_config
+
     env = GridEnv(mg_config)
     done = False
     while not done:
@@ -16,5 +25,105 @@ def main():
     env.microgrid.show_logs()
 
 
+def sweep(args: argparse.Namespace) -> None:
+    """
+    Run a scenario sweep from the command line arguments
+    """
+    # pylint: disable=import-outside-toplevel
+    from easygrid.cache import ResultCache
+    from easygrid.config.pymgrid_config import mg_config
+    from easygrid.sweep import get_profiles, run_sweep
+
+    base_config = mg_config.copy(deep=True)
+    if args.episode_length is not None:
+        base_config.episode_length = args.episode_length
+    param_grid: Dict[str, Sequence] = {
+        "load": get_profiles(args.loads, "load"),
+        "pv": get_profiles(args.pvs, "pv"),
+    }
+    for name in (
+        "battery_duration",
+        "production_factor",
+        "load_factor",
+        "import_price_factor",
+        "export_price_factor",
+        "delta_t",
+    ):
+        values = getattr(args, name + "s")
+        if values is not None:
+            param_grid[name] = values
+    rows = run_sweep(
+        param_grid,
+        args.output,
+        base_config=base_config,
+        policy=args.policy,
+        max_workers=args.workers,
+        share=not args.no_share,
+        # like run_sweep, results are only cached when asked for
+        cache=ResultCache(args.cache_dir) if args.cache or args.cache_dir else None,
+        store_logs=args.store_logs,
+    )
+    print(f"{len(rows)} scenarios written to {args.output}")
+
+
+def get_parser() -> argparse.ArgumentParser:
+    """
+    Returns:
+        argparse.ArgumentParser: The command line parser
+    """
+    # pylint: disable=import-outside-toplevel
+    from easygrid.sweep import POLICIES
+
+    parser = argparse.ArgumentParser(prog="easygrid", description=__doc__)
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("example", help="run a random episode and show the logs")
+    sweep_parser = subparsers.add_parser(
+        "sweep", help="evaluate a policy on a grid of scenarios"
+    )
+    sweep_parser.add_argument("--output", required=True, help="summary csv file")
+    sweep_parser.add_argument(
+        "--loads", nargs="+", default=["all"], help="load files, all by default"
+    )
+    sweep_parser.add_argument(
+        "--pvs", nargs="+", default=["all"], help="pv files, all by default"
+    )
+    for name in (
+        "battery-durations",
+        "production-factors",
+        "load-factors",
+        "import-price-factors",
+        "export-price-factors",
+        "delta-ts",
+    ):
+        sweep_parser.add_argument(f"--{name}", nargs="+", type=float)
+    sweep_parser.add_argument("--policy", choices=list(POLICIES), default="optimal")
+    sweep_parser.add_argument("--workers", type=int, help="number of processes")
+    sweep_parser.add_argument("--episode-length", type=int)
+    sweep_parser.add_argument(
+        "--no-share", action="store_true", help="don't share datasets in memory"
+    )
+    sweep_parser.add_argument(
+        "--cache", action="store_true", help="use the on-disk result cache"
+    )
+    sweep_parser.add_argument(
+        "--cache-dir", help="directory of the result cache (implies --cache)"
+    )
+    sweep_parser.add_argument(
+        "--store-logs", action="store_true", help="store the logs in the cache"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Command line entry point, runs the example without arguments
+    """
+    args = get_parser().parse_args([] if argv is None else argv)
+    if args.command == "sweep":
+        sweep(args)
+    else:
+        example()
+
+
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
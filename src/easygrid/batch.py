@@ -0,0 +1,544 @@
+"""
+This module creates the batched microgrid object, stepping several \
+independent microgrids at once
+"""
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from easygrid.components import Battery, Grid, Load, Photovoltaic
+from easygrid.data.data_utils import get_n_steps
+from easygrid.degradation import BatchDegradation
+from easygrid.microgrid import (
+    check_lengths,
+    get_max_actions,
+    get_scenario_sampler,
+    sample_starts,
+    scale_actions,
+)
+from easygrid.observation import build_features, get_feature_bounds, write_column
+from easygrid.scenarios import SERIES_NAMES, ScenarioSampler
+from easygrid.types import MicrogridConfig, ObservationConfig
+
+
+class BatchMicrogrid:
+    """
+    This class represents N independent microgrids whose state is held in arrays\
+        so that they can all be stepped in a single numpy call.
+    Each microgrid follows exactly the same dynamics as Microgrid.
+    ...
+
+    Attributes
+    ----------
+    n_grids : int
+        The number of microgrids in the batch
+    t : np.ndarray
+        The current timestep of each microgrid (N,)
+    start : np.ndarray
+        The first timestep of the current episode of each microgrid (N,)
+    energy : np.ndarray
+        The current energy stored in each battery (N,)
+    degradation : Optional[BatchDegradation]
+        The capacity fade of the batteries, None if none of them degrades
+    rngs : List[np.random.Generator]
+        The random generator of each microgrid, sampling its episodes start
+
+    Methods
+    -------
+    run_timestep : executes the (N, 2) actions on all microgrids and returns \
+        the (N, 1 + horizon * k) observations, (N,) terminal flags and (N, 3) costs
+    reset : resets all (or some) microgrids to their initial state.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        configs: Union[MicrogridConfig, List[MicrogridConfig]],
+        n_grids: Optional[int] = None,
+    ) -> None:
+        """
+        Creates the relevant arrays based on the configs
+
+        Args:
+            configs (Union[MicrogridConfig, List[MicrogridConfig]]): One config \
+                per microgrid, or a single config to be replicated n_grids times.
+            n_grids (Optional[int], optional): The number of microgrids when a \
+                single config is given. Defaults to None.
+        """
+        if isinstance(configs, MicrogridConfig):
+            configs = [configs] * (1 if n_grids is None else n_grids)
+        elif n_grids is not None and n_grids != len(configs):
+            raise ValueError(
+                f"Number of configs ({len(configs)}) is different from the \
+                    number of grids ({n_grids})"
+            )
+        check_configs(configs)
+        config = configs[0]
+        if config.loops < 1:
+            raise ValueError(f"Loops must be at least 1 ({config.loops})")
+        self.n_grids = len(configs)
+        self.delta_t = config.delta_t
+        self.loops = config.loops
+        # the timesteps loop over the timeseries of period timesteps
+        self.period = get_n_steps(config.max_timestep, self.delta_t)
+        self.MAX_TIMESTEP = self.period * self.loops
+        self.steps_per_day = max(1, round(24 / self.delta_t))
+        self.episode_length = config.episode_length
+        self.start_sampler = config.start_sampler
+        self.max_start = self.MAX_TIMESTEP - 2 - (self.episode_length or 0)
+        if self.max_start < 0:
+            raise ValueError(
+                f"Episode length ({self.episode_length}) is longer than the \
+                    timeseries ({self.MAX_TIMESTEP - 2})"
+            )
+        # one generator per microgrid, seeded by its config
+        self.rngs = get_rngs([config.seed for config in configs])
+        self._rows = np.arange(self.n_grids)
+
+        # only the components are built, to load and check the data
+        batteries, grids, pvs, loads = zip(
+            *(
+                (
+                    Battery(config.battery),
+                    Grid(config.grid, delta_t=self.delta_t),
+                    Photovoltaic(config.pv, delta_t=self.delta_t),
+                    Load(config.load, delta_t=self.delta_t),
+                )
+                for config in configs
+            )
+        )
+        for grid, pv, load in zip(grids, pvs, loads):
+            check_lengths(self.period, grid, pv, load)
+        self.import_prices = np.stack([grid.import_prices for grid in grids])
+        self.export_prices = np.stack([grid.export_prices for grid in grids])
+        self.pv_production = np.stack([pv.pv_production_ts for pv in pvs])
+        self.load = np.stack([load.load_ts for load in loads])
+
+        self.capacity = np.array([battery.capacity for battery in batteries])
+        self.high_capacity = np.array([battery.high_capacity for battery in batteries])
+        self.low_capacity = np.array([battery.low_capacity for battery in batteries])
+        self.initial_energy = np.array(
+            [battery.initial_energy for battery in batteries], dtype=np.float64
+        )
+        self.overcharge_penalty = np.array(
+            [battery.overcharge_penalty for battery in batteries]
+        )
+        self.overproduction_penalty = np.array(
+            [config.overprod_penalty for config in configs]
+        )
+        self.underproduction_penalty = np.array(
+            [config.underprod_penalty for config in configs]
+        )
+        self.max_actions = np.stack(
+            [
+                get_max_actions(battery, load, self.delta_t)
+                for battery, load in zip(batteries, loads)
+            ]
+        )
+        self.min_actions = np.negative(self.max_actions)
+        self._init_features(config.observation)
+
+        self.start = np.zeros(self.n_grids, dtype=np.int64)
+        self.t = self.start.copy()
+        self.end = self.start + (
+            self.MAX_TIMESTEP - 2
+            if self.episode_length is None
+            else self.episode_length
+        )
+        self.energy = self.initial_energy.copy()
+        degradations = [config.battery.degradation for config in configs]
+        self.degradation = (
+            None
+            if all(degradation is None for degradation in degradations)
+            else BatchDegradation(degradations, self.energy / self.capacity)
+        )
+
+        self._init_scenarios(configs, grids, pvs, loads)
+        self._init_bounds()
+
+    def _init_scenarios(
+        self,
+        configs: List[MicrogridConfig],
+        grids: Sequence[Grid],
+        pvs: Sequence[Photovoltaic],
+        loads: Sequence[Load],
+    ) -> None:
+        """
+        Build the scenario samplers of the microgrids, shared by the \
+            microgrids with the same config, and the scaling factors of their \
+            timeseries.
+        """
+        samplers: Dict[str, Optional[ScenarioSampler]] = {}
+        self._samplers: List[Optional[ScenarioSampler]] = []
+        for config, grid, pv, load in zip(configs, grids, pvs, loads):
+            key = config.json()
+            if key not in samplers:
+                samplers[key] = get_scenario_sampler(config, grid, pv, load)
+            self._samplers.append(samplers[key])
+        # (N, 4) scaling factors of the timeseries, in the SERIES_NAMES order
+        self._factors = np.array(
+            [
+                [
+                    grid.import_price_factor,
+                    grid.export_price_factor,
+                    load.load_factor,
+                    pv.production_factor,
+                ]
+                for grid, pv, load in zip(grids, pvs, loads)
+            ]
+        )
+
+    def _init_features(self, observation: ObservationConfig) -> None:
+        """
+        Build the (N, T + horizon - 1, k) features of the microgrids and the \
+            (N, T, horizon, k) views of their windows, as in ObservationBuilder.
+
+        Args:
+            observation (ObservationConfig): The observation config
+        """
+        self.horizon = observation.horizon
+        self.features = np.stack(
+            [
+                build_features(
+                    sources,
+                    self.horizon,
+                    observation.calendar_features,
+                    self.delta_t,
+                    self.loops > 1,
+                )
+                for sources in zip(
+                    self.import_prices,
+                    self.export_prices,
+                    self.load,
+                    self.pv_production,
+                )
+            ]
+        )
+        # (n_grids, n_windows, horizon, n_features) zero-copy windows
+        self._windows = sliding_window_view(
+            self.features, self.horizon, axis=1
+        ).swapaxes(2, 3)
+
+    def _init_bounds(self) -> None:
+        """
+        Compute the bounds of the observations, over all the scenarios of the \
+            microgrids that draw them (see get_feature_bounds).
+        """
+        low, high = zip(
+            *(
+                get_feature_bounds(features, sampler, factors)
+                for features, sampler, factors in zip(
+                    self.features, self._samplers, self._factors
+                )
+            )
+        )
+        # the state of charge is between 0 and 1
+        self.max_values = np.hstack(
+            [
+                np.ones((self.n_grids, 1), dtype=np.float32),
+                np.tile(np.stack(high), self.horizon),
+            ]
+        )
+        self.min_values = np.hstack(
+            [
+                np.zeros((self.n_grids, 1), dtype=np.float32),
+                np.tile(np.stack(low), self.horizon),
+            ]
+        )
+
+    def __len__(self) -> int:
+        return self.n_grids
+
+    def run_timestep(
+        self, actions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Executes the actions on all microgrids and computes the following states
+
+        Args:
+            actions (np.ndarray): The (N, 2) actions in [-1, 1], each containing:
+                - How much to store/discharge in the battery
+                - How much to sell/buy from the grid
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The next states,\
+                the (N,) terminal state flags and the (N, 3) overcharge, grid \
+                and error costs
+        """
+        self.t += 1
+        index = self.t % self.period
+        energies = scale_actions(actions, self.max_actions, self.min_actions)
+        energy_battery = energies[:, 0]
+        energy_grid = energies[:, 1]
+        energy_pv = self.pv_production[self._rows, index] * self.delta_t
+        energy_load = self.load[self._rows, index] * self.delta_t
+        energy_balance = energy_pv + energy_grid - energy_load - energy_battery
+
+        if self.degradation is None:
+            self.energy, overcharge = charge_discharge(
+                self.energy, energy_battery, self.low_capacity, self.high_capacity
+            )
+        else:
+            health = self.degradation.health
+            previous_energy = self.energy
+            self.energy, overcharge = charge_discharge(
+                self.energy,
+                energy_battery,
+                self.low_capacity * health,
+                self.high_capacity * health,
+            )
+            self.degradation.update(
+                self.energy - previous_energy,
+                self.energy / self.capacity,
+                self.capacity,
+            )
+        costs = np.empty((self.n_grids, 3))
+        costs[:, 0] = overcharge * self.overcharge_penalty
+        costs[:, 1] = get_grid_cost(
+            self.import_prices[self._rows, index],
+            self.export_prices[self._rows, index],
+            energy_grid,
+        )
+        costs[:, 2] = get_error_cost(
+            energy_balance, self.overproduction_penalty, self.underproduction_penalty
+        )
+        return self.obs, self.done, costs
+
+    @property
+    def state_of_charge(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: the current state of charge of each battery (N,)
+        """
+        return self.energy / self.capacity
+
+    @property
+    def obs(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The current (N, 1 + horizon * k) states of the \
+                microgrids, as in Microgrid.obs (5 features by default)
+        """
+        obs = np.empty((self.n_grids, self.max_values.shape[1]), dtype=np.float32)
+        obs[:, 0] = self.state_of_charge
+        obs[:, 1:] = self.forecast.reshape(self.n_grids, -1)
+        return obs
+
+    @property
+    def forecast(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The (N, horizon, k) features of the next timesteps
+        """
+        return self._windows[self._rows, (self.t + 1) % self.period]
+
+    @property
+    def done(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: Wether or not each microgrid is in a final state (N,)
+        """
+        return self.t >= self.end
+
+    def reset(self, mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Reset the microgrids in their original state, at the start of new \
+            episode windows sampled by the start sampler (one per microgrid).
+
+        Args:
+            mask (Optional[np.ndarray], optional): Boolean (N,) array of the \
+                microgrids to reset. Defaults to None (all microgrids).
+
+        Returns:
+            np.ndarray: The observations after reset
+        """
+        if mask is None:
+            mask = np.ones(self.n_grids, dtype=bool)
+        starts = sample_starts(
+            [self.rngs[i] for i in np.flatnonzero(mask)],
+            self.start_sampler,
+            self.max_start,
+            self.steps_per_day,
+        )
+        self.start[mask] = starts
+        self.t[mask] = starts
+        self.end[mask] = starts + (
+            self.MAX_TIMESTEP - 2
+            if self.episode_length is None
+            else self.episode_length
+        )
+        self.energy[mask] = self.initial_energy[mask]
+        if self.degradation is not None:
+            self.degradation.reset(mask, self.energy / self.capacity)
+        for i in np.flatnonzero(mask):
+            sampler = self._samplers[i]
+            if sampler is not None:
+                self.set_scenario(i, sampler.sample(self.start[i] % self.period))
+        return self.obs
+
+    def set_scenario(self, i: int, scenario: Dict[str, np.ndarray]) -> None:
+        """
+        Copy perturbed timeseries (see easygrid.scenarios.ScenarioSampler) in \
+            the timeseries and features of a microgrid.
+
+        Args:
+            i (int): The index of the microgrid
+            scenario (Dict[str, np.ndarray]): The unscaled timeseries by name \
+                (see SERIES_NAMES)
+        """
+        timeseries = (
+            self.import_prices,
+            self.export_prices,
+            self.load,
+            self.pv_production,
+        )
+        for column, name in enumerate(SERIES_NAMES):
+            if name in scenario:
+                row = timeseries[column][i]
+                np.multiply(scenario[name], self._factors[i, column], out=row)
+                write_column(self.features[i, :, column], row, self.loops > 1)
+
+    def seed(self, seed: Union[None, int, Sequence[Optional[int]]] = None) -> None:
+        """
+        Seed the random generators used to sample the episodes start.
+
+        Args:
+            seed (Union[None, int, Sequence[Optional[int]]], optional): The \
+                seed of all the microgrids, or one seed per microgrid. \
+                Defaults to None.
+        """
+        seeds = [seed] * self.n_grids if seed is None or isinstance(seed, int) else seed
+        if len(seeds) != self.n_grids:
+            raise ValueError(
+                f"Number of seeds ({len(seeds)}) is different from the number of \
+                    grids ({self.n_grids})"
+            )
+        self.rngs = get_rngs(seeds)
+
+
+def get_rngs(seeds: Sequence[Optional[int]]) -> List[np.random.Generator]:
+    """
+    Args:
+        seeds (Sequence[Optional[int]]): The seed of each microgrid
+
+    Returns:
+        List[np.random.Generator]: The random generator of each microgrid, \
+            spawned from its seed and its index in the batch so that \
+            microgrids with the same seed (e.g. a replicated config) sample \
+            different starts
+    """
+    return [
+        np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(i,)))
+        for i, seed in enumerate(seeds)
+    ]
+
+
+def check_configs(configs: List[MicrogridConfig]) -> None:
+    """
+    Check that the microgrids of a batch can be stepped together: same \
+        timestep duration, number of loops and of timesteps, observation and \
+        episodes.
+
+    Args:
+        configs (List[MicrogridConfig]): The configs of the microgrids
+
+    Raises:
+        ValueError: If the configs differ on one of these settings
+    """
+    delta_ts = {config.delta_t for config in configs}
+    if len(delta_ts) != 1:
+        raise ValueError(
+            f"All microgrids must have the same timestep duration ({delta_ts})"
+        )
+    loops = {config.loops for config in configs}
+    if len(loops) != 1:
+        raise ValueError(f"All microgrids must have the same loops ({loops})")
+    max_timesteps = {config.max_timestep for config in configs}
+    if len(max_timesteps) != 1:
+        raise ValueError(
+            f"All microgrids must have the same maximum number of timesteps \
+                ({max_timesteps})"
+        )
+    observations = {
+        (config.observation.horizon, config.observation.calendar_features)
+        for config in configs
+    }
+    if len(observations) != 1:
+        raise ValueError(
+            f"All microgrids must have the same observation config \
+                ({observations})"
+        )
+    episodes = {(config.episode_length, config.start_sampler) for config in configs}
+    if len(episodes) != 1:
+        raise ValueError(
+            f"All microgrids must have the same episode length and start \
+                sampler ({episodes})"
+        )
+
+
+def charge_discharge(
+    energy: np.ndarray, delta: np.ndarray, low: np.ndarray, high: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Masked version of Battery.charge_discharge
+
+    Args:
+        energy (np.ndarray): The energies currently stored in the batteries
+        delta (np.ndarray): The energies to be stored (+)/discharged (-)
+        low (np.ndarray): The low capacities of the batteries
+        high (np.ndarray): The high capacities of the batteries
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The new stored energies and the \
+            excess/missing energies when compared to max and min thresholds
+    """
+    new_energy = energy + delta
+    charging = delta >= 0
+    overcharge = np.where(
+        charging,
+        np.minimum(0, new_energy - high),
+        np.maximum(0, low - new_energy),
+    )
+    new_energy = np.where(
+        charging, np.minimum(high, new_energy), np.maximum(low, new_energy)
+    )
+    return new_energy, overcharge
+
+
+def get_grid_cost(
+    import_prices: np.ndarray, export_prices: np.ndarray, energy: np.ndarray
+) -> np.ndarray:
+    """
+    Masked version of Grid.get_cost
+
+    Args:
+        import_prices (np.ndarray): The import prices at the current timestep
+        export_prices (np.ndarray): The export prices at the current timestep
+        energy (np.ndarray): Energies to be sold (-) or bought (+)
+
+    Returns:
+        np.ndarray: The costs in euros, positive is loss, negative is gain
+    """
+    return np.where(energy >= 0, import_prices, export_prices) * energy
+
+
+def get_error_cost(
+    energy_balance: np.ndarray,
+    overproduction_penalty: np.ndarray,
+    underproduction_penalty: np.ndarray,
+) -> np.ndarray:
+    """
+    Masked version of Microgrid.get_error_cost
+
+    Args:
+        energy_balance (np.ndarray): the energy balances (overprod:+, underprod:-)
+        overproduction_penalty (np.ndarray): the overproduction penalties
+        underproduction_penalty (np.ndarray): the underproduction penalties
+
+    Returns:
+        np.ndarray: The costs ($) for not meeting the requirement
+    """
+    return energy_balance * np.where(
+        energy_balance >= 0, overproduction_penalty, underproduction_penalty
+    )
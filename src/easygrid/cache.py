@@ -0,0 +1,260 @@
+"""
+Content-addressed on-disk cache of the results of policy evaluations
+"""
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import suppress
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from easygrid.data.data_utils import get_cache_folder, get_checksum
+from easygrid.types import MicrogridConfig
+
+# (component, field) of the config that reference datasets
+DATASET_FIELDS = [
+    ("grid", "import_prices"),
+    ("grid", "export_prices"),
+    ("pv", "pv_production_ts"),
+    ("load", "load_ts"),
+]
+
+
+def get_key(config: MicrogridConfig, policy: str) -> str:
+    """
+    Get the key of an evaluation: a hash of the canonical config json (as \
+        written by save_config), where dataset paths are replaced by the \
+        checksums of their data, and of the policy identifier.
+
+    Args:
+        config (MicrogridConfig): The config of the evaluated microgrid
+        policy (str): The identifier of the policy
+
+    Returns:
+        str: The key
+    """
+    content = json.loads(config.json())
+    for component, field in DATASET_FIELDS:
+        content[component][field] = get_checksum(
+            getattr(getattr(config, component), field)
+        )
+    content = json.dumps({"config": content, "policy": policy}, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of evaluation summaries (json) and optional logs (npz), with \
+        least recently used eviction when the cache exceeds its maximum size.
+    ...
+
+    Attributes
+    ----------
+    directory : str
+        Where the results are stored
+    max_size : Optional[int]
+        The maximum size (bytes) of the cache, None for no limit
+    enabled : bool
+        Wether or not the cache is used, get always misses and put does nothing\
+            when disabled
+
+    Methods
+    -------
+    get : Get the summary of an evaluation
+    get_logs : Get the logs of an evaluation
+    put : Store the summary and logs of an evaluation
+    evict : Remove the least recently used results until the size fits
+    clear : Remove all results
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_size: Optional[int] = 2**30,
+        enabled: bool = True,
+    ) -> None:
+        """
+        Args:
+            directory (Optional[str], optional): Where the results are stored. \
+                Defaults to None ("results" in the cache folder, see \
+                easygrid.data.data_utils.get_cache_folder).
+            max_size (Optional[int], optional): The maximum size (bytes) of the \
+                cache. Defaults to 1 GiB.
+            enabled (bool, optional): Wether or not the cache is used. \
+                Defaults to True.
+        """
+        self.directory = directory or os.path.join(get_cache_folder(), "results")
+        self.max_size = max_size
+        self.enabled = enabled
+        # size of the stored results, counted once then updated by put so \
+        # that the directory is only scanned when the cache is full
+        self._size: Optional[int] = None
+
+    def _path(self, key: str, extension: str) -> str:
+        return os.path.join(self.directory, key + extension)
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Args:
+            key (str): The key of the evaluation, see get_key
+
+        Returns:
+            Optional[dict]: The summary, None if not cached
+        """
+        if not self.enabled:
+            return None
+        path = self._path(key, ".json")
+        try:
+            with open(path, encoding="utf-8") as json_file:
+                summary = json.load(json_file)
+            os.utime(path)  # the modification time is the last access
+        except (OSError, ValueError):
+            return None
+        return summary
+
+    def get_logs(self, key: str) -> Optional[Dict[str, Dict[str, np.ndarray]]]:
+        """
+        Args:
+            key (str): The key of the evaluation, see get_key
+
+        Returns:
+            Optional[Dict[str, Dict[str, np.ndarray]]]: The logs, None if not \
+                cached
+        """
+        if not self.enabled:
+            return None
+        try:
+            with np.load(self._path(key, ".npz")) as data:
+                logs: Dict[str, Dict[str, np.ndarray]] = {}
+                for name in data.files:
+                    log, field = name.split("/", 1)
+                    logs.setdefault(log, {})[field] = data[name]
+        except (OSError, ValueError):
+            return None
+        return logs
+
+    def _write(self, path: str, write) -> int:
+        """
+        Returns:
+            int: The change of the size of the cache
+        """
+        # write then rename so that concurrent processes never read a partial \
+        # file
+        with tempfile.NamedTemporaryFile(
+            dir=self.directory,
+            prefix=".",
+            suffix=os.path.splitext(path)[1],
+            delete=False,
+        ) as tmp_file:
+            write(tmp_file)
+        added = os.path.getsize(tmp_file.name)
+        with suppress(OSError):
+            added -= os.path.getsize(path)
+        os.replace(tmp_file.name, path)
+        return added
+
+    def put(
+        self,
+        key: str,
+        summary: dict,
+        logs: Optional[Dict[str, Dict[str, np.ndarray]]] = None,
+    ) -> None:
+        """
+        Store the results of an evaluation, then evict old results if the \
+            cache exceeds its maximum size.
+
+        Args:
+            key (str): The key of the evaluation, see get_key
+            summary (dict): The json serializable summary
+            logs (Optional[Dict[str, Dict[str, np.ndarray]]], optional): The \
+                logs (as returned by get_logs). Defaults to None.
+        """
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        added = 0
+        if logs is not None:
+            arrays = {
+                f"{log}/{field}": np.asarray(values)
+                for log, fields in logs.items()
+                for field, values in fields.items()
+            }
+
+            def write_logs(file) -> None:
+                np.savez(file, **arrays)
+
+            added += self._write(self._path(key, ".npz"), write_logs)
+        added += self._write(
+            self._path(key, ".json"),
+            lambda file: file.write(json.dumps(summary).encode("utf-8")),
+        )
+        if self.max_size is None:
+            return
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += added
+        if self._size > self.max_size:
+            self.evict()
+
+    def _entries(self) -> List[os.DirEntry]:
+        try:
+            with os.scandir(self.directory) as entries:
+                return [
+                    entry
+                    for entry in entries
+                    if entry.name.endswith((".json", ".npz"))
+                    and not entry.name.startswith(".")
+                ]
+        except FileNotFoundError:
+            return []
+
+    def size(self) -> int:
+        """
+        Returns:
+            int: The size (bytes) of the stored results
+        """
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self) -> List[str]:
+        """
+        Remove the least recently used results until the cache fits its \
+            maximum size. The directory is scanned again, so results written by\
+            other processes are accounted for.
+
+        Returns:
+            List[str]: The keys of the removed results
+        """
+        if self.max_size is None:
+            return []
+        keys: Dict[str, List[os.DirEntry]] = {}
+        for entry in self._entries():
+            keys.setdefault(os.path.splitext(entry.name)[0], []).append(entry)
+        size = sum(
+            entry.stat().st_size for entries in keys.values() for entry in entries
+        )
+        # json files are touched on access, so their time is the last access
+        by_access = sorted(
+            keys, key=lambda key: max(entry.stat().st_mtime for entry in keys[key])
+        )
+        removed = []
+        for key in by_access:
+            if size <= self.max_size:
+                break
+            for entry in keys[key]:
+                size -= entry.stat().st_size
+                with suppress(FileNotFoundError):
+                    os.remove(entry.path)
+            removed.append(key)
+        self._size = size
+        return removed
+
+    def clear(self) -> None:
+        """
+        Remove all results
+        """
+        for entry in self._entries():
+            os.remove(entry.path)
+        self._size = 0
@@ -0,0 +1,859 @@
+"""
+The components of the microgrid (battery, grid, pv and load), which hold their\
+ part of the config and the scaled timeseries
+"""
+from typing import Optional, TypeVar
+
+import numpy as np
+
+from easygrid.data.data_utils import load_data
+from easygrid.degradation import Degradation
+from easygrid.types import BatteryConfig, GridConfig, LoadConfig, PvConfig, freeze
+
+
+class ConfigAttribute:
+    """
+    Attribute of a component that is part of its config: setting it clears the\
+        cached config snapshot of the component, which is then validated and \
+        rebuilt on the next config read.
+    """
+
+    def __init__(self) -> None:
+        self.private_name = ""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.private_name = "_" + name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return getattr(instance, self.private_name)
+
+    def __set__(self, instance, value) -> None:
+        setattr(instance, self.private_name, value)
+        instance._config = None  # pylint: disable=protected-access
+
+
+def scale(timeserie: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Scale a timeserie by a factor, without copying it when the factor is 1 so \
+        that memory-mapped data stays shared.
+
+    Args:
+        timeserie (np.ndarray): The timeserie to scale
+        factor (float): The scaling factor
+
+    Returns:
+        np.ndarray: The scaled timeserie
+    """
+    if factor == 1:
+        return timeserie
+    return timeserie * factor
+
+
+class ScaleBuffer:
+    """
+    Preallocated output of the scaled scenarios of a timeserie, so that \
+        swapping in a scenario at each reset doesn't allocate. Each scenario \
+        is returned as a new view of the buffer: the observation builder \
+        detects the timeseries that changed by identity.
+    """
+
+    __slots__ = ("_buffer",)
+
+    def __init__(self) -> None:
+        self._buffer: Optional[np.ndarray] = None
+
+    def release(self) -> None:
+        """
+        Stop writing into the current buffer, whose scenario is still \
+            referenced elsewhere (e.g. by a copy of the component): the next \
+            scenario is scaled into a new one.
+        """
+        self._buffer = None
+
+    def scale(self, timeserie: np.ndarray, factor: float) -> np.ndarray:
+        """
+        Scale a timeserie like scale, into the buffer when the factor isn't 1. \
+            The previous scenario is overwritten.
+
+        Args:
+            timeserie (np.ndarray): The timeserie to scale
+            factor (float): The scaling factor
+
+        Returns:
+            np.ndarray: The scaled timeserie
+        """
+        if factor == 1:
+            return timeserie
+        if self._buffer is None or self._buffer.shape != timeserie.shape:
+            self._buffer = np.empty(timeserie.shape)
+        return np.multiply(timeserie, factor, out=self._buffer).view()
+
+
+Component = TypeVar("Component")
+
+
+def copy_component(component: Component) -> Component:
+    """
+    Shallow copy of a component with __slots__, except for its scale buffers: \
+        the copy shares the current scaled timeseries with the original, and \
+        both scale their next scenarios into new buffers.
+
+    Args:
+        component (Component): The component to copy
+
+    Returns:
+        Component: The copy
+    """
+    copied = object.__new__(type(component))
+    for name in type(component).__slots__:  # type: ignore
+        value = getattr(component, name)
+        if isinstance(value, ScaleBuffer):
+            value.release()
+            value = ScaleBuffer()
+        setattr(copied, name, value)
+    return copied
+
+
+class Battery:
+    """
+    Models the battery, its state and relevant actions
+    ...
+
+    Attributes
+    ----------
+    capacity : float
+        The total capacity of the battery.
+    high_capacity : float
+        The higher energy threshold to be stored in the battery \
+            for maximum efficiency of the battery
+    low_capacity : float
+        The lower energy threshold to be stored in the battery \
+            for maximum efficiency of the battery
+    max_output : float
+        The maximum power output of the battery (which defines the maximal\
+             amount of energy that can be transfered in a single timestep)
+    min_output : float
+        The minimum power output of the battery (which defines the minimal\
+             amount of energy that can be transfered in a single timestep)
+    _energy : float
+        The current amount of energy stored in the battery. Private.
+    degradation : Optional[Degradation]
+        The capacity fade of the battery with cycling, None if it doesn't \
+            degrade
+    state_of_charge (property) : float
+        The state of charge of the battery (between 0 and 1)
+    energy (property) : float
+        The current amount of energy stored in the battery. Includes safety \
+            check for negative energy
+    health (property) : float
+        The remaining fraction of the capacity, that scales the high and low \
+            capacities
+
+    Methods
+    -------
+    charge_discharge : Stores or discharge the required amount of energy \
+        into/from the battery and computes the under/overcharge
+    """
+
+    # slots keep instances compact and attribute lookups fast (no __dict__)
+    __slots__ = (
+        "_capacity",
+        "_high_capacity",
+        "_low_capacity",
+        "_max_output",
+        "_min_output",
+        "_initial_energy",
+        "_overcharge_penalty",
+        "_energy",
+        "_config",
+        "debug",
+        "degradation",
+    )
+    # slots backing the config attributes, read directly in the hot paths
+    _capacity: float
+    _high_capacity: float
+    _low_capacity: float
+    _overcharge_penalty: float
+
+    capacity = ConfigAttribute()
+    high_capacity = ConfigAttribute()
+    low_capacity = ConfigAttribute()
+    max_output = ConfigAttribute()
+    min_output = ConfigAttribute()
+    initial_energy = ConfigAttribute()
+    overcharge_penalty = ConfigAttribute()
+
+    def __init__(self, battery_config: BatteryConfig, debug: bool = False) -> None:
+        """
+        Creates the relevant attributes based on the config
+
+        Args:
+            battery_config (BatteryConfig): Configuration for the battery.
+            debug (bool, optional): Wether or not to check the state of charge \
+                and energy invariants on each access. Defaults to False.
+        """
+        self.debug = debug
+        self._config: Optional[BatteryConfig] = None
+        self.capacity = battery_config.capacity
+        self.high_capacity = battery_config.high_capacity
+        self.low_capacity = battery_config.low_capacity
+        self.max_output = battery_config.max_output
+        self.min_output = battery_config.min_output
+        self._energy = battery_config.initial_energy
+        self.initial_energy = battery_config.initial_energy
+        self.overcharge_penalty = battery_config.overcharge_penalty
+        self.degradation = (
+            None
+            if battery_config.degradation is None
+            else Degradation(battery_config.degradation, self._energy / self._capacity)
+        )
+
+    def reset(self):
+        """
+        Reset the battery energy/soc to the initial setting, and its capacity \
+            to the one of a new battery
+        """
+        self._energy = self.initial_energy
+        if self.degradation is not None:
+            self.degradation.reset(self._energy / self._capacity)
+
+    @property
+    def config(self) -> BatteryConfig:
+        """
+
+        Returns:
+            BatteryConfig: An immutable snapshot of the current battery config, \
+                only validated and rebuilt after a config attribute was modified
+        """
+        if self._config is None:
+            config = BatteryConfig.parse_obj(
+                {
+                    "capacity": self.capacity,
+                    "high_capacity": self.high_capacity,
+                    "low_capacity": self.low_capacity,
+                    "max_output": self.max_output,
+                    "min_output": self.min_output,
+                    "overcharge_penalty": self.overcharge_penalty,
+                    "initial_energy": self.initial_energy,
+                    "degradation": None
+                    if self.degradation is None
+                    else self.degradation.config,
+                }
+            )
+            self._config = freeze(config)
+        return self._config
+
+    @property
+    def health(self) -> float:
+        """
+        Returns:
+            float: The remaining fraction of the nominal capacity (1 for a new\
+                battery or without degradation)
+        """
+        return 1.0 if self.degradation is None else self.degradation.health
+
+    @property
+    def state_of_charge(self) -> float:
+        """
+        Returns:
+            float: the current state of charge of the battery \
+                (between 0 : empty and 1 : full)
+        """
+        soc = self._energy / self._capacity
+        if self.debug:
+            assert (
+                0 <= soc <= 1
+            ), f"Soc not between 0 and 1 : {soc} ({self._energy}/{self._capacity})"
+        return soc
+
+    @property
+    def energy(self) -> Optional[float]:
+        """
+        Returns:
+            float: The current energy quantity stored in the battery
+        """
+        if self._energy >= 0 or not self.debug:
+            return self._energy
+        else:
+            raise ValueError(f"Energy is negative ({self._energy}), there is a problem")
+
+    def charge_discharge(self, energy: float) -> float:
+        """
+        Charge/Discharge the battery with the desired quantity of energy
+
+        Args:
+            energy (float): The energy to be stored (+)/discharged (-)
+
+        Returns:
+            float: The excess/missing energy when compared to max and min \
+                thresholds
+        """
+        degradation = self.degradation
+        if degradation is not None:
+            return self._charge_discharge_degraded(energy, degradation)
+        new_energy = (self.energy if self.debug else self._energy) + energy
+        if energy >= 0:
+            # if there is more energy than the upper bound, we compute \
+            # the excess
+            overcharge = min(0, new_energy - self._high_capacity)
+            self._energy = min(self._high_capacity, new_energy)
+            return overcharge
+        else:
+            # if there is less energy than the lower bound, we compute \
+            # how much is missing
+            undercharge = max(0, self._low_capacity - new_energy)
+            self._energy = max(self._low_capacity, new_energy)
+            return undercharge
+
+    def _charge_discharge_degraded(
+        self, energy: float, degradation: Degradation
+    ) -> float:
+        """
+        charge_discharge with thresholds scaled by the state of health, which \
+            is then updated with the actual change of stored energy
+        """
+        previous_energy = self.energy if self.debug else self._energy
+        new_energy = previous_energy + energy
+        if energy >= 0:
+            high_capacity = self._high_capacity * degradation.health
+            overcharge = min(0, new_energy - high_capacity)
+            self._energy = min(high_capacity, new_energy)
+        else:
+            low_capacity = self._low_capacity * degradation.health
+            overcharge = max(0, low_capacity - new_energy)
+            self._energy = max(low_capacity, new_energy)
+        degradation.update(
+            self._energy - previous_energy,
+            self._energy / self._capacity,
+            self._capacity,
+        )
+        return overcharge
+
+    def get_overcharge_cost(self, overcharge: float) -> float:
+        """
+        Compute the overcharge cost for not meeting the optimal battery thresholds
+
+        Args:
+            overcharge (float): The quantity of energy outside the correct range.
+
+        Returns:
+            float: The corresponding cost for underoptimal operation of the battery
+        """
+        return overcharge * self._overcharge_penalty
+
+
+class Grid:  # pylint: disable=too-many-instance-attributes
+    """
+    Models the grid, its costs and prices
+    ...
+
+    Attributes
+    ----------
+    import_prices : List[float]
+        The timeserie for import prices (one price per timestep)
+    export_prices : List[float]
+        The timeserie for export prices (one price per timestep)
+    import_prices_factor : float
+        A scaling factor to easily modify the import prices.
+    export_prices_factor : float
+        A scaling factor to easily modify the export prices.
+    __len__ (property) : int
+        The length of timeseries for safety checks
+
+    Methods
+    -------
+    get_cost : Get the running cost for a given timestep and energy to be \
+        bought/sold
+    """
+
+    __slots__ = (
+        "config_",
+        "_config",
+        "import_prices_",
+        "export_prices_",
+        "_import_price_factor",
+        "_export_price_factor",
+        "_import_prices",
+        "_export_prices",
+        "_import_scenario",
+        "_export_scenario",
+        "_import_buffer",
+        "_export_buffer",
+    )
+
+    __copy__ = copy_component
+
+    def __init__(self, grid_config: GridConfig, delta_t: float = 1.0) -> None:
+        """
+        Creates the relevant attributes based on the config
+
+        Args:
+            grid_config (GridConfig): Configuration for the grid.
+            delta_t (float, optional): The duration (hours) of a timestep, the \
+                prices are resampled to it. Defaults to 1.0.
+        """
+        self.config_ = grid_config
+        self._config: Optional[GridConfig] = None
+        self.import_prices_ = load_data(grid_config.import_prices, delta_t=delta_t)
+        self.export_prices_ = load_data(grid_config.export_prices, delta_t=delta_t)
+        self._import_scenario: Optional[np.ndarray] = None
+        self._export_scenario: Optional[np.ndarray] = None
+        self._import_buffer = ScaleBuffer()
+        self._export_buffer = ScaleBuffer()
+        # the factor setters build the scaled timeseries cache
+        self.import_price_factor = grid_config.import_price_factor
+        self.export_price_factor = grid_config.export_price_factor
+
+        if len(self.import_prices) != len(self.export_prices):
+            raise ValueError(
+                f"Price timeseries are not of the same length \
+                    \n import : {len(self.import_prices)} \
+                    \n export : {len(self.export_prices)} "
+            )
+
+    @property
+    def config(self) -> GridConfig:
+        """
+        Returns:
+            GridConfig: An immutable snapshot of the current grid config, only \
+                validated and rebuilt after a factor was modified
+        """
+        if self._config is None:
+            config = GridConfig.parse_obj(
+                {
+                    "import_prices": self.config_.import_prices,
+                    "export_prices": self.config_.export_prices,
+                    "import_price_factor": self.import_price_factor,
+                    "export_price_factor": self.export_price_factor,
+                }
+            )
+            self._config = freeze(config)
+        return self._config
+
+    def get_cost(self, t: int, energy: float) -> float:
+        """
+        Get the cost for operating the grid with the required amount of energy
+
+        Args:
+            t (int): The timestep for which the costs must be computed
+            energy (float): Energy to be sold (-) or bought (+)
+
+        Returns:
+            float: The cost in euros, positive is loss, negative is gain
+        """
+        if energy >= 0:
+            cost = self._import_prices[t] * energy
+        else:
+            cost = self._export_prices[t] * energy
+        return cost
+
+    def get_import_price(self, t: int) -> float:
+        """
+        Args:
+            t (int): The timestep for which to return the price
+
+        Returns:
+            float: The (scaled) import price at the given timestep
+        """
+        return self._import_prices[t]
+
+    def get_export_price(self, t: int) -> float:
+        """
+        Args:
+            t (int): The timestep for which to return the price
+
+        Returns:
+            float: The (scaled) export price at the given timestep
+        """
+        return self._export_prices[t]
+
+    @property
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: The length of prices series for safety checks
+        """
+        return len(self._import_prices)
+
+    @property
+    def import_price_factor(self) -> float:
+        """
+        Returns:
+            float: The scaling factor of the import prices
+        """
+        return self._import_price_factor
+
+    @import_price_factor.setter
+    def import_price_factor(self, factor: float) -> None:
+        self._import_price_factor = factor
+        self._import_prices = (
+            scale(self.import_prices_, factor)
+            if self._import_scenario is None
+            else self._import_buffer.scale(self._import_scenario, factor)
+        )
+        self._config = None
+
+    @property
+    def export_price_factor(self) -> float:
+        """
+        Returns:
+            float: The scaling factor of the export prices
+        """
+        return self._export_price_factor
+
+    @export_price_factor.setter
+    def export_price_factor(self, factor: float) -> None:
+        self._export_price_factor = factor
+        self._export_prices = (
+            scale(self.export_prices_, factor)
+            if self._export_scenario is None
+            else self._export_buffer.scale(self._export_scenario, factor)
+        )
+        self._config = None
+
+    def set_scenario(
+        self,
+        import_prices: Optional[np.ndarray] = None,
+        export_prices: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Replace the prices by perturbed versions, or restore the original ones.
+
+        Args:
+            import_prices (Optional[np.ndarray], optional): The unscaled import\
+                prices. Defaults to None (original prices).
+            export_prices (Optional[np.ndarray], optional): The unscaled export\
+                prices. Defaults to None (original prices).
+        """
+        # the original prices are only rescaled when restoring them
+        if import_prices is not None or self._import_scenario is not None:
+            self._import_scenario = import_prices
+            self._import_prices = (
+                scale(self.import_prices_, self._import_price_factor)
+                if import_prices is None
+                else self._import_buffer.scale(import_prices, self._import_price_factor)
+            )
+        if export_prices is not None or self._export_scenario is not None:
+            self._export_scenario = export_prices
+            self._export_prices = (
+                scale(self.export_prices_, self._export_price_factor)
+                if export_prices is None
+                else self._export_buffer.scale(export_prices, self._export_price_factor)
+            )
+
+    @property
+    def import_prices(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The import prices timeserie rescaled. Cached, it is \
+                only rebuilt when the factor changes.
+        """
+        return self._import_prices
+
+    @property
+    def export_prices(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The export prices timeserie rescaled. Cached, it is \
+                only rebuilt when the factor changes.
+        """
+        return self._export_prices
+
+
+class Photovoltaic:
+    """
+    Models the photovoltaic local production
+    ...
+
+    Attributes
+    ----------
+    pv_production_ts_ : List[float]
+        The timeserie for pv_production prices (power available per timestep).
+    production_factor : float
+        A scaling factor to easily modify the pv production.
+    __len__ (property) : int
+        The length of timeseries for safety checks.
+
+    Methods
+    -------
+    get_cost : Get the power produced by PV for a given timestep.
+    """
+
+    __slots__ = (
+        "config_",
+        "_config",
+        "pv_production_ts_",
+        "_production_factor",
+        "_pv_production_ts",
+        "_mean",
+        "_scenario",
+        "_buffer",
+    )
+
+    __copy__ = copy_component
+
+    def __init__(self, pv_config: PvConfig, delta_t: float = 1.0) -> None:
+        """
+        Creates the relevant attributes based on the config
+
+        Args:
+            pv_config (PvConfig): Configuration for the PV.
+            delta_t (float, optional): The duration (hours) of a timestep, the \
+                production is resampled to it. Defaults to 1.0.
+        """
+        self.config_ = pv_config  # to fix path at init
+        self._config: Optional[PvConfig] = None
+        self.pv_production_ts_ = load_data(pv_config.pv_production_ts, delta_t=delta_t)
+        self._scenario: Optional[np.ndarray] = None
+        self._buffer = ScaleBuffer()
+        # the factor setter builds the scaled timeseries cache
+        self.production_factor = pv_config.production_factor
+
+    @property
+    def config(self) -> PvConfig:
+        """
+
+        Returns:
+            PvConfig: An immutable snapshot of the current pv config, only \
+                validated and rebuilt after the factor was modified
+        """
+        if self._config is None:
+            config = PvConfig.parse_obj(
+                {
+                    "pv_production_ts": self.config_.pv_production_ts,
+                    "production_factor": self.production_factor,
+                }
+            )
+            self._config = freeze(config)
+        return self._config
+
+    @property
+    def production_factor(self) -> float:
+        """
+        Returns:
+            float: The scaling factor of the pv production
+        """
+        return self._production_factor
+
+    @production_factor.setter
+    def production_factor(self, factor: float) -> None:
+        self._production_factor = factor
+        pv_production_ts = scale(self.pv_production_ts_, factor)
+        self._mean = float(np.mean(pv_production_ts))
+        self._pv_production_ts = (
+            pv_production_ts
+            if self._scenario is None
+            else self._buffer.scale(self._scenario, factor)
+        )
+        self._config = None
+
+    def set_scenario(self, timeserie: Optional[np.ndarray] = None) -> None:
+        """
+        Replace the production by a perturbed version, or restore the original \
+            one. The mean production stays the one of the original timeserie.
+
+        Args:
+            timeserie (Optional[np.ndarray], optional): The unscaled production.\
+                Defaults to None (original production).
+        """
+        if timeserie is None and self._scenario is None:
+            return
+        self._scenario = timeserie
+        self._pv_production_ts = (
+            scale(self.pv_production_ts_, self._production_factor)
+            if timeserie is None
+            else self._buffer.scale(timeserie, self._production_factor)
+        )
+
+    @property
+    def pv_production_ts(self) -> np.ndarray:
+        """
+        Returns:
+            Union[List[float], np.ndarray]: The production timeserie rescaled.\
+                Cached, it is only rebuilt when the factor changes.
+        """
+        return self._pv_production_ts
+
+    @property
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: The length of pv production serie for safety checks
+        """
+        return len(self._pv_production_ts)
+
+    @property
+    def __mean__(self) -> float:
+        """
+        Returns:
+            float: The mean of the pv production accross the timeserie
+        """
+        return self._mean
+
+    def get_power(self, t: int) -> float:
+        """
+        Method to get the power produced for the given timestep.\
+            Not really interesting, it exists for an easier framework.
+
+        Args:
+            t (int): the timestep for which to return power
+
+        Returns:
+            float: the corresponding produced photovoltaic power.
+        """
+        return self._pv_production_ts[t]
+
+
+class Load:  # pylint: disable=too-many-instance-attributes
+    """
+    Models the local consumption of energy
+    ...
+
+    Attributes
+    ----------
+    load_ts_ : List[float]
+        The timeserie for load requirements (power required per timestep).
+    load_factor : float
+        A scaling factor to easily modify the load requirement.
+    __len__ (property) : int
+        The length of timeseries for safety checks.
+
+    Methods
+    -------
+    get_load : Get the load required for a given timestep
+    """
+
+    __slots__ = (
+        "config_",
+        "_config",
+        "load_ts_",
+        "_load_factor",
+        "_load_ts",
+        "_mean",
+        "_max",
+        "_scenario",
+        "_buffer",
+    )
+
+    __copy__ = copy_component
+
+    def __init__(self, load_config: LoadConfig, delta_t: float = 1.0) -> None:
+        """
+        Creates the relevant attributes based on the config
+
+        Args:
+            load_config (LoadConfig): Configuration for the load.
+            delta_t (float, optional): The duration (hours) of a timestep, the \
+                load is resampled to it. Defaults to 1.0.
+        """
+        self.config_ = load_config
+        self._config: Optional[LoadConfig] = None
+        self.load_ts_ = load_data(load_config.load_ts, delta_t=delta_t)
+        self._scenario: Optional[np.ndarray] = None
+        self._buffer = ScaleBuffer()
+        # the factor setter builds the scaled timeseries cache
+        self.load_factor = load_config.load_factor
+
+    @property
+    def config(self) -> LoadConfig:
+        """
+        Returns:
+            LoadConfig: An immutable snapshot of the current load config, only \
+                validated and rebuilt after the factor was modified
+        """
+        if self._config is None:
+            config = LoadConfig.parse_obj(
+                {
+                    "load_ts": self.config_.load_ts,
+                    "load_factor": self.load_factor,
+                }
+            )
+            self._config = freeze(config)
+        return self._config
+
+    @property
+    def load_factor(self) -> float:
+        """
+        Returns:
+            float: The scaling factor of the load
+        """
+        return self._load_factor
+
+    @load_factor.setter
+    def load_factor(self, factor: float) -> None:
+        self._load_factor = factor
+        load_ts = scale(self.load_ts_, factor)
+        self._mean = float(np.mean(load_ts))
+        self._max = float(np.max(load_ts))
+        self._load_ts = (
+            load_ts
+            if self._scenario is None
+            else self._buffer.scale(self._scenario, factor)
+        )
+        self._config = None
+
+    def set_scenario(self, timeserie: Optional[np.ndarray] = None) -> None:
+        """
+        Replace the load by a perturbed version, or restore the original one. \
+            The mean and max load (used to size the microgrid and scale the \
+            actions) stay the ones of the original timeserie.
+
+        Args:
+            timeserie (Optional[np.ndarray], optional): The unscaled load. \
+                Defaults to None (original load).
+        """
+        if timeserie is None and self._scenario is None:
+            return
+        self._scenario = timeserie
+        self._load_ts = (
+            scale(self.load_ts_, self._load_factor)
+            if timeserie is None
+            else self._buffer.scale(timeserie, self._load_factor)
+        )
+
+    @property
+    def load_ts(self) -> np.ndarray:
+        """
+        Returns:
+            Union[List[float], np.ndarray]: The load timeserie rescaled.\
+                Cached, it is only rebuilt when the factor changes.
+        """
+        return self._load_ts
+
+    @property
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: The length of the load timeserie
+        """
+        return len(self._load_ts)
+
+    @property
+    def __mean__(self) -> float:
+        """
+        Returns:
+            float: The mean of the load accross the timeserie
+        """
+        return self._mean
+
+    @property
+    def __max__(self) -> float:
+        """
+        Returns:
+            float: The max of the load accross the timeserie
+        """
+        return self._max
+
+    def get_load(self, t: int) -> float:
+        """
+        Method to get the load required for the given timestep.\
+            Not really interesting, it exists for an easier framework.
+
+        Args:
+            t (int): the timestep for which to return load
+        Returns:
+            float: the corresponding load required by the local network
+        """
+        return self._load_ts[t]
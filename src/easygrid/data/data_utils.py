@@ -2,33 +2,271 @@
 External data handling helpers
 """
 
+import hashlib
 import os
+import tempfile
+from contextlib import suppress
+from glob import escape, glob
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 import numpy as np
-import pandas as pd
+
+from easygrid.data.shared import (
+    attach,
+    checksum,
+    is_shared,
+    publish,
+    published,
+    shared_path,
+)
+from easygrid.types import MicrogridConfig
 
 DATA_FOLDER = os.path.dirname(__file__)
 
+# duration (hours) of a timestep of the timeseries files
+DATA_DELTA_T = 1.0
+
+_CHECKSUMS: Dict[Tuple[str, int, int], str] = {}
+
 
-def load_data(path: Path) -> np.ndarray:
+def load_data(
+    path: Path,
+    cache: bool = True,
+    cache_folder: Optional[str] = None,
+    delta_t: float = DATA_DELTA_T,
+) -> np.ndarray:
     """
-    Read the data based on the file path
+    Read the data based on the file path. The csv is only parsed once and then\
+        cached as a .npy file which is memory-mapped, so that all processes \
+        share the same pages. Paths starting with "shm:" reference timeseries \
+        published in shared memory (see easygrid.data.shared).
+    Timeseries are resampled to the given resolution (see resample), once per \
+        file version and resolution when cached.
 
     Args:
-        file (path to the correct file): _description_
+        path (Path): path to the csv file
+        cache (bool, optional): Wether or not to use the .npy cache. \
+            Defaults to True.
+        cache_folder (Optional[str], optional): Where to store the cached files.\
+            Defaults to None (see get_cache_folder).
+        delta_t (float, optional): The duration (hours) of a timestep. \
+            Defaults to DATA_DELTA_T (no resampling).
 
     Raises:
-        ValueError: _description_
+        ValueError: If the file is not a csv file
 
     Returns:
-        list: _description_
+        np.ndarray: The (read-only if cached or shared) timeserie
     """
+    if is_shared(path):
+        return resample(attach(str(path)), delta_t)
     if not str(path).endswith(".csv"):
         raise ValueError(f"The given path to file is not a csv file : {path}")
+    if not cache:
+        return resample(read_csv(path), delta_t)
+    cache_folder = cache_folder or get_cache_folder()
+    cache_file = get_cache_file(path, cache_folder, delta_t)
+    if not os.path.exists(cache_file):
+        remove_stale_files(path, cache_folder)
+        if delta_t == DATA_DELTA_T:
+            data = read_csv(path)
+        else:
+            data = resample(load_data(path, cache, cache_folder), delta_t)
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            # write then rename so that concurrent processes never read a \
+            # partial file
+            with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(cache_file), suffix=".npy", delete=False
+            ) as tmp_file:
+                np.save(tmp_file, data)
+            os.replace(tmp_file.name, cache_file)
+        except OSError:
+            return data
+    return np.load(cache_file, mmap_mode="r")
+
+
+def read_csv(path: Path) -> np.ndarray:
+    """
+    Parse a single column csv file (with a header line) with numpy, falling \
+        back to pandas for files numpy can't handle (e.g. missing values).
+
+    Args:
+        path (Path): path to the csv file
+
+    Returns:
+        np.ndarray: The timeserie
+    """
+    try:
+        data = np.loadtxt(path, dtype=np.float64, delimiter=",", skiprows=1, ndmin=1)
+    except ValueError:
+        return read_csv_legacy(path)
+    if data.ndim != 1:
+        return read_csv_legacy(path)
+    return data
+
+
+def read_csv_legacy(path: Path) -> np.ndarray:
+    """
+    Parse a single column csv file with pandas, which is only imported here.
+
+    Args:
+        path (Path): path to the csv file
+
+    Returns:
+        np.ndarray: The timeserie
+    """
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
     data = pd.read_csv(path)
     assert len(data.columns) == 1
-    return np.array(data.values.flatten())
+    return np.array(data.values.flatten(), dtype=np.float64)
+
+
+def get_cache_folder() -> str:
+    """
+    Get the folder of the cached files, read when called so that it can be \
+        changed at runtime (e.g. by tests).
+
+    Returns:
+        str: The EASYGRID_CACHE_DIR environment variable if set, otherwise \
+            ~/.cache/easygrid
+    """
+    return os.environ.get(
+        "EASYGRID_CACHE_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "easygrid"),
+    )
+
+
+def get_cache_prefixes(path: Path) -> Tuple[str, str]:
+    """
+    Get the prefixes of the names of the cache files of a csv file, keyed by \
+        its path and by its version (modification time and size).
+
+    Args:
+        path (Path): path to the csv file
+
+    Returns:
+        Tuple[str, str]: The prefix of the cache files of all the versions of \
+            the file, and of its current version
+    """
+    stat = os.stat(path)
+    path_digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()
+    version = f"{stat.st_mtime_ns}|{stat.st_size}".encode("utf-8")
+    prefix = f"{Path(path).stem}_{path_digest[:16]}"
+    return prefix, f"{prefix}_{hashlib.sha1(version).hexdigest()[:8]}"
+
+
+def get_cache_file(path: Path, cache_folder: str, delta_t: float = DATA_DELTA_T) -> str:
+    """
+    Get the cache file of a csv file, keyed by its path, modification time and\
+        size so that modified files are parsed again, and by its resolution.
+
+    Args:
+        path (Path): path to the csv file
+        cache_folder (str): Where the cached files are stored
+        delta_t (float, optional): The duration (hours) of a timestep. \
+            Defaults to DATA_DELTA_T.
+
+    Returns:
+        str: The path to the .npy cache file
+    """
+    _, prefix = get_cache_prefixes(path)
+    resolution = "" if delta_t == DATA_DELTA_T else f"_{delta_t:g}h"
+    return os.path.join(cache_folder, f"{prefix}{resolution}.npy")
+
+
+def remove_stale_files(path: Path, cache_folder: str) -> None:
+    """
+    Remove the cache files of the previous versions of a csv file, at all \
+        resolutions. Processes which memory-mapped them keep their data.
+
+    Args:
+        path (Path): path to the csv file
+        cache_folder (str): Where the cached files are stored
+    """
+    prefix, version_prefix = get_cache_prefixes(path)
+    for file in glob(os.path.join(cache_folder, f"{escape(prefix)}_*.npy")):
+        if not os.path.basename(file).startswith(version_prefix):
+            with suppress(OSError):
+                os.remove(file)
+
+
+def get_n_steps(length: int, delta_t: float, data_delta_t: float = DATA_DELTA_T) -> int:
+    """
+    Args:
+        length (int): The number of timesteps of a timeserie
+        delta_t (float): The duration (hours) of the resampled timesteps
+        data_delta_t (float, optional): The duration (hours) of the timesteps of\
+            the timeserie. Defaults to DATA_DELTA_T.
+
+    Returns:
+        int: The number of complete timesteps of the resampled timeserie
+    """
+    return int(np.floor(length * data_delta_t / delta_t + 1e-9))
+
+
+def resample(
+    data: np.ndarray, delta_t: float, data_delta_t: float = DATA_DELTA_T
+) -> np.ndarray:
+    """
+    Resample a timeserie of mean powers (or prices) over each timestep: \
+        averaged over coarser timesteps so that energies are conserved, or \
+        linearly interpolated between the centers of finer timesteps. An \
+        incomplete last timestep is dropped.
+
+    Args:
+        data (np.ndarray): The timeserie
+        delta_t (float): The duration (hours) of the resampled timesteps
+        data_delta_t (float, optional): The duration (hours) of the timesteps of\
+            the timeserie. Defaults to DATA_DELTA_T.
+
+    Returns:
+        np.ndarray: The resampled timeserie (the timeserie itself if the \
+            resolutions are the same)
+    """
+    if delta_t <= 0:
+        raise ValueError(f"The duration of a timestep must be positive ({delta_t})")
+    if delta_t == data_delta_t:
+        return data
+    data = np.asarray(data, dtype=np.float64)
+    n_steps = get_n_steps(len(data), delta_t, data_delta_t)
+    if delta_t > data_delta_t:
+        # integral of the piecewise constant timeserie at the new boundaries
+        integral = np.concatenate(([0.0], np.cumsum(data) * data_delta_t))
+        boundaries = np.interp(
+            np.arange(n_steps + 1) * delta_t,
+            np.arange(len(data) + 1) * data_delta_t,
+            integral,
+        )
+        return np.diff(boundaries) / delta_t
+    return np.interp(
+        (np.arange(n_steps) + 0.5) * delta_t,
+        (np.arange(len(data)) + 0.5) * data_delta_t,
+        data,
+    )
+
+
+def get_checksum(path: Path) -> str:
+    """
+    Get the checksum of the data of a timeserie, so that a csv file and its \
+        shared memory copy have the same checksum. It is computed once per file\
+        version (path, modification time and size).
+
+    Args:
+        path (Path): path to the csv file, or "shm:" path of a shared timeserie
+
+    Returns:
+        str: The sha1 of the float64 data
+    """
+    if is_shared(path):
+        return checksum(str(path))
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _CHECKSUMS:
+        _CHECKSUMS[key] = hashlib.sha1(load_data(path).tobytes()).hexdigest()
+    return _CHECKSUMS[key]
 
 
 def get_indexes(data_folder) -> dict:
@@ -65,3 +303,34 @@ def get_index(data_folder) -> list:
         for f in os.listdir(data_folder)
         if f.endswith(".csv")
     ]
+
+
+def share_config(config: MicrogridConfig) -> MicrogridConfig:
+    """
+    Publish all the timeseries of a config and return a copy of the config \
+        referencing them, so that workers attach to them instead of loading them.
+    Timeseries are named after a hash of their path so that configs sharing \
+        files share the same segments.
+
+    Args:
+        config (MicrogridConfig): The config referencing csv files
+
+    Returns:
+        MicrogridConfig: The config referencing the shared timeseries
+    """
+    config = config.copy(deep=True)
+    for component, field in (
+        (config.grid, "import_prices"),
+        (config.grid, "export_prices"),
+        (config.pv, "pv_production_ts"),
+        (config.load, "load_ts"),
+    ):
+        path = getattr(component, field)
+        if is_shared(path):
+            continue
+        resolved_path = str(Path(path).resolve()).encode("utf-8")
+        name = hashlib.sha1(resolved_path).hexdigest()[:16]
+        if name not in published():
+            publish(name, load_data(path))
+        setattr(component, field, shared_path(name))
+    return config
@@ -0,0 +1,194 @@
+"""
+Shared-memory registry of timeseries, allowing processes of an env pool to \
+attach to the same data instead of each loading their own copy
+"""
+import atexit
+import hashlib
+import warnings
+from multiprocessing import resource_tracker  # type: ignore[attr-defined]
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+SHARED_PREFIX = "shm:"
+SEGMENT_PREFIX = "easygrid_"
+HEADER_SIZE = 16  # length of the serie (int64) + padding
+
+_PUBLISHED: Dict[str, SharedMemory] = {}
+_ATTACHED: Dict[str, SharedMemory] = {}
+_CHECKSUMS: Dict[str, str] = {}
+
+
+def _segment_name(name: str) -> str:
+    return SEGMENT_PREFIX + name
+
+
+def shared_path(name: str) -> Path:
+    """
+    Args:
+        name (str): The name of a published timeserie
+
+    Returns:
+        Path: The path to use in configs to reference the timeserie
+    """
+    return Path(SHARED_PREFIX + name)
+
+
+def is_shared(path: Union[str, Path]) -> bool:
+    """
+    Args:
+        path (Union[str, Path]): A path from a config
+
+    Returns:
+        bool: Wether or not the path references a published timeserie
+    """
+    return str(path).startswith(SHARED_PREFIX)
+
+
+def _strip_prefix(name: Union[str, Path]) -> str:
+    name = str(name)
+    return name.split(":", 1)[1] if is_shared(name) else name
+
+
+def _as_array(segment: SharedMemory) -> np.ndarray:
+    length = int(np.ndarray((1,), dtype=np.int64, buffer=segment.buf)[0])
+    data: np.ndarray = np.ndarray(
+        (length,), dtype=np.float64, buffer=segment.buf, offset=HEADER_SIZE
+    )
+    data.flags.writeable = False
+    return data
+
+
+def publish(name: str, data: np.ndarray) -> Path:
+    """
+    Publish a timeserie in shared memory under the given name. It stays \
+        available until unpublished or until the publishing process exits.
+
+    Args:
+        name (str): The name of the timeserie
+        data (np.ndarray): The timeserie
+
+    Returns:
+        Path: The path to use in configs to reference the timeserie
+    """
+    if name in _PUBLISHED:
+        raise ValueError(f"A timeserie is already published under {name}")
+    data = np.asarray(data, dtype=np.float64).ravel()
+    segment = SharedMemory(
+        name=_segment_name(name), create=True, size=HEADER_SIZE + data.nbytes
+    )
+    np.ndarray((1,), dtype=np.int64, buffer=segment.buf)[0] = len(data)
+    shared_data: np.ndarray = np.ndarray(
+        data.shape, dtype=np.float64, buffer=segment.buf, offset=HEADER_SIZE
+    )
+    shared_data[:] = data
+    _PUBLISHED[name] = segment
+    return shared_path(name)
+
+
+def attach(name: str) -> np.ndarray:
+    """
+    Attach to a published timeserie without copying it.
+
+    Args:
+        name (str): The name of the timeserie, with or without the "shm:" prefix
+
+    Returns:
+        np.ndarray: A read-only view of the timeserie
+    """
+    name = _strip_prefix(name)
+    if name in _PUBLISHED:
+        return _as_array(_PUBLISHED[name])
+    if name not in _ATTACHED:
+        segment = SharedMemory(name=_segment_name(name), create=False)
+        # The segment is owned by the publishing process: prevent the resource \
+        # tracker from unlinking it when this process exits.
+        # pylint: disable-next=protected-access
+        tracked_name = segment._name  # type: ignore[attr-defined]
+        resource_tracker.unregister(tracked_name, "shared_memory")
+        _ATTACHED[name] = segment
+    return _as_array(_ATTACHED[name])
+
+
+def detach(name: str) -> None:
+    """
+    Release the attachment of this process to a published timeserie. Arrays \
+        obtained from attach must not be used afterwards.
+
+    Args:
+        name (str): The name of the timeserie, with or without the "shm:" prefix
+    """
+    name = _strip_prefix(name)
+    _CHECKSUMS.pop(name, None)
+    segment = _ATTACHED.pop(name, None)
+    if segment is not None:
+        segment.close()
+
+
+def unpublish(name: str) -> None:
+    """
+    Remove a timeserie published by this process from shared memory. Arrays \
+        obtained from attach must not be used afterwards.
+
+    Args:
+        name (str): The name of the timeserie
+    """
+    _CHECKSUMS.pop(name, None)
+    segment = _PUBLISHED.pop(name)
+    segment.close()
+    segment.unlink()
+
+
+def checksum(name: str) -> str:
+    """
+    Get the checksum of a published timeserie, computed once per name until it\
+        is detached or unpublished.
+
+    Args:
+        name (str): The name of the timeserie, with or without the "shm:" prefix
+
+    Returns:
+        str: The sha1 of the float64 data
+    """
+    name = _strip_prefix(name)
+    if name not in _CHECKSUMS:
+        _CHECKSUMS[name] = hashlib.sha1(attach(name).tobytes()).hexdigest()
+    return _CHECKSUMS[name]
+
+
+def published() -> List[str]:
+    """
+    Returns:
+        List[str]: The names of the timeseries currently published by this \
+            process
+    """
+    return list(_PUBLISHED)
+
+
+def cleanup() -> List[str]:
+    """
+    Detach from all timeseries and unpublish the ones published by this process.
+
+    Returns:
+        List[str]: The names of the timeseries that were unpublished
+    """
+    for name in list(_ATTACHED):
+        detach(name)
+    names = published()
+    for name in names:
+        unpublish(name)
+    return names
+
+
+def _cleanup_at_exit() -> None:
+    leaked = cleanup()
+    if leaked:
+        warnings.warn(
+            f"Shared timeseries were not unpublished before exit: {leaked}",
+            ResourceWarning,
+        )
+
+
+atexit.register(_cleanup_at_exit)
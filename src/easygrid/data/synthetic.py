@@ -0,0 +1,291 @@
+"""
+Vectorized generation of batches of synthetic timeseries (prices, load, pv) \
+with seasonality, noise and spikes, and their publication in shared memory so \
+that configs can reference them without csv files
+"""
+from math import pi
+from pathlib import Path
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from easygrid.data.shared import publish
+from easygrid.types import MicrogridConfig
+
+Parameter = Union[float, Sequence[float], np.ndarray]
+Seed = Union[None, int, np.random.SeedSequence, np.random.Generator]
+
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 7 * HOURS_PER_DAY
+HOURS_PER_YEAR = 365 * HOURS_PER_DAY
+
+
+def _per_scenario(value: Parameter, n_scenarios: int) -> np.ndarray:
+    """
+    Args:
+        value (Parameter): A parameter shared by all scenarios, or one value \
+            per scenario
+        n_scenarios (int): The number of scenarios
+
+    Returns:
+        np.ndarray: A (1, 1) or (n_scenarios, 1) array broadcasting over \
+            timesteps
+    """
+    value = np.asarray(value, dtype=np.float64)
+    if value.ndim == 0:
+        return value.reshape(1, 1)
+    if value.shape != (n_scenarios,):
+        raise ValueError(
+            f"Parameters must be scalars or of shape ({n_scenarios},), got \
+                {value.shape}"
+        )
+    return value[:, None]
+
+
+def get_hours(n_steps: int, delta_t: float = 1.0) -> np.ndarray:
+    """
+    Args:
+        n_steps (int): The number of timesteps
+        delta_t (float, optional): The duration (hours) of a timestep. \
+            Defaults to 1.0.
+
+    Returns:
+        np.ndarray: The (1, n_steps) time (hours) of each timestep
+    """
+    return (np.arange(n_steps) * delta_t)[None, :]
+
+
+def seasonality(
+    hours: np.ndarray,
+    period: float,
+    amplitude: Parameter,
+    peak: Parameter,
+    n_scenarios: int = 1,
+) -> np.ndarray:
+    """
+    Cosine variation around 0 peaking at the given time of each period
+
+    Args:
+        hours (np.ndarray): The (1, n_steps) time of each timestep, see get_hours
+        period (float): The period (hours) of the variation
+        amplitude (Parameter): The amplitude of the variation
+        peak (Parameter): The time (hours) of the period of the maximum
+        n_scenarios (int, optional): The number of scenarios. Defaults to 1.
+
+    Returns:
+        np.ndarray: The (1 or n_scenarios, n_steps) variations
+    """
+    amplitude = _per_scenario(amplitude, n_scenarios)
+    peak = _per_scenario(peak, n_scenarios)
+    return amplitude * np.cos(2 * pi / period * (hours - peak))
+
+
+def generate_timeseries(
+    n_scenarios: int = 1,
+    n_steps: int = HOURS_PER_YEAR,
+    mean: Parameter = 1.0,
+    daily_amplitude: Parameter = 0.0,
+    daily_peak: Parameter = 12.0,
+    weekly_amplitude: Parameter = 0.0,
+    weekly_peak: Parameter = 84.0,
+    noise: Parameter = 0.0,
+    spike_probability: float = 0.0,
+    spike_scale: Parameter = 0.0,
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    delta_t: float = 1.0,
+    seed: Seed = None,
+) -> np.ndarray:
+    """
+    Generate a batch of timeseries (e.g. prices or load): a mean with daily and\
+        weekly cosine seasonalities, gaussian noise and exponential spikes. \
+        All parameters but spike_probability can be scalars or one value per \
+        scenario.
+    The default prices of easygrid (import_prices_artificial.csv) are \
+        generate_timeseries(mean=8, daily_amplitude=2, daily_peak=15).
+
+    Args:
+        n_scenarios (int, optional): The number of timeseries. Defaults to 1.
+        n_steps (int, optional): The number of timesteps. Defaults to 8760.
+        mean (Parameter, optional): The mean value. Defaults to 1.0.
+        daily_amplitude (Parameter, optional): The amplitude of the daily \
+            variation. Defaults to 0.0.
+        daily_peak (Parameter, optional): The hour of the day of the daily \
+            maximum. Defaults to 12.0.
+        weekly_amplitude (Parameter, optional): The amplitude of the weekly \
+            variation. Defaults to 0.0.
+        weekly_peak (Parameter, optional): The hour of the week (from the first\
+            timestep) of the weekly maximum. Defaults to 84.0.
+        noise (Parameter, optional): The standard deviation of the gaussian \
+            noise. Defaults to 0.0.
+        spike_probability (float, optional): The probability of a spike at each\
+            timestep. Defaults to 0.0.
+        spike_scale (Parameter, optional): The mean height of the spikes \
+            (exponentially distributed, negative for drops). Defaults to 0.0.
+        min_value (Optional[float], optional): The values are clipped to this \
+            minimum. Defaults to None.
+        max_value (Optional[float], optional): The values are clipped to this \
+            maximum. Defaults to None.
+        delta_t (float, optional): The duration (hours) of a timestep. \
+            Defaults to 1.0.
+        seed (Seed, optional): The seed (or generator) of the random stream. \
+            Defaults to None.
+
+    Returns:
+        np.ndarray: The (n_scenarios, n_steps) timeseries
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    rng = np.random.default_rng(seed)
+    hours = get_hours(n_steps, delta_t)
+    series = np.empty((n_scenarios, n_steps))
+    series[:] = _per_scenario(mean, n_scenarios)
+    series += seasonality(
+        hours, HOURS_PER_DAY, daily_amplitude, daily_peak, n_scenarios
+    )
+    series += seasonality(
+        hours, HOURS_PER_WEEK, weekly_amplitude, weekly_peak, n_scenarios
+    )
+    if np.any(np.asarray(noise) != 0):
+        series += _per_scenario(noise, n_scenarios) * rng.standard_normal(series.shape)
+    if spike_probability > 0:
+        # only draw the positions of the spikes instead of one sample per step
+        n_spikes = rng.binomial(series.size, spike_probability)
+        spikes = rng.choice(series.size, n_spikes, replace=False)
+        scale = np.broadcast_to(
+            _per_scenario(spike_scale, n_scenarios), (n_scenarios, 1)
+        )
+        heights = scale[spikes // n_steps, 0] * rng.standard_exponential(n_spikes)
+        series.ravel()[spikes] += heights
+    if min_value is not None or max_value is not None:
+        np.clip(series, min_value, max_value, out=series)
+    return series
+
+
+def generate_pv(
+    n_scenarios: int = 1,
+    n_steps: int = HOURS_PER_YEAR,
+    peak: Parameter = 1.0,
+    sunrise: float = 6.0,
+    sunset: float = 20.0,
+    annual_amplitude: Parameter = 0.3,
+    cloudiness: Parameter = 0.5,
+    delta_t: float = 1.0,
+    seed: Seed = None,
+) -> np.ndarray:
+    """
+    Generate a batch of pv production timeseries: a half sine between sunrise \
+        and sunset, modulated by an annual seasonality (maximum at the summer \
+        solstice, assuming the first timestep is on january 1st) and a random \
+        daily cloud cover.
+
+    Args:
+        n_scenarios (int, optional): The number of timeseries. Defaults to 1.
+        n_steps (int, optional): The number of timesteps. Defaults to 8760.
+        peak (Parameter, optional): The production at noon on a clear day \
+            without seasonality. Defaults to 1.0.
+        sunrise (float, optional): The hour of the sunrise. Defaults to 6.0.
+        sunset (float, optional): The hour of the sunset. Defaults to 20.0.
+        annual_amplitude (Parameter, optional): The relative amplitude of the \
+            annual variation. Defaults to 0.3.
+        cloudiness (Parameter, optional): The maximum relative production lost\
+            to clouds each day. Defaults to 0.5.
+        delta_t (float, optional): The duration (hours) of a timestep. \
+            Defaults to 1.0.
+        seed (Seed, optional): The seed (or generator) of the random stream. \
+            Defaults to None.
+
+    Returns:
+        np.ndarray: The (n_scenarios, n_steps) non-negative timeseries
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    rng = np.random.default_rng(seed)
+    hours = get_hours(n_steps, delta_t)
+    hour_of_day = hours % HOURS_PER_DAY
+    daylight = np.where(
+        (hour_of_day >= sunrise) & (hour_of_day <= sunset),
+        np.sin(pi * (hour_of_day - sunrise) / (sunset - sunrise)),
+        0.0,
+    )
+    series = _per_scenario(peak, n_scenarios) * daylight
+    series = series * (
+        1
+        + seasonality(
+            hours, HOURS_PER_YEAR, annual_amplitude, 172 * HOURS_PER_DAY, n_scenarios
+        )
+    )
+    days = (hours[0] // HOURS_PER_DAY).astype(np.int64)
+    clouds = 1 - _per_scenario(cloudiness, n_scenarios) * rng.random(
+        (n_scenarios, int(days[-1]) + 1 if n_steps else 0)
+    )
+    series = series * clouds[:, days]
+    return np.maximum(series, 0, out=series)
+
+
+def publish_scenarios(name: str, data: np.ndarray) -> List[Path]:
+    """
+    Publish each timeserie of a batch in shared memory, as name_0, name_1, ...
+
+    Args:
+        name (str): The prefix of the names of the timeseries
+        data (np.ndarray): The (n_scenarios, n_steps) timeseries
+
+    Returns:
+        List[Path]: The paths to use in configs to reference the timeseries
+    """
+    return [
+        publish(f"{name}_{i}", serie) for i, serie in enumerate(np.atleast_2d(data))
+    ]
+
+
+def synthetic_configs(
+    base_config: MicrogridConfig,
+    name: str,
+    import_prices: Optional[np.ndarray] = None,
+    export_prices: Optional[np.ndarray] = None,
+    pv: Optional[np.ndarray] = None,
+    load: Optional[np.ndarray] = None,
+) -> List[MicrogridConfig]:
+    """
+    Build one config per scenario referencing the given synthetic timeseries \
+        (published in shared memory, see publish_scenarios), the other \
+        timeseries being those of the base config. The timeseries must have \
+        max_timestep steps, and stay published until unpublished (see \
+        easygrid.data.shared.cleanup) or until this process exits.
+
+    Args:
+        base_config (MicrogridConfig): The config to modify
+        name (str): The prefix of the names of the published timeseries
+        import_prices (Optional[np.ndarray], optional): The (n_scenarios, \
+            n_steps) import prices. Defaults to None.
+        export_prices (Optional[np.ndarray], optional): The export prices. \
+            Defaults to None.
+        pv (Optional[np.ndarray], optional): The pv production. \
+            Defaults to None.
+        load (Optional[np.ndarray], optional): The load. Defaults to None.
+
+    Returns:
+        List[MicrogridConfig]: The configs of the scenarios
+    """
+    # pylint: disable=too-many-arguments
+    fields = {
+        ("grid", "import_prices"): import_prices,
+        ("grid", "export_prices"): export_prices,
+        ("pv", "pv_production_ts"): pv,
+        ("load", "load_ts"): load,
+    }
+    fields = {
+        key: np.atleast_2d(data) for key, data in fields.items() if data is not None
+    }
+    if not fields:
+        raise ValueError("No timeserie given")
+    n_scenarios = {len(data) for data in fields.values()}
+    if len(n_scenarios) != 1:
+        raise ValueError(
+            f"The timeseries must have the same number of scenarios ({n_scenarios})"
+        )
+    configs = [base_config.copy(deep=True) for _ in range(n_scenarios.pop())]
+    for (component, field), data in fields.items():
+        paths = publish_scenarios(f"{name}_{field}", data)
+        for config, path in zip(configs, paths):
+            setattr(getattr(config, component), field, path)
+    return configs
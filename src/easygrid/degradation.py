@@ -0,0 +1,347 @@
+"""
+Online battery degradation: capacity fade from the depth of the charge cycles, \
+counted by a streaming rainflow counter, and from the energy throughput
+"""
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from easygrid.types import DegradationConfig
+
+Value = Union[float, np.ndarray]
+
+
+def get_fade(
+    damage: Value,
+    throughput: Value,
+    capacity: Value,
+    cycle_life: Value,
+    end_of_life: Value,
+    throughput_fade: Value,
+) -> Value:
+    """
+    Args:
+        damage (Value): The sum of depth ** dod_exponent of the counted cycles
+        throughput (Value): The energy charged and discharged
+        capacity (Value): The nominal capacity
+        cycle_life (Value): The number of full cycles until the end of life
+        end_of_life (Value): The relative capacity at the end of life
+        throughput_fade (Value): The relative capacity lost per equivalent \
+            full cycle (twice the capacity of throughput)
+
+    Returns:
+        Value: The relative capacity lost
+    """
+    # pylint: disable=too-many-arguments
+    return (1 - end_of_life) * damage / cycle_life + (
+        throughput_fade * throughput / (2 * capacity)
+    )
+
+
+class RainflowCounter:
+    """
+    Streaming rainflow counter (4-point method): values are added one at a \
+        time, reversals are kept on a stack and a full cycle is counted as soon\
+        as it is closed. Each reversal is pushed and popped at most once, so \
+        the amortized cost of add is O(1) and the history is never scanned \
+        again. The residual (unclosed half cycles) stays on the stack.
+    ...
+
+    Attributes
+    ----------
+    exponent : float
+        The damage of a cycle is its depth ** exponent
+    damage : float
+        The damage of the counted cycles
+    n_cycles : int
+        The number of counted cycles
+
+    Methods
+    -------
+    add : Add the next value of the signal
+    reset : Restart the count from a value
+    """
+
+    __slots__ = ("exponent", "damage", "n_cycles", "_reversals", "_last", "_direction")
+
+    def __init__(self, exponent: float = 1.0, value: float = 0.0) -> None:
+        """
+        Args:
+            exponent (float, optional): The damage of a cycle is its \
+                depth ** exponent. Defaults to 1.0.
+            value (float, optional): The first value of the signal. \
+                Defaults to 0.0.
+        """
+        self.exponent = exponent
+        self.damage = 0.0
+        self.n_cycles = 0
+        self._reversals: List[float] = [value]
+        self._last = value
+        self._direction = 0
+
+    def reset(self, value: float = 0.0) -> None:
+        """
+        Forget the counted cycles and restart from a value
+
+        Args:
+            value (float, optional): The first value of the signal. \
+                Defaults to 0.0.
+        """
+        self.damage = 0.0
+        self.n_cycles = 0
+        self._reversals = [value]
+        self._last = value
+        self._direction = 0
+
+    def add(self, value: float) -> float:
+        """
+        Args:
+            value (float): The next value of the signal
+
+        Returns:
+            float: The damage of the cycles closed by this value
+        """
+        delta = value - self._last
+        if delta == 0:
+            return 0.0
+        direction = 1 if delta > 0 else -1
+        damage = 0.0
+        if self._direction not in (0, direction):
+            # the previous value is a reversal
+            reversals = self._reversals
+            reversals.append(self._last)
+            while len(reversals) >= 4:
+                first, start, end, last = (
+                    reversals[-4],
+                    reversals[-3],
+                    reversals[-2],
+                    reversals[-1],
+                )
+                depth = abs(end - start)
+                if depth > abs(start - first) or depth > abs(last - end):
+                    break
+                damage += depth**self.exponent
+                self.n_cycles += 1
+                del reversals[-3:-1]
+            self.damage += damage
+        self._direction = direction
+        self._last = value
+        return damage
+
+
+class Degradation:
+    """
+    Degradation of a battery, updated at each timestep: the state of health is \
+        1 - (1 - end_of_life) * cycle damage / cycle_life - throughput_fade * \
+        equivalent full cycles, the damage of a cycle of depth d being \
+        d ** dod_exponent (see DegradationConfig).
+    ...
+
+    Attributes
+    ----------
+    config : DegradationConfig
+        The degradation model
+    counter : RainflowCounter
+        The counter of the state of charge cycles
+    throughput : float
+        The energy charged and discharged since the last reset
+    health : float
+        The remaining fraction of the nominal capacity
+
+    Methods
+    -------
+    update : Account for a change of the stored energy
+    reset : Restore a new battery
+    """
+
+    __slots__ = ("config", "counter", "throughput", "health")
+
+    def __init__(self, config: DegradationConfig, state_of_charge: float = 0.0):
+        """
+        Args:
+            config (DegradationConfig): The degradation model
+            state_of_charge (float, optional): The initial state of charge. \
+                Defaults to 0.0.
+        """
+        self.config = config
+        self.counter = RainflowCounter(config.dod_exponent, state_of_charge)
+        self.throughput = 0.0
+        self.health = 1.0
+
+    def reset(self, state_of_charge: float = 0.0) -> None:
+        """
+        Restore a new battery
+
+        Args:
+            state_of_charge (float, optional): The initial state of charge. \
+                Defaults to 0.0.
+        """
+        self.counter.reset(state_of_charge)
+        self.throughput = 0.0
+        self.health = 1.0
+
+    def update(self, delta: float, state_of_charge: float, capacity: float) -> float:
+        """
+        Args:
+            delta (float): The energy stored (+) or discharged (-)
+            state_of_charge (float): The new stored energy over the nominal \
+                capacity
+            capacity (float): The nominal capacity
+
+        Returns:
+            float: The state of health
+        """
+        if delta != 0:
+            self.throughput += abs(delta)
+            self.counter.add(state_of_charge)
+            config = self.config
+            fade = get_fade(
+                self.counter.damage,
+                self.throughput,
+                capacity,
+                config.cycle_life,
+                config.end_of_life,
+                config.throughput_fade,
+            )
+            self.health = max(0.0, 1 - float(fade))
+        return self.health
+
+
+class BatchDegradation:  # pylint: disable=too-many-instance-attributes
+    """
+    Degradation of N batteries, with the same model as Degradation. The \
+        rainflow stacks are held in an (N, depth) array so that all batteries \
+        are counted in a few numpy calls per timestep.
+    ...
+
+    Attributes
+    ----------
+    damage : np.ndarray
+        The damage of the counted cycles of each battery (N,)
+    n_cycles : np.ndarray
+        The number of counted cycles of each battery (N,)
+    throughput : np.ndarray
+        The energy charged and discharged by each battery (N,)
+    health : np.ndarray
+        The remaining fraction of the nominal capacity of each battery (N,)
+
+    Methods
+    -------
+    update : Account for changes of the stored energies
+    reset : Restore new batteries
+    """
+
+    def __init__(
+        self,
+        configs: Sequence[Optional[DegradationConfig]],
+        state_of_charge: np.ndarray,
+    ) -> None:
+        """
+        Args:
+            configs (Sequence[Optional[DegradationConfig]]): The degradation \
+                model of each battery, None for batteries that don't degrade
+            state_of_charge (np.ndarray): The initial states of charge (N,)
+        """
+        n_grids = len(configs)
+        # batteries without degradation never lose capacity
+        default = DegradationConfig(cycle_life=np.inf, end_of_life=1.0)
+        configs = [default if config is None else config for config in configs]
+        self.cycle_life = np.array([config.cycle_life for config in configs])
+        self.end_of_life = np.array([config.end_of_life for config in configs])
+        self.dod_exponent = np.array([config.dod_exponent for config in configs])
+        self.throughput_fade = np.array([config.throughput_fade for config in configs])
+        self._reversals = np.empty((n_grids, 16))
+        self._n_reversals = np.zeros(n_grids, dtype=np.int64)
+        self._last = np.zeros(n_grids)
+        self._direction = np.zeros(n_grids, dtype=np.int8)
+        self.damage = np.zeros(n_grids)
+        self.n_cycles = np.zeros(n_grids, dtype=np.int64)
+        self.throughput = np.zeros(n_grids)
+        self.health = np.ones(n_grids)
+        self.reset(np.ones(n_grids, dtype=bool), state_of_charge)
+
+    def reset(self, mask: np.ndarray, state_of_charge: np.ndarray) -> None:
+        """
+        Restore new batteries
+
+        Args:
+            mask (np.ndarray): Boolean (N,) array of the batteries to reset
+            state_of_charge (np.ndarray): The initial states of charge (N,)
+        """
+        self._reversals[mask, 0] = state_of_charge[mask]
+        self._n_reversals[mask] = 1
+        self._last[mask] = state_of_charge[mask]
+        self._direction[mask] = 0
+        self.damage[mask] = 0
+        self.n_cycles[mask] = 0
+        self.throughput[mask] = 0
+        self.health[mask] = 1
+
+    def _push(self, rows: np.ndarray, values: np.ndarray) -> None:
+        if np.any(self._n_reversals[rows] == self._reversals.shape[1]):
+            self._reversals = np.concatenate(
+                [self._reversals, np.empty_like(self._reversals)], axis=1
+            )
+        self._reversals[rows, self._n_reversals[rows]] = values
+        self._n_reversals[rows] += 1
+
+    def _count(self, rows: np.ndarray) -> None:
+        """
+        Count the cycles closed by the reversals just pushed
+
+        Args:
+            rows (np.ndarray): The batteries with a new reversal
+        """
+        while rows.size:
+            rows = rows[self._n_reversals[rows] >= 4]
+            size = self._n_reversals[rows]
+            first, start, end, last = (
+                self._reversals[rows, size - offset] for offset in (4, 3, 2, 1)
+            )
+            depth = np.abs(end - start)
+            closed = (depth <= np.abs(start - first)) & (depth <= np.abs(last - end))
+            rows, size, depth, last = (
+                rows[closed],
+                size[closed],
+                depth[closed],
+                last[closed],
+            )
+            self.damage[rows] += depth ** self.dod_exponent[rows]
+            self.n_cycles[rows] += 1
+            self._reversals[rows, size - 3] = last
+            self._n_reversals[rows] -= 2
+
+    def update(
+        self, delta: np.ndarray, state_of_charge: np.ndarray, capacity: np.ndarray
+    ) -> np.ndarray:
+        """
+        Args:
+            delta (np.ndarray): The energies stored (+) or discharged (-) (N,)
+            state_of_charge (np.ndarray): The new stored energies over the \
+                nominal capacities (N,)
+            capacity (np.ndarray): The nominal capacities (N,)
+
+        Returns:
+            np.ndarray: The states of health (N,)
+        """
+        self.throughput += np.abs(delta)
+        direction = np.sign(state_of_charge - self._last).astype(np.int8)
+        moving = direction != 0
+        # the previous values of the batteries changing direction are reversals
+        rows = np.flatnonzero(
+            moving & (self._direction != 0) & (direction != self._direction)
+        )
+        self._push(rows, self._last[rows])
+        self._direction[moving] = direction[moving]
+        self._last[moving] = state_of_charge[moving]
+        self._count(rows)
+        fade = get_fade(
+            self.damage,
+            self.throughput,
+            capacity,
+            self.cycle_life,
+            self.end_of_life,
+            self.throughput_fade,
+        )
+        self.health = np.maximum(0.0, 1 - fade)
+        return self.health
@@ -3,12 +3,17 @@ This module creates the gym environment wrapped arround the microgrid core
 """
 
 from abc import abstractmethod
-from typing import Tuple, Union
+from itertools import cycle
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
 
 import gym
 import numpy as np
 from gym import spaces
+from gym.vector import VectorEnv
 
+from easygrid.batch import BatchMicrogrid
+from easygrid.data.data_utils import DATA_FOLDER, get_indexes
 from easygrid.microgrid import Microgrid
 from easygrid.types import MicrogridConfig
 
@@ -35,16 +40,30 @@ class GridEnv(gym.Env):
 
     metadata = {"render.modes": ["human"]}
 
-    def __init__(self, config: Union[MicrogridConfig, dict]) -> None:
+    def __init__(
+        self,
+        config: Union[MicrogridConfig, dict],
+        max_logged_episodes: Optional[int] = None,
+        debug: bool = False,
+    ) -> None:
 
         """
         Creates the relevant attributes based on the config
 
         Args:
             config (dict): Configuration for the underlying microgrid.
+            max_logged_episodes (Optional[int], optional): The maximum number of \
+                episodes to retain in the microgrid logs. Defaults to None \
+                (no limit).
+            debug (bool, optional): Wether or not the microgrid checks its \
+                invariants at every step. Defaults to False.
         """
         super().__init__()
-        self.microgrid = Microgrid(MicrogridConfig.parse_obj(config))
+        self.microgrid = Microgrid(
+            MicrogridConfig.parse_obj(config),
+            max_logged_episodes=max_logged_episodes,
+            debug=debug,
+        )
         self.observation_space = spaces.Box(
             low=self.microgrid.min_values,
             high=self.microgrid.max_values,
@@ -95,6 +114,19 @@ class GridEnv(gym.Env):
         """
         return self.microgrid.reset()
 
+    def seed(self, seed: Optional[int] = None) -> List[Optional[int]]:
+        """
+        Seed the random generator used to sample the episodes start.
+
+        Args:
+            seed (Optional[int], optional): The seed. Defaults to None.
+
+        Returns:
+            List[Optional[int]]: The seed used
+        """
+        self.microgrid.seed(seed)
+        return [seed]
+
     def render(self, mode="human"):
         """TBD
 
@@ -130,3 +162,196 @@ class GridEnv(gym.Env):
         """
         reward = sum(costs)
         return reward
+
+
+class VectorGridEnv(VectorEnv):
+    """
+    Vectorized Gym Environment of several microgrids, backed by BatchMicrogrid.
+    All sub-environments are stepped in a single numpy call and automatically\
+        reset when done.
+
+    ...
+
+    Attributes
+    ----------
+    microgrids : easygrid.batch.BatchMicrogrid
+        The underlying batched microgrid object which will actually handle the \
+             computations. See this class for more details
+    Methods
+    -------
+    step : executes the (num_envs, 2) actions and returns the batched \
+        observations, rewards, dones and infos
+    reset : resets all environments to their initial state and returns the \
+        batched observations.
+    """
+
+    def __init__(
+        self,
+        configs: Union[MicrogridConfig, dict, Sequence[Union[MicrogridConfig, dict]]],
+        num_envs: Optional[int] = None,
+    ) -> None:
+        """
+        Creates the relevant attributes based on the configs
+
+        Args:
+            configs (Union[MicrogridConfig, dict, List]): One configuration per \
+                sub-environment, or a single configuration to be replicated.
+            num_envs (Optional[int], optional): The number of sub-environments \
+                when a single configuration is given. Defaults to None.
+        """
+        parsed: Union[MicrogridConfig, List[MicrogridConfig]]
+        if isinstance(configs, (list, tuple)):
+            parsed = [MicrogridConfig.parse_obj(config) for config in configs]
+        else:
+            parsed = MicrogridConfig.parse_obj(configs)
+        self.microgrids = BatchMicrogrid(parsed, n_grids=num_envs)
+        single_observation_space = spaces.Box(
+            low=self.microgrids.min_values.min(axis=0),
+            high=self.microgrids.max_values.max(axis=0),
+            dtype=np.float32,
+        )
+        single_action_space = spaces.Box(
+            low=-1,
+            high=1,
+            shape=(self.microgrids.max_actions.shape[1],),
+            dtype=np.float32,
+        )
+        super().__init__(
+            len(self.microgrids), single_observation_space, single_action_space
+        )
+        self.observation_space = spaces.Box(
+            low=self.microgrids.min_values,
+            high=self.microgrids.max_values,
+            dtype=np.float32,
+        )
+        self.action_space = spaces.Box(
+            low=-1,
+            high=1,
+            shape=(self.num_envs, single_action_space.shape[0]),
+            dtype=np.float32,
+        )
+        self._actions = np.zeros(self.action_space.shape, dtype=np.float32)
+        # returned by the steps where no sub-environment is done
+        self._empty_infos: List[dict] = [{} for _ in range(self.num_envs)]
+
+    @classmethod
+    def from_profiles(
+        cls,
+        config: Union[MicrogridConfig, dict],
+        num_envs: int,
+        load_profiles: Optional[List[str]] = None,
+        pv_profiles: Optional[List[str]] = None,
+    ) -> "VectorGridEnv":
+        """
+        Creates the environment by cycling through load and pv profiles, by \
+            default the ones bundled in easygrid's data folder.
+
+        Args:
+            config (Union[MicrogridConfig, dict]): The base configuration
+            num_envs (int): The number of sub-environments
+            load_profiles (Optional[List[str]], optional): The load files to \
+                cycle through. Defaults to None (bundled load data).
+            pv_profiles (Optional[List[str]], optional): The pv files to cycle \
+                through. Defaults to None (bundled pv data).
+
+        Returns:
+            VectorGridEnv: The vectorized environment
+        """
+        indexes = get_indexes(DATA_FOLDER)
+        # the given profiles keep their order, env i gets profile i
+        loads = cycle(load_profiles or sorted(indexes["load"]))
+        pvs = cycle(pv_profiles or sorted(indexes["pv"]))
+        base_config = MicrogridConfig.parse_obj(config)
+        configs: List[MicrogridConfig] = []
+        for _ in range(num_envs):
+            env_config = base_config.copy(deep=True)
+            env_config.load.load_ts = Path(next(loads))
+            env_config.pv.pv_production_ts = Path(next(pvs))
+            configs.append(env_config)
+        return cls(configs)
+
+    def seed(self, seeds: Union[None, int, List[Optional[int]]] = None) -> None:
+        """
+        Seed the random generators used to sample the episodes start of the \
+            sub-environments.
+
+        Args:
+            seeds (Union[None, int, List[Optional[int]]], optional): The seed of\
+                all the sub-environments, or one seed per sub-environment. \
+                Defaults to None.
+        """
+        self.microgrids.seed(seeds)
+
+    def reset_wait(
+        self,
+        seed: Union[None, int, List[Optional[int]]] = None,
+        options: Optional[dict] = None,
+        **kwargs,
+    ) -> np.ndarray:
+        """
+        Resets all sub-environments to their initial state.
+
+        Args:
+            seed (Union[None, int, List[Optional[int]]], optional): The seeds \
+                of the sub-environments, applied before the reset when given \
+                (see seed). Defaults to None.
+            options (Optional[dict], optional): Unused. Defaults to None.
+
+        Returns:
+            np.ndarray: The (num_envs, 5) observations
+        """
+        # pylint: disable=unused-argument
+        if seed is not None:
+            self.seed(seed)
+        return self.microgrids.reset()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        """
+        Stores the actions to be executed by step_wait
+
+        Args:
+            actions (np.ndarray): The (num_envs, 2) actions
+        """
+        self._actions = np.asarray(actions)
+
+    def step_wait(
+        self, **kwargs
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[dict]]:
+        """
+        Executes the stored actions on all sub-environments, and resets the ones\
+            that are done. The last observation of an episode is stored in the \
+            info of the corresponding sub-environment as "terminal_observation".
+            When no sub-environment is done, the same list of empty infos is \
+            returned at each step: it must not be modified.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray, List[dict]]: The \
+                observations, rewards, dones and infos following gym template
+        """
+        # pylint: disable=unused-argument
+        observations, dones, costs = self.microgrids.run_timestep(self._actions)
+        rewards = costs.sum(axis=1)
+        done = np.flatnonzero(dones)
+        if not done.size:
+            return observations, rewards, dones, self._empty_infos
+        infos = list(self._empty_infos)
+        for i in done:
+            infos[i] = {"terminal_observation": observations[i]}
+        observations = self.microgrids.reset(mask=dones)
+        return observations, rewards, dones, infos
+
+    def render(self, mode="human"):
+        """TBD
+
+        Args:
+            mode (str, optional): _description_. Defaults to "human".
+
+        Raises:
+            NotImplementedError: _description_
+        """
+        raise NotImplementedError
+
+    def close_extras(self, **kwargs) -> None:
+        """
+        Nothing to release, all sub-environments live in the same process.
+        """
@@ -0,0 +1,512 @@
+"""
+Preallocated columnar buffers for logging the microgrid operation, and sinks\
+    streaming them to disk
+"""
+import csv
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from glob import glob
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class LogBuffer:  # pylint: disable=too-many-instance-attributes
+    """
+    Columnar log buffer preallocated as a numpy array, with one row per logged\
+        timestep and an episode index column.
+    ...
+
+    When a maximum number of episodes is given, only the rows of the latest \
+        episodes are retained: the rows of the oldest episode are dropped as a\
+        whole when a new episode starts. Each row is written once, the \
+        retained rows are moved back to the start of the buffer when it is \
+        full, so that they are always contiguous and can be returned as views.
+    When a sink is given, rows are flushed to it in chunks and removed from \
+        the buffer.
+    Views are zero-copy: they reflect the buffer content at the time they are\
+        read and may be overwritten (rows moved back) or detached (buffer \
+        growth) by later appends.
+
+    Attributes
+    ----------
+    fields : List[str]
+        The names of the logged columns
+    last_episode : Optional[int]
+        The episode index of the last logged row, None if no row was logged
+    episodes (property) : np.ndarray
+        The episode index of each retained row
+
+    Methods
+    -------
+    append : Log a single row
+    extend : Log several rows at once
+    clear : Remove all rows
+    flush : Send the rows to the sink and remove them from the buffer
+    to_dict : Get the retained rows as a dict of column views
+    get_last_episode : Get the retained rows of the last episode
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        fields: List[str],
+        size: int,
+        max_episodes: Optional[int] = None,
+        sink: Optional["LogSink"] = None,
+        name: str = "logs",
+    ) -> None:
+        """
+        Preallocates the buffer
+
+        Args:
+            fields (List[str]): The names of the logged columns
+            size (int): The number of rows to preallocate
+            max_episodes (Optional[int], optional): The maximum number of \
+                episodes to retain, the oldest episodes being dropped. Episode \
+                indexes must be logged in non-decreasing order. Defaults to \
+                None (no limit, the buffer grows as needed).
+            sink (Optional[LogSink], optional): The sink to which rows are \
+                flushed every sink.chunk_size rows. Defaults to None.
+            name (str, optional): The name of the buffer in the sink. \
+                Defaults to "logs".
+        """
+        if max_episodes is not None and max_episodes < 1:
+            raise ValueError(f"At least one episode must be retained ({max_episodes})")
+        self.fields = list(fields)
+        self._columns = {name: i for i, name in enumerate(self.fields)}
+        self.max_episodes = max_episodes
+        self.sink = sink
+        self.name = name
+        self.last_episode: Optional[int] = None
+        if sink is not None:
+            size = sink.chunk_size
+        size = max(size, 1)
+        self._data = np.empty((size, len(self.fields)), dtype=np.float64)
+        self._episodes = np.empty(size, dtype=np.int64)
+        # episode index and first row of each retained episode
+        self._starts: Deque[Tuple[int, int]] = deque()
+        self._start = 0
+        self._end = 0
+        # number of rows of the last episode removed by clear or flush
+        self._removed = 0
+
+    def clear(self) -> None:
+        """
+        Remove all rows from the buffer, without releasing memory
+        """
+        if self._starts:
+            self._removed += self._end - self._starts[-1][1]
+        self._start = 0
+        self._end = 0
+        self._starts.clear()
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def append(self, episode: int, values: Sequence[float]) -> None:
+        """
+        Log a single row
+
+        Args:
+            episode (int): The episode index of the row
+            values (Sequence[float]): The values of the row, in fields order
+        """
+        end = self._reserve(episode, 1)
+        self._data[end] = values
+        self._episodes[end] = episode
+        self._end = end + 1
+        if self.sink is not None and len(self) >= self.sink.chunk_size:
+            self.flush()
+
+    def extend(self, episode: int, columns: Dict[str, np.ndarray]) -> None:
+        """
+        Log several rows at once
+
+        Args:
+            episode (int): The episode index of the rows
+            columns (Dict[str, np.ndarray]): The values of the rows by field name
+        """
+        rows = np.column_stack([columns[name] for name in self.fields])
+        start = self._reserve(episode, len(rows))
+        end = start + len(rows)
+        self._data[start:end] = rows
+        self._episodes[start:end] = episode
+        self._end = end
+        if self.sink is not None and len(self) >= self.sink.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Send a copy of the retained rows to the sink and remove them from the \
+            buffer.
+        """
+        if self.sink is not None and len(self) > 0:
+            self.sink.submit(
+                self.name,
+                self.episodes.copy(),
+                {name: column.copy() for name, column in self.to_dict().items()},
+            )
+            self.clear()
+
+    def _reserve(self, episode: int, n_rows: int) -> int:
+        """
+        Make room for new rows after the retained ones, dropping the oldest \
+            episode if a new one starts and more would be retained than \
+            max_episodes.
+
+        Args:
+            episode (int): The episode index of the new rows
+            n_rows (int): The number of new rows
+
+        Returns:
+            int: The index of the first new row
+        """
+        if not self._starts or self._starts[-1][0] != episode:
+            if episode != self.last_episode:
+                self._removed = 0
+            self._starts.append((episode, self._end))
+            if self.max_episodes is not None and len(self._starts) > self.max_episodes:
+                self._starts.popleft()
+                self._start = self._starts[0][1]
+        self.last_episode = episode
+        if self._end + n_rows > len(self._data):
+            self._move(len(self) + n_rows)
+        return self._end
+
+    def _move(self, size: int) -> None:
+        """
+        Move the retained rows to the start of the buffer, reallocating it \
+            (doubling its size) if they would fill more than half of it, so \
+            that the copies are amortized.
+
+        Args:
+            size (int): The minimum number of rows needed
+        """
+        data, episodes = self._data, self._episodes
+        if 2 * size > len(data):
+            new_size = max(size, 2 * len(data))
+            data = np.empty((new_size, len(self.fields)), dtype=np.float64)
+            episodes = np.empty(new_size, dtype=np.int64)
+        start, end = self._start, self._end
+        data[: end - start] = self._data[start:end]
+        episodes[: end - start] = self._episodes[start:end]
+        self._starts = deque((episode, row - start) for episode, row in self._starts)
+        self._data, self._episodes = data, episodes
+        self._start, self._end = 0, end - start
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """
+        Args:
+            name (str): The name of the field
+
+        Returns:
+            np.ndarray: A view of the retained values of the field
+        """
+        start, end = self._start, self._end
+        return self._data[start:end, self._columns[name]]
+
+    @property
+    def episodes(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: A view of the episode index of the retained rows
+        """
+        start, end = self._start, self._end
+        return self._episodes[start:end]
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """
+        Returns:
+            Dict[str, np.ndarray]: Views of the retained values by field name
+        """
+        return {name: self[name] for name in self.fields}
+
+    def get_last_episode(self) -> Tuple[int, Dict[str, np.ndarray]]:
+        """
+        Get the rows of the last episode, which are the last retained rows, \
+            without scanning the episode index column.
+
+        Returns:
+            Tuple[int, Dict[str, np.ndarray]]: The number of rows of the \
+                episode no longer in the buffer (flushed to the sink or \
+                cleared), and views of its retained values by field name
+        """
+        end = self._end
+        start = self._starts[-1][1] if self._starts else end
+        return self._removed, {
+            name: self._data[start:end, column]
+            for name, column in self._columns.items()
+        }
+
+
+class LogSink(ABC):
+    """
+    Base class for sinks writing log chunks to local files. Chunks are written \
+        by a background thread so that stepping is not slowed down by disk I/O,\
+        at most max_pending chunks being queued at once.
+    ...
+
+    Attributes
+    ----------
+    directory : str
+        The folder where the chunks are written
+    chunk_size : int
+        The number of rows buffered before being written
+    max_pending : int
+        The maximum number of chunks queued, submitting another chunk waits \
+        for the oldest one to be written
+    extension : str
+        The extension of the chunk files
+
+    Methods
+    -------
+    submit : Queue a chunk to be written
+    write : Write a chunk to a file
+    read : Read a chunk from a file
+    flush : Wait for all queued chunks to be written
+    close : Write all queued chunks and stop the background thread
+    """
+
+    extension = ""
+
+    def __init__(
+        self, directory: str, chunk_size: int = 8760, max_pending: int = 2
+    ) -> None:
+        """
+        Args:
+            directory (str): The folder where the chunks are written
+            chunk_size (int, optional): The number of rows buffered before \
+                being written. Defaults to 8760.
+            max_pending (int, optional): The maximum number of chunks queued. \
+                Defaults to 2.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.max_pending = max(max_pending, 1)
+        self._chunks: Dict[str, int] = {}
+        self._pending: Deque[Future] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(
+        self, name: str, episodes: np.ndarray, columns: Dict[str, np.ndarray]
+    ) -> None:
+        """
+        Queue a chunk to be written by the background thread, after waiting for\
+            the oldest chunks if max_pending are already queued.
+
+        Args:
+            name (str): The name of the log (e.g. energies or costs)
+            episodes (np.ndarray): The episode index of the rows
+            columns (Dict[str, np.ndarray]): The values of the rows by field name
+
+        Raises:
+            Exception: The error raised when writing a previous chunk, if any
+        """
+        pending = self._pending
+        while pending and (pending[0].done() or len(pending) >= self.max_pending):
+            pending.popleft().result()
+        chunk = self._chunks.get(name, 0)
+        self._chunks[name] = chunk + 1
+        file_name = os.path.join(self.directory, f"{name}_{chunk:06d}.{self.extension}")
+        pending.append(self._executor.submit(self.write, file_name, episodes, columns))
+
+    @abstractmethod
+    def write(
+        self, file_name: str, episodes: np.ndarray, columns: Dict[str, np.ndarray]
+    ) -> None:
+        """
+        Write a chunk to a file
+
+        Args:
+            file_name (str): The file to write
+            episodes (np.ndarray): The episode index of the rows
+            columns (Dict[str, np.ndarray]): The values of the rows by field name
+        """
+
+    @staticmethod
+    @abstractmethod
+    def read(file_name: str) -> Dict[str, np.ndarray]:
+        """
+        Read a chunk from a file
+
+        Args:
+            file_name (str): The file to read
+
+        Returns:
+            Dict[str, np.ndarray]: The columns of the chunk, including "episode"
+        """
+
+    def flush(self) -> None:
+        """
+        Wait for all queued chunks to be written
+
+        Raises:
+            Exception: The error raised when writing a chunk, if any
+        """
+        while self._pending:
+            self._pending.popleft().result()
+
+    def close(self) -> None:
+        """
+        Wait for all queued chunks to be written and stop the background thread
+
+        Raises:
+            Exception: The error raised when writing a chunk, if any
+        """
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+
+class NpzLogSink(LogSink):
+    """
+    Sink writing log chunks as numpy .npz files
+    """
+
+    extension = "npz"
+
+    def write(
+        self, file_name: str, episodes: np.ndarray, columns: Dict[str, np.ndarray]
+    ) -> None:
+        np.savez(file_name, episode=episodes, **columns)
+
+    @staticmethod
+    def read(file_name: str) -> Dict[str, np.ndarray]:
+        with np.load(file_name) as chunk:
+            return dict(chunk)
+
+
+class CsvLogSink(LogSink):
+    """
+    Sink writing log chunks as csv files
+    """
+
+    extension = "csv"
+
+    def write(
+        self, file_name: str, episodes: np.ndarray, columns: Dict[str, np.ndarray]
+    ) -> None:
+        with open(file_name, "w", encoding="utf-8", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["episode", *columns])
+            writer.writerows(zip(episodes, *columns.values()))
+
+    @staticmethod
+    def read(file_name: str) -> Dict[str, np.ndarray]:
+        with open(file_name, encoding="utf-8", newline="") as csv_file:
+            reader = csv.reader(csv_file)
+            fields = next(reader)
+            data = np.array(list(reader), dtype=np.float64).reshape(-1, len(fields))
+        chunk = dict(zip(fields, data.T))
+        chunk["episode"] = chunk["episode"].astype(np.int64)
+        return chunk
+
+
+class ParquetLogSink(LogSink):
+    """
+    Sink writing log chunks as parquet files, requires pyarrow
+    """
+
+    extension = "parquet"
+
+    def __init__(
+        self, directory: str, chunk_size: int = 8760, max_pending: int = 2
+    ) -> None:
+        # pylint: disable=import-outside-toplevel, unused-import
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError as error:
+            raise ImportError("ParquetLogSink requires pyarrow") from error
+        super().__init__(directory, chunk_size, max_pending)
+
+    def write(
+        self, file_name: str, episodes: np.ndarray, columns: Dict[str, np.ndarray]
+    ) -> None:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table({"episode": episodes, **columns}), file_name)
+
+    @staticmethod
+    def read(file_name: str) -> Dict[str, np.ndarray]:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(file_name)
+        return {name: table[name].to_numpy() for name in table.column_names}
+
+
+SINKS = {sink.extension: sink for sink in (NpzLogSink, CsvLogSink, ParquetLogSink)}
+
+
+class LazyLog(Mapping):
+    """
+    Read-only mapping of the columns of a log written by a sink. Columns are \
+        only read from the chunk files when accessed, and then cached.
+    """
+
+    def __init__(self, files: List[str]) -> None:
+        """
+        Args:
+            files (List[str]): The chunk files of the log, in order
+        """
+        self.files = files
+        self._columns: Dict[str, np.ndarray] = {}
+        self._fields: Optional[List[str]] = None
+
+    def _read_all(self) -> List[str]:
+        chunks = [SINKS[file.rsplit(".", 1)[-1]].read(file) for file in self.files]
+        fields = list(chunks[0]) if chunks else []
+        self._columns = {
+            name: np.concatenate([chunk[name] for chunk in chunks]) for name in fields
+        }
+        self._fields = [name for name in fields if name != "episode"]
+        return self._fields
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            self._read_all()
+        return self._columns[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._read_all() if self._fields is None else self._fields)
+
+    def __len__(self) -> int:
+        return len(list(iter(self)))
+
+    @property
+    def episodes(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The episode index of the rows
+        """
+        return self["episode"]
+
+
+def read_logs(directory: str) -> dict:
+    """
+    Reconstruct the logs written by a sink, in the same format as \
+        Microgrid.get_logs. Files are only read when a column is accessed.
+
+    Args:
+        directory (str): The folder where the chunks were written
+
+    Returns:
+        dict: Costs and energies logs.
+    """
+    logs = {}
+    for name in ("costs", "energies"):
+        files = sorted(
+            file
+            for extension in SINKS
+            for file in glob(os.path.join(directory, f"{name}_*.{extension}"))
+        )
+        logs[name] = LazyLog(files)
+    return logs
@@ -1,9 +1,42 @@
 """
 Math utilitary functions
 """
-from math import pi, sin
+from math import pi
 from typing import Generator
 
+import numpy as np
+
+
+def hourly_variation(
+    max_val: float,
+    min_val: float,
+    period: float,
+    time_max: float,
+    time_min: float,
+    size: int,
+) -> np.ndarray:
+    """
+    Build a sin function out of the desired parameters to model an hourly \
+    variation of a variable, computed at once for all hours.
+
+    Args:
+        max_val (float): maximal amplitude of the variations
+        min_val (float): minimal amplitude of the variations
+        period (float): period of the signal
+        time_max (float): what time in the period should the max value happen
+        time_min (float): what time in the period should the min value happen
+        size (int): how much hours should be generated
+
+    Returns:
+        np.ndarray: The (size,) hourly variations of the desired form.
+    """
+    # pylint: disable=too-many-arguments
+    A = 0.5 * (max_val - min_val)
+    B = 2 * pi / period
+    d = 0.5 * (time_max + time_min)
+    c = 0.5 * (max_val + min_val)
+    return A * np.sin(B * (np.arange(size) - d)) + c
+
 
 def get_hourly_variation(
     max_val: float,
@@ -15,7 +48,8 @@ def get_hourly_variation(
 ) -> Generator[float, None, None]:
     """
     # Build a sin function out of the desired parameters to model an hourly \
-    # variation of a variable.
+    # variation of a variable. See hourly_variation for the array version, and\
+    # easygrid.data.synthetic for batches of synthetic timeseries.
 
     Args:
         max_val (float): maximal amplitude of the variations
@@ -31,9 +65,7 @@ def get_hourly_variation(
     Yields:
         Iterator[list]: The hourly variations of the desired form.
     """
-    A = 0.5 * (max_val - min_val)
-    d = 0.5 * (time_max + time_min)
-    c = 0.5 * (max_val + min_val)
-    for i in range(size):
-        B = 2 * pi / period
-        yield A * sin(B * (i - d)) + c
+    # pylint: disable=too-many-arguments
+    yield from hourly_variation(
+        max_val, min_val, period, time_max, time_min, size
+    ).tolist()
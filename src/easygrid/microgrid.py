@@ -1,22 +1,31 @@
 """
 This module creates thhe microgrid object
 """
-from typing import List, Optional, Tuple, Union
+import copy
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union, overload
 
-import matplotlib.pyplot as plt
 import numpy as np
 
-from easygrid.data.data_utils import DATA_FOLDER, get_indexes, load_data
-from easygrid.types import (
-    BatteryConfig,
-    GridConfig,
-    LoadConfig,
-    MicrogridConfig,
-    PvConfig,
+# the components were defined here, scale is re-exported for compatibility
+from easygrid.components import (  # noqa: F401  # pylint: disable=unused-import
+    Battery,
+    ConfigAttribute,
+    Grid,
+    Load,
+    Photovoltaic,
+    scale,
 )
+from easygrid.data.data_utils import DATA_FOLDER, get_indexes, get_n_steps
+from easygrid.logs import LogBuffer, LogSink
+from easygrid.observation import ObservationBuilder
+from easygrid.scenarios import SERIES_NAMES, ScenarioSampler
+from easygrid.types import MicrogridConfig, ObservationConfig, freeze
 
+if TYPE_CHECKING:  # matplotlib is only imported when plotting
+    import matplotlib.pyplot as plt
 
-class Microgrid:
+
+class Microgrid:  # pylint: disable=too-many-instance-attributes,too-many-public-methods
     """
     This class represents a microgrid and its components
         - Battery
@@ -34,74 +43,163 @@ class Microgrid:
     reset : resets the environment to an initial state and returns this state.
     """
 
-    # pylint: disable=too-many-instance-attributes
-    def __init__(self, config: MicrogridConfig) -> None:
+    overproduction_penalty = ConfigAttribute()
+    underproduction_penalty = ConfigAttribute()
+    episode_length = ConfigAttribute()
+    start_sampler = ConfigAttribute()
+    # set by _set_start, seed and _init_logs_ when initialized
+    t: int
+    rng: np.random.Generator
+    energies_log: LogBuffer
+    costs_log: LogBuffer
+
+    def __init__(
+        self,
+        config: MicrogridConfig,
+        max_logged_episodes: Optional[int] = None,
+        log_sink: Optional[LogSink] = None,
+        debug: bool = False,
+    ) -> None:
         """
         Creates the relevant attributes based on the config
 
         Args:
             config (dict): Configuration for the underlying microgrid.
+            max_logged_episodes (Optional[int], optional): The maximum number of \
+                episodes to retain in the logs, the oldest episodes being \
+                dropped as a whole. Defaults to None (no limit).
+            log_sink (Optional[LogSink], optional): A sink to which the logs are \
+                streamed in chunks instead of being kept in memory. \
+                Defaults to None.
+            debug (bool, optional): Wether or not to check the battery \
+                invariants at every step. Otherwise they are checked at once on\
+                the logs at the end of each episode (see check_logs). \
+                Defaults to False.
         """
         # battery_config: BatteryConfig = config.battery
         # grid_config: GridConfig = config.grid
         # pv_config: PvConfig = config.pv
         # load_config: LoadConfig = config.load
         self.indexes = get_indexes(data_folder=DATA_FOLDER)
+        self._config: Optional[MicrogridConfig] = None
+        self._config_parts: tuple = ()
 
-        self.battery = Battery(config.battery)
-        self.grid = Grid(config.grid)
-        self.pv = Photovoltaic(config.pv)
-        self.load = Load(config.load)
+        self.debug = debug
+        self.delta_t = config.delta_t
+        self.battery = Battery(config.battery, debug=debug)
+        self.grid = Grid(config.grid, delta_t=self.delta_t)
+        self.pv = Photovoltaic(config.pv, delta_t=self.delta_t)
+        self.load = Load(config.load, delta_t=self.delta_t)
 
         self.overproduction_penalty = config.overprod_penalty
         self.underproduction_penalty = config.underprod_penalty
-        self.MAX_TIMESTEP = config.max_timestep
-
-        self.t = 0
-        self.delta_t = 1
+        # number of timesteps of the data, of the timeseries at the microgrid \
+        # resolution and of the (looped) simulated horizon
+        self.max_timestep = config.max_timestep
+        if config.loops < 1:
+            raise ValueError(f"Loops must be at least 1 ({config.loops})")
+        self.loops = config.loops
+        self.period = get_n_steps(config.max_timestep, self.delta_t)
+        self.MAX_TIMESTEP = self.period * self.loops
+        self.steps_per_day = max(1, round(24 / self.delta_t))
+
+        self.episode = 0
+        self.episode_length = config.episode_length
+        self.start_sampler = config.start_sampler
+        self.seed(config.seed)
+        self._set_start(0)
+        self.scenarios = config.scenarios
+        self.scenario_sampler = get_scenario_sampler(
+            config, self.grid, self.pv, self.load
+        )
+        self.observation = ObservationBuilder(
+            self,
+            horizon=config.observation.horizon,
+            calendar_features=config.observation.calendar_features,
+        )
 
+        self.max_logged_episodes = max_logged_episodes
+        self.log_sink = log_sink
         self._init_logs_()
 
-        if self.grid.__len__ != self.MAX_TIMESTEP:
-            raise ValueError(
-                f"Prices timeseries lengths are different ({self.grid.__len__ }) with \
-                    the maximum number of timesteps ({self.MAX_TIMESTEP})"
-            )
-        if self.pv.__len__ != self.MAX_TIMESTEP:
-            raise ValueError(
-                f"PV production timeseries length is different ({self.pv.__len__ }) \
-                    with the maximum number of timesteps ({self.MAX_TIMESTEP})"
-            )
-
-        if self.load.__len__ != self.MAX_TIMESTEP:
+        check_lengths(self.period, self.grid, self.pv, self.load)
+        if self.max_start < 0:
             raise ValueError(
-                f"PV production timeseries length is different ({self.pv.__len__ }) \
-                    with the maximum number of timesteps ({self.MAX_TIMESTEP})"
+                f"Episode length ({self.episode_length}) is longer than the \
+                    timeseries ({self.MAX_TIMESTEP - 2})"
             )
 
     @property
     def config(self) -> MicrogridConfig:
         """
         Returns:
-            dict: The current microgrid config
-        """
+            MicrogridConfig: An immutable snapshot of the current microgrid \
+                config (use copy to modify it). It is cached, and only \
+                validated and rebuilt after a config attribute was modified.
+        """
+        battery = self.battery.config
+        grid = self.grid.config
+        load = self.load.config
+        pv = self.pv.config
+        parts = self._config_parts
+        if (
+            self._config is not None
+            and parts[0] is battery
+            and parts[1] is grid
+            and parts[2] is load
+            and parts[3] is pv
+        ):
+            return self._config
         config = MicrogridConfig.parse_obj(
             {
-                "battery": self.battery.config,
-                "grid": self.grid.config,
-                "load": self.load.config,
-                "pv": self.pv.config,
+                "battery": battery,
+                "grid": grid,
+                "load": load,
+                "pv": pv,
                 "overprod_penalty": self.overproduction_penalty,
                 "underprod_penalty": self.underproduction_penalty,
-                "max_timestep": self.MAX_TIMESTEP,
+                "max_timestep": self.max_timestep,
+                "delta_t": self.delta_t,
+                "loops": self.loops,
+                "observation": ObservationConfig(
+                    horizon=self.observation.horizon,
+                    calendar_features=self.observation.calendar_features,
+                ),
+                "episode_length": self.episode_length,
+                "start_sampler": self.start_sampler,
+                "seed": self._seed,
+                "scenarios": self.scenarios,
             }
         )
-        return config
+        self._config = freeze(config)
+        self._config_parts = (battery, grid, load, pv)
+        return self._config
 
     @property
     def __len__(self):
         return min(self.load.__len__, self.pv.__len__, self.grid.__len__)
 
+    @overload
+    def get_index(self, t: int) -> int:
+        ...
+
+    @overload
+    def get_index(self, t: np.ndarray) -> np.ndarray:
+        ...
+
+    def get_index(self, t: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+        """
+        Get the index in the timeseries of a timestep of the simulated horizon, \
+            which loops over the timeseries.
+
+        Args:
+            t (Union[int, np.ndarray]): The timestep(s)
+
+        Returns:
+            Union[int, np.ndarray]: The index (indices) in the timeseries
+        """
+        return t % self.period
+
     def scale_action(self, action: float, max_val, min_val) -> float:
         """
         Scale the action from [-1, 1] to the actual max min
@@ -117,7 +215,7 @@ class Microgrid:
         return ((action + 1) * 0.5 * (max_val - min_val)) + min_val
 
     def run_timestep(
-        self, action: np.ndarray, logging: bool = True
+        self, action: np.ndarray, logging: bool = True, observe: bool = True
     ) -> Tuple[np.ndarray, bool, Tuple[float, float, float]]:
         """
         Executes the action on the microgrid and computes the following state
@@ -127,29 +225,34 @@ class Microgrid:
                  it should contain:
                 - How much to store/discharge in the battery (float)
                 - How much to sell/buy from the grid (float)
+            logging (bool, optional): Wether or not to log the energies and \
+                costs. Defaults to True.
+            observe (bool, optional): Wether or not to build the flat \
+                observation, which copies the features window. Otherwise the \
+                zero-copy window (see forecast) is returned, for callers that \
+                don't keep nor mutate it. Defaults to True.
 
         Returns:
             Tuple[np.ndarray, bool]: The next state and terminal state flag
         """
+        # pylint: disable=too-many-locals
         # We need to cast to pydantic here as it connects to gym, and gym \
         # gives a np.array from the sample methods
         # if not (isinstance(action, Action)):
         #     action_dict = {"battery": action[0], "grid": action[1]}
         #     action = Action.parse_obj(action_dict)
         self.t += 1
-        energy_battery = self.scale_action(
-            action[0], self.max_actions[0], self.min_actions[0]
-        )
-        energy_grid = self.scale_action(
-            action[1], self.max_actions[1], self.min_actions[1]
-        )
-        energy_pv = self.pv.get_power(self.t) * self.delta_t
-        energy_load = self.load.get_load(self.t) * self.delta_t
+        max_actions = self.max_actions
+        energy_battery = self.scale_action(action[0], max_actions[0], -max_actions[0])
+        energy_grid = self.scale_action(action[1], max_actions[1], -max_actions[1])
+        index = self.t % self.period
+        energy_pv = self.pv.get_power(index) * self.delta_t
+        energy_load = self.load.get_load(index) * self.delta_t
         energy_balance = energy_pv + energy_grid - energy_load - energy_battery
 
         overcharge = self.battery.charge_discharge(energy_battery)
         overcharge_cost = self.battery.get_overcharge_cost(overcharge)
-        grid_cost = self.grid.get_cost(self.t, energy_grid)
+        grid_cost = self.grid.get_cost(index, energy_grid)
         error_cost = self.get_error_cost(energy_balance)
         costs = (overcharge_cost, grid_cost, error_cost)
         if logging:
@@ -157,7 +260,83 @@ class Microgrid:
                 energy_battery, energy_grid, energy_pv, energy_load, energy_balance
             )
             self.log_costs(*costs)
-        return self.obs, self.done, costs
+            if not self.debug and self.t >= self.end:
+                self.check_logs()
+        return (self.obs if observe else self.forecast), self.done, costs
+
+    def evaluate_actions(self, actions: np.ndarray, logging: bool = True) -> dict:
+        """
+        Executes a whole sequence of actions at once, starting from the current\
+            state. Equivalent to calling run_timestep for each action, but only \
+            the battery recurrence is computed sequentially.
+
+        Args:
+            actions (np.ndarray): The (T, 2) actions to be processed, each \
+                containing the battery and grid actions in [-1, 1]
+            logging (bool, optional): Wether or not to also append the results \
+                to the microgrid logs. Defaults to True.
+
+        Returns:
+            dict: Costs and energies of the evaluated actions, in the same \
+                format as get_logs
+        """
+        # pylint: disable=too-many-locals
+        actions = np.asarray(actions)
+        n_steps = len(actions)
+        if self.t + n_steps > self.end:
+            raise ValueError(
+                f"Too many actions ({n_steps}) for the remaining timesteps \
+                    ({self.end - self.t})"
+            )
+        timesteps = self.get_index(np.arange(self.t + 1, self.t + 1 + n_steps))
+        energies = scale_actions(actions, self.max_actions, self.min_actions)
+        energy_battery = energies[:, 0]
+        energy_grid = energies[:, 1]
+        energy_pv = self.pv.pv_production_ts[timesteps] * self.delta_t
+        energy_load = self.load.load_ts[timesteps] * self.delta_t
+        energy_balance = energy_pv + energy_grid - energy_load - energy_battery
+
+        overcharge = np.empty(n_steps)
+        stored = np.empty(n_steps)
+        battery = self.battery
+        for i, energy in enumerate(energy_battery.tolist()):
+            overcharge[i] = battery.charge_discharge(energy)
+            stored[i] = battery._energy  # pylint: disable=protected-access
+        overcharge_cost = overcharge * self.battery.overcharge_penalty
+        grid_cost = energy_grid * np.where(
+            energy_grid >= 0,
+            self.grid.import_prices[timesteps],
+            self.grid.export_prices[timesteps],
+        )
+        error_cost = energy_balance * np.where(
+            energy_balance >= 0,
+            self.overproduction_penalty,
+            self.underproduction_penalty,
+        )
+        self.t += n_steps
+
+        logs = {
+            "costs": {
+                "total": overcharge_cost + grid_cost + error_cost,
+                "overcharge": overcharge_cost,
+                "grid": grid_cost,
+                "error": error_cost,
+            },
+            "energies": {
+                "balance": energy_balance,
+                "battery": energy_battery,
+                "grid": energy_grid,
+                "pv": energy_pv,
+                "load": energy_load,
+                "stored": stored,
+            },
+        }
+        if logging:
+            self.energies_log.extend(self.episode, logs["energies"])
+            self.costs_log.extend(self.episode, logs["costs"])
+            if not self.debug and self.t >= self.end:
+                self.check_logs()
+        return logs
 
     def get_error_cost(self, energy_balance: float) -> float:
         """
@@ -177,13 +356,69 @@ class Microgrid:
 
     def _init_logs_(self):
         """
-        Initialize lists for logging energies and costs.
+        Initialize buffers for logging energies and costs, preallocated for \
+            one episode and retaining at most max_logged_episodes episodes.
         """
-        self.energies = {"balance": [], "battery": [], "grid": [], "pv": [], "load": []}
-        self.costs = {"total": [], "overcharge": [], "grid": [], "error": []}
+        episode_size = (
+            self.MAX_TIMESTEP if self.episode_length is None else self.episode_length
+        )
+        self.energies_log = LogBuffer(
+            ["balance", "battery", "grid", "pv", "load", "stored"],
+            episode_size,
+            self.max_logged_episodes,
+            sink=self.log_sink,
+            name="energies",
+        )
+        self.costs_log = LogBuffer(
+            ["total", "overcharge", "grid", "error"],
+            episode_size,
+            self.max_logged_episodes,
+            sink=self.log_sink,
+            name="costs",
+        )
+
+    def flush_logs(self) -> None:
+        """
+        Send the logs still in memory to the log sink, if any, and wait for \
+            them to be written.
+        """
+        self.energies_log.flush()
+        self.costs_log.flush()
+        if self.log_sink is not None:
+            self.log_sink.flush()
+
+    def close(self) -> None:
+        """
+        Write the logs still in memory and close the log sink, if any.
+        """
+        self.flush_logs()
+        if self.log_sink is not None:
+            self.log_sink.close()
+
+    @property
+    def energies(self) -> dict:
+        """
+        Returns:
+            dict: Views of the energies logs
+        """
+        return self.energies_log.to_dict()
+
+    @property
+    def costs(self) -> dict:
+        """
+        Returns:
+            dict: Views of the costs logs
+        """
+        return self.costs_log.to_dict()
 
     def log_energies(
-        self, battery: float, grid: float, pv: float, load: float, balance: float = None
+        self,
+        battery: float,
+        grid: float,
+        pv: float,
+        load: float,
+        balance: float = None,
+        stored: float = None,
     ):
         """
         Log the different energies collected at the current timestep
@@ -194,16 +429,18 @@ class Microgrid:
             pv (float): The energy produced from the pv panels
             load (float): The energy required by the local network
             balance (float, optional): The energy balance. Defaults to None.
+            stored (float, optional): The energy stored in the battery after the\
+                timestep. Defaults to None (current battery energy).
         """
         # pylint: disable=too-many-arguments
 
         if balance is None:
             balance = pv + grid - load - battery
-        self.energies["battery"].append(battery)
-        self.energies["grid"].append(grid)
-        self.energies["pv"].append(pv)
-        self.energies["load"].append(load)
-        self.energies["balance"].append(balance)
+        if stored is None:
+            stored = self.battery._energy  # pylint: disable=protected-access
+        self.energies_log.append(
+            self.episode, (balance, battery, grid, pv, load, stored)
+        )
 
     def log_costs(self, overcharge: float, grid: float, error: float):
         """
@@ -215,21 +452,47 @@ class Microgrid:
             grid (float): The costs of operating the grid (buying:+ or selling:-)
             error (float): The costs due to not meeting the local energy requirements
         """
-        self.costs["overcharge"].append(overcharge)
-        self.costs["grid"].append(grid)
-        self.costs["error"].append(error)
-        self.costs["total"].append(overcharge + grid + error)
+        self.costs_log.append(
+            self.episode, (overcharge + grid + error, overcharge, grid, error)
+        )
 
     def get_logs(self) -> dict:
         """
-        Return the logs in a dict format for energies and costs
+        Return the logs in a dict format for energies and costs, as zero-copy \
+            views of the log buffers. The episode index of each step is \
+            available in energies_log.episodes and costs_log.episodes.
 
         Returns:
             dict: Costs and energies logs.
         """
         return {"costs": self.costs, "energies": self.energies}
 
-    def show_logs(self, show=True) -> Union[None, List[plt.Axes]]:
+    def check_logs(self) -> None:
+        """
+        Check the invariants of the battery (stored energy between 0 and the \
+            capacity) and of the energy balance at once on the logs of the \
+            current episode still in memory, as done at every step in debug mode.
+
+        Raises:
+            ValueError: If an invariant is violated, with the first violating \
+                timestep (assuming all the steps of the episode were logged)
+        """
+        if self.energies_log.last_episode != self.episode:
+            return
+        # only the rows of the current episode are checked
+        offset, energies = self.energies_log.get_last_episode()
+        index = check_invariants(energies, self.battery.capacity)
+        if index is not None:
+            timestep = self.start + 1 + offset + index
+            raise ValueError(
+                f"Invariant violated at timestep {timestep} of \
+                    episode {self.episode}: "
+                + ", ".join(
+                    f"{field}={values[index]}" for field, values in energies.items()
+                )
+            )
+
+    def show_logs(self, show=True) -> Union[None, List["plt.Axes"]]:
         """
         Plot the available logs in a simple fashion.
 
@@ -240,6 +503,9 @@ class Microgrid:
         Returns:
             Any[None, Tuple[plt.Axes]]: Either nothing or the created figures.
         """
+        # pylint: disable=import-outside-toplevel, redefined-outer-name
+        import matplotlib.pyplot as plt
+
         figures = []
         for data_name, data in self.get_logs().items():
             fig, ax = plt.subplots(len(data), 1, figsize=(8, 6))
@@ -260,38 +526,32 @@ class Microgrid:
     def obs(self) -> np.ndarray:
         """
         Returns:
-            np.ndarray: The current state of the microgrid
-        """
-        return np.array(
-            [
-                self.battery.state_of_charge,
-                self.grid.import_prices[self.t + 1],
-                self.grid.export_prices[self.t + 1],
-                self.load.get_load(self.t + 1),
-                self.pv.get_power(self.t + 1),
-            ],
-            dtype=np.float32,
+            np.ndarray: The current state of the microgrid: the state of charge \
+                followed by the features of the next timesteps (see \
+                ObservationBuilder)
+        """
+        return self.observation.build(
+            (self.t + 1) % self.period, self.battery.state_of_charge
         )
 
+    @property
+    def forecast(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: A zero-copy (horizon, k) view of the features of the \
+                next timesteps
+        """
+        return self.observation.window((self.t + 1) % self.period)
+
     @property
     def max_values(self) -> np.ndarray:
         """
         Get the max possible values for all observations
 
         Returns:
-            Tuple[float, float, float, float, float]: The max values
-        """
-
-        return np.array(
-            [
-                1.0,
-                self.grid.import_prices.max(),
-                self.grid.export_prices.max(),
-                self.load.load_ts.max(),
-                self.pv.pv_production_ts.max(),
-            ],
-            dtype=np.float32,
-        )
+            np.ndarray: The max values
+        """
+        return self.observation.max_values
 
     @property
     def min_values(self) -> np.ndarray:
@@ -299,19 +559,9 @@ class Microgrid:
         Get the min possible values for all observations
 
         Returns:
-            np.ndarray[float, float, float, float, float]: The min values
-        """
-
-        return np.array(
-            [
-                0.0,
-                self.grid.import_prices.min(),
-                self.grid.export_prices.min(),
-                self.load.load_ts.min(),
-                self.pv.pv_production_ts.min(),
-            ],
-            dtype=np.float32,
-        )
+            np.ndarray: The min values
+        """
+        return self.observation.min_values
 
     @property
     def max_actions(self) -> np.ndarray:
@@ -322,19 +572,7 @@ class Microgrid:
             np.ndarray: max value for each action
         """
 
-        return np.array(
-            [
-                self.battery.capacity,
-                # We shouldn't be charging or dischargming more than max
-                # capacity at anypoint. Even below it's already too
-                # much due to limit in output.
-                self.battery.capacity + self.load.load_ts.max(),
-                # We assume that the max amount of energy
-                # that can be bought is full battery + max of load
-                # accross the full time serie.
-            ],
-            dtype=np.float32,
-        )
+        return get_max_actions(self.battery, self.load, self.delta_t)
 
     @property
     def min_actions(self) -> np.ndarray:
@@ -353,9 +591,42 @@ class Microgrid:
         Returns:
             bool: Wether or not the microgrid is in a final state
         """
-        return self.t >= self.MAX_TIMESTEP - 2
+        return self.t >= self.end
+
+    @property
+    def max_start(self) -> int:
+        """
+        Returns:
+            int: The last timestep at which an episode can start
+        """
         # to allow to see the upcoming prices and load before taking action (-1)
         # and since self.t starts at 0, another -1
+        return self.MAX_TIMESTEP - 2 - (self.episode_length or 0)
+
+    def _set_start(self, start: int) -> None:
+        """
+        Move the episode window to start at the given timestep.
+
+        Args:
+            start (int): The first timestep of the episode
+        """
+        self.start = start
+        self.t = start
+        if self.episode_length is None:
+            self.end = self.MAX_TIMESTEP - 2
+        else:
+            self.end = start + self.episode_length
+
+    def seed(self, seed: Optional[int] = None) -> None:
+        """
+        Seed the random generator used to sample the episodes start.
+
+        Args:
+            seed (Optional[int], optional): The seed. Defaults to None.
+        """
+        self._seed = seed
+        self._config = None
+        self.rng = np.random.default_rng(seed)
 
     def print_info(self):
         """
@@ -368,21 +639,118 @@ class Microgrid:
 
     def reset(self, reset_logs=False) -> np.ndarray:
         """
-        Reset the microgrid in its original state.
+        Reset the microgrid in its original state, at the start of a new \
+            episode window sampled by the start sampler. Timeseries are never \
+            copied, only the current timestep moves, or the next perturbed \
+            scenario is swapped in if the config has scenarios.
 
         Args:
-            reset_logs (bool, optional): Wether or not to reset the log arrays.\
-                Defaults to False.
+            reset_logs (bool, optional): Wether or not to reset the log arrays,\
+                after sending them to the log sink if any. Defaults to False.
 
         Returns:
             np.ndarray: The initial observation of the environment
         """
-        self.t = 0
+        self._set_start(
+            sample_start(
+                self.rng, self.start_sampler, self.max_start, self.steps_per_day
+            )
+        )
+        if self.scenario_sampler is not None:
+            self.set_scenario(self.scenario_sampler.sample(self.get_index(self.start)))
         self.battery.reset()
         if reset_logs:
-            self._init_logs_()
+            # the logs already streamed to the sink are kept complete
+            self.flush_logs()
+            self.energies_log.clear()
+            self.costs_log.clear()
+        elif self.energies_log.last_episode == self.episode:
+            # the next episode index is only used if this episode was logged
+            self.episode += 1
         return self.obs
 
+    def set_scenario(self, scenario: Optional[Dict[str, np.ndarray]] = None) -> None:
+        """
+        Replace the timeseries by perturbed versions (see \
+            easygrid.scenarios.ScenarioSampler), or restore the original ones.
+
+        Args:
+            scenario (Optional[Dict[str, np.ndarray]], optional): The \
+                (unscaled) timeseries by name (see SERIES_NAMES), the missing \
+                ones are restored. Defaults to None (restore all).
+        """
+        scenario = scenario or {}
+        unknown = set(scenario) - set(SERIES_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown timeseries {unknown}, should be {SERIES_NAMES}")
+        self.grid.set_scenario(
+            scenario.get("import_prices"), scenario.get("export_prices")
+        )
+        self.load.set_scenario(scenario.get("load"))
+        self.pv.set_scenario(scenario.get("pv"))
+
+    def get_state(self) -> dict:
+        """
+        Get the mutable state of the microgrid, to be restored with set_state.
+
+        Returns:
+            dict: The current timestep, episode start, battery energy and \
+                degradation, and random generator state
+        """
+        # pylint: disable=protected-access
+        return {
+            "t": self.t,
+            "start": self.start,
+            "battery_energy": self.battery._energy,
+            "battery_degradation": copy.deepcopy(self.battery.degradation),
+            "rng": self.rng.bit_generator.state,
+        }
+
+    def set_state(self, state: dict) -> None:
+        """
+        Restore a state obtained with get_state.
+
+        Args:
+            state (dict): The state to restore
+        """
+        # pylint: disable=protected-access
+        self._set_start(state["start"])
+        self.t = state["t"]
+        self.battery._energy = state["battery_energy"]
+        self.battery.degradation = copy.deepcopy(state["battery_degradation"])
+        self.rng.bit_generator.state = state["rng"]
+
+    def fork(self) -> "Microgrid":
+        """
+        Create a lightweight copy of the microgrid, e.g. for tree search or MPC\
+            rollouts. The copy shares the (read-only) timeseries with the \
+            original, so its cost doesn't depend on the horizon, and starts \
+            with empty, unbounded logs that are not sent to any sink. With \
+            scenarios, the copy draws them from its own copy of the scenario \
+            sampler, which shares the drawn batch until one of them writes \
+            to it, starting from the scenario of the last reset.
+
+        Returns:
+            Microgrid: The forked microgrid, in the same state as the original
+        """
+        forked = copy.copy(self)
+        forked.rng = copy.deepcopy(self.rng)
+        forked.battery = copy.copy(self.battery)
+        forked.battery.degradation = copy.deepcopy(self.battery.degradation)
+        forked.grid = copy.copy(self.grid)
+        forked.pv = copy.copy(self.pv)
+        forked.load = copy.copy(self.load)
+        if self.scenario_sampler is not None:
+            # the scenarios are views of the sampler buffer, copied on write
+            forked.scenario_sampler = self.scenario_sampler.fork()
+        forked.observation = copy.copy(self.observation)
+        forked.observation.microgrid = forked
+        forked.max_logged_episodes = None
+        forked.log_sink = None
+        forked.energies_log = LogBuffer(self.energies_log.fields, 1)
+        forked.costs_log = LogBuffer(self.costs_log.fields, 1)
+        return forked
+
     def set_battery_from_duration(self, nb_of_hours: float) -> None:
         """
         Set the battery config to handle a given number of hours under mean load
@@ -391,9 +759,11 @@ class Microgrid:
             nb_of_hours (float): The capacity of the battery in hours
         """
         new_capacity = self.load.__mean__ * nb_of_hours
-        self.battery.initial_energy = (
-            new_capacity / self.battery.capacity
-        ) * self.battery.initial_energy
+        ratio = new_capacity / self.battery.capacity
+        self.battery.initial_energy = ratio * self.battery.initial_energy
+        # thresholds keep the same state of charge
+        self.battery.high_capacity = ratio * self.battery.high_capacity
+        self.battery.low_capacity = ratio * self.battery.low_capacity
         self.battery.capacity = new_capacity
         self.battery.reset()
         self.battery.max_output = max(self.battery.max_output, self.load.__mean__)
@@ -414,402 +784,187 @@ class Microgrid:
             json_file.write(self.config.json(indent=4, sort_keys=True))
 
 
-class Battery:
+def scale_actions(
+    actions: np.ndarray, max_actions: np.ndarray, min_actions: np.ndarray
+) -> np.ndarray:
     """
-    Models the battery, its state and relevant actions
-    ...
+    Array version of Microgrid.scale_action
 
-    Attributes
-    ----------
-    capacity : float
-        The total capacity of the battery.
-    high_capacity : float
-        The higher energy threshold to be stored in the battery \
-            for maximum efficiency of the battery
-    low_capacity : float
-        The lower energy threshold to be stored in the battery \
-            for maximum efficiency of the battery
-    max_output : float
-        The maximum power output of the battery (which defines the maximal\
-             amount of energy that can be transfered in a single timestep)
-    min_output : float
-        The minimum power output of the battery (which defines the minimal\
-             amount of energy that can be transfered in a single timestep)
-    _energy : float
-        The current amount of energy stored in the battery. Private.
-    state_of_charge (property) : float
-        The state of charge of the battery (between 0 and 1)
-    energy (property) : float
-        The current amount of energy stored in the battery. Includes safety \
-            check for negative energy
+    Args:
+        actions (np.ndarray): The (..., 2) actions in [-1, 1]
+        max_actions (np.ndarray): The max value of each action
+        min_actions (np.ndarray): The min value of each action
 
-    Methods
-    -------
-    charge_discharge : Stores or discharge the required amount of energy \
-        into/from the battery and computes the under/overcharge
+    Returns:
+        np.ndarray: The actions scaled back to [min, max]
     """
-
-    def __init__(self, battery_config: BatteryConfig) -> None:
-        """
-        Creates the relevant attributes based on the config
-
-        Args:
-            battery_config (BatteryConfig): Configuration for the battery.
-        """
-        self.capacity = battery_config.capacity
-        self.high_capacity = battery_config.high_capacity
-        self.low_capacity = battery_config.low_capacity
-        self.max_output = battery_config.max_output
-        self.min_output = battery_config.min_output
-        self._energy = battery_config.initial_energy
-        self.initial_energy = battery_config.initial_energy
-        self.overcharge_penalty = battery_config.overcharge_penalty
-
-    def reset(self):
-        """
-        Reset the battery energy/soc to the initial setting
-        """
-        self._energy = self.initial_energy
-
-    @property
-    def config(self) -> dict:
-        """
-
-        Returns:
-            dict: The current battery config
-        """
-        return BatteryConfig.parse_obj(
-            {
-                "capacity": self.capacity,
-                "high_capacity": self.high_capacity,
-                "low_capacity": self.low_capacity,
-                "max_output": self.max_output,
-                "min_output": self.min_output,
-                "overcharge_penalty": self.overcharge_penalty,
-                "initial_energy": self.initial_energy,
-            }
-        )
-
-    @property
-    def state_of_charge(self) -> float:
-        """
-        Returns:
-            float: the current state of charge of the battery \
-                (between 0 : empty and 1 : full)
-        """
-        soc = self._energy / self.capacity
-        assert (
-            0 <= soc <= 1
-        ), f"Soc not between 0 and 1 : {soc} ({self._energy}/{self.capacity})"
-        return soc
-
-    @property
-    def energy(self) -> Optional[float]:
-        """
-        Returns:
-            float: The current energy quantity stored in the battery
-        """
-        if self._energy >= 0:
-            return self._energy
-        else:
-            raise ValueError(f"Energy is negative ({self._energy}), there is a problem")
-
-    def charge_discharge(self, energy: float) -> float:
-        """
-        Charge/Discharge the battery with the desired quantity of energy
-
-        Args:
-            energy (float): The energy to be stored (+)/discharged (-)
-
-        Returns:
-            float: The excess/missing energy when compared to max and min \
-                thresholds
-        """
-        new_energy = self.energy + energy
-        if energy >= 0:
-            # if there is more energy than the upper bound, we compute \
-            # the excess
-            overcharge = min(0, new_energy - self.high_capacity)
-            self._energy = min(self.high_capacity, new_energy)
-            return overcharge
-        else:
-            # if there is less energy than the lower bound, we compute \
-            # how much is missing
-            undercharge = max(0, self.low_capacity - new_energy)
-            self._energy = max(self.low_capacity, new_energy)
-            return undercharge
-
-    def get_overcharge_cost(self, overcharge: float) -> float:
-        """
-        Compute the overcharge cost for not meeting the optimal battery thresholds
-
-        Args:
-            overcharge (float): The quantity of energy outside the correct range.
-
-        Returns:
-            float: The corresponding cost for underoptimal operation of the battery
-        """
-        return overcharge * self.overcharge_penalty
+    return (actions + 1) * 0.5 * (max_actions - min_actions) + min_actions
 
 
-class Grid:
+def get_max_actions(battery: Battery, load: Load, delta_t: float) -> np.ndarray:
     """
-    Models the grid, its costs and prices
-    ...
-
-    Attributes
-    ----------
-    import_prices : List[float]
-        The timeserie for import prices (one price per timestep)
-    export_prices : List[float]
-        The timeserie for export prices (one price per timestep)
-    import_prices_factor : float
-        A scaling factor to easily modify the import prices.
-    export_prices_factor : float
-        A scaling factor to easily modify the export prices.
-    __len__ (property) : int
-        The length of timeseries for safety checks
+    Args:
+        battery (Battery): The battery of the microgrid
+        load (Load): The load of the microgrid
+        delta_t (float): The duration (hours) of a timestep
 
-    Methods
-    -------
-    get_cost : Get the running cost for a given timestep and energy to be \
-        bought/sold
+    Returns:
+        np.ndarray: The max value of each action (battery and grid energies)
     """
-
-    def __init__(self, grid_config: GridConfig) -> None:
-        """
-        Creates the relevant attributes based on the config
-
-        Args:
-            grid_config (GridConfig): Configuration for the grid.
-        """
-        self.config_ = grid_config
-        self.import_prices_ = load_data(grid_config.import_prices)
-        self.export_prices_ = load_data(grid_config.export_prices)
-        self.import_price_factor = grid_config.import_price_factor
-        self.export_price_factor = grid_config.export_price_factor
-
-        if len(self.import_prices) != len(self.export_prices):
-            raise ValueError(
-                f"Price timeseries are not of the same length \
-                    \n import : {len(self.import_prices)} \
-                    \n export : {len(self.export_prices)} "
-            )
-
-    @property
-    def config(self) -> dict:
-        """
-        Returns:
-            dict: The current grid config
-        """
-        return GridConfig.parse_obj(
-            {
-                "import_prices": self.config_.import_prices,
-                "export_prices": self.config_.export_prices,
-                "import_price_factor": self.import_price_factor,
-                "export_price_factor": self.export_price_factor,
-            }
-        )
-
-    def get_cost(self, t: int, energy: float) -> float:
-        """
-        Get the cost for operating the grid with the required amount of energy
-
-        Args:
-            t (int): The timestep for which the costs must be computed
-            energy (float): Energy to be sold (-) or bought (+)
-
-        Returns:
-            float: The cost in euros, positive is loss, negative is gain
-        """
-        if energy >= 0:
-            cost = self.import_prices[t] * energy
-        else:
-            cost = self.export_prices[t] * energy
-        return cost
-
-    @property
-    def __len__(self) -> int:
-        """
-        Returns:
-            int: The length of prices series for safety checks
-        """
-        return len(self.import_prices)
-
-    @property
-    def import_prices(self) -> np.ndarray:
-        """
-        Returns:
-            int: The length of prices series for safety checks
-        """
-        return self.import_prices_ * self.import_price_factor
-
-    @property
-    def export_prices(self) -> np.ndarray:
-        """
-        Returns:
-            int: The length of prices series for safety checks
-        """
-        return self.export_prices_ * self.export_price_factor
-
-
-class Photovoltaic:
+    return np.array(
+        [
+            battery.capacity,
+            # We shouldn't be charging or dischargming more than max
+            # capacity at anypoint. Even below it's already too
+            # much due to limit in output.
+            battery.capacity + load.__max__ * delta_t,
+            # We assume that the max amount of energy
+            # that can be bought is full battery + max of load
+            # accross the full time serie.
+        ],
+        dtype=np.float32,
+    )
+
+
+def check_lengths(period: int, grid: Grid, pv: Photovoltaic, load: Load) -> None:
     """
-    Models the photovoltaic local production
-    ...
+    Check that the timeseries of the components all have the expected length
 
-    Attributes
-    ----------
-    pv_production_ts_ : List[float]
-        The timeserie for pv_production prices (power available per timestep).
-    production_factor : float
-        A scaling factor to easily modify the pv production.
-    __len__ (property) : int
-        The length of timeseries for safety checks.
+    Args:
+        period (int): The number of timesteps of the timeseries
+        grid (Grid): The grid
+        pv (Photovoltaic): The pv panels
+        load (Load): The load
 
-    Methods
-    -------
-    get_cost : Get the power produced by PV for a given timestep.
+    Raises:
+        ValueError: If a timeserie has a different length
     """
-
-    def __init__(self, pv_config: PvConfig) -> None:
-        """
-        Creates the relevant attributes based on the config
-
-        Args:
-            pv_config (PvConfig): Configuration for the PV.
-        """
-        self.config_ = pv_config  # to fix path at init
-        self.pv_production_ts_ = load_data(pv_config.pv_production_ts)
-        self.production_factor = pv_config.production_factor
-
-    @property
-    def config(self) -> dict:
-        """
-
-        Returns:
-            dict: The current pv config
-        """
-        return PvConfig.parse_obj(
-            {
-                "pv_production_ts": self.config_.pv_production_ts,
-                "production_factor": self.production_factor,
-            }
+    if grid.__len__ != period:
+        raise ValueError(
+            f"Prices timeseries lengths are different ({grid.__len__ }) with \
+                the maximum number of timesteps ({period})"
+        )
+    if pv.__len__ != period:
+        raise ValueError(
+            f"PV production timeseries length is different ({pv.__len__ }) \
+                with the maximum number of timesteps ({period})"
+        )
+    if load.__len__ != period:
+        raise ValueError(
+            f"Load timeseries length is different ({load.__len__ }) \
+                with the maximum number of timesteps ({period})"
         )
-
-    @property
-    def pv_production_ts(self) -> np.ndarray:
-        """
-        Returns:
-            Union[List[float], np.ndarray]: The production timeserie rescaled.
-        """
-        return self.pv_production_ts_ * self.production_factor
-
-    @property
-    def __len__(self) -> int:
-        """
-        Returns:
-            int: The length of pv production serie for safety checks
-        """
-        return len(self.pv_production_ts)
-
-    @property
-    def __mean__(self) -> int:
-        """
-        Returns:
-            int: The mean of the pv production accross the timeserie
-        """
-        return np.mean(self.pv_production_ts)
-
-    def get_power(self, t: int) -> float:
-        """
-        Method to get the power produced for the given timestep.\
-            Not really interesting, it exists for an easier framework.
-
-        Args:
-            t (int): the timestep for which to return power
-
-        Returns:
-            float: the corresponding produced photovoltaic power.
-        """
-        return self.pv_production_ts[t]
 
 
-class Load:
+def get_scenario_sampler(
+    config: MicrogridConfig, grid: Grid, pv: Photovoltaic, load: Load
+) -> Optional[ScenarioSampler]:
     """
-    Models the local consumption of energy
-    ...
-
-    Attributes
-    ----------
-    load_ts_ : List[float]
-        The timeserie for load requirements (power required per timestep).
-    load_factor : float
-        A scaling factor to easily modify the load requirement.
-    __len__ (property) : int
-        The length of timeseries for safety checks.
-
-    Methods
-    -------
-    get_load : Get the load required for a given timestep
+    Args:
+        config (MicrogridConfig): The microgrid config
+        grid (Grid): The grid
+        pv (Photovoltaic): The pv panels
+        load (Load): The load
+
+    Returns:
+        Optional[ScenarioSampler]: The sampler of the perturbed timeseries, \
+            None if the config has no scenarios
     """
+    if config.scenarios is None:
+        return None
+    return ScenarioSampler(
+        {
+            "import_prices": grid.import_prices_,
+            "export_prices": grid.export_prices_,
+            "load": load.load_ts_,
+            "pv": pv.pv_production_ts_,
+        },
+        config.scenarios,
+        delta_t=config.delta_t,
+        # the episode and the observation of its last timestep
+        window=None
+        if config.episode_length is None
+        else config.episode_length + config.observation.horizon + 1,
+    )
+
+
+def check_invariants(
+    energies: dict, capacity: float, tolerance: float = 1e-9
+) -> Optional[int]:
+    """
+    Vectorized check of the invariants of the energies logs: the stored energy \
+        stays between 0 and the capacity and the balance matches its components.
 
-    def __init__(self, load_config: LoadConfig) -> None:
-        """
-        Creates the relevant attributes based on the config
-
-        Args:
-            load_config (LoadConfig): Configuration for the load.
-        """
-        self.config_ = load_config
-        self.load_ts_ = load_data(load_config.load_ts)
-        self.load_factor = 1.0
-
-    @property
-    def config(self) -> dict:
-        """
-        Returns:
-            dict: The current load config
-        """
-        return LoadConfig.parse_obj(
-            {
-                "load_ts": self.config_.load_ts,
-                "load_factor": self.load_factor,
-            }
-        )
-
-    @property
-    def load_ts(self) -> np.ndarray:
-        """
-        Returns:
-            Union[List[float], np.ndarray]: The load timeserie rescaled.
-        """
-        return self.load_ts_ * self.load_factor
+    Args:
+        energies (dict): The energies logs, with the "stored" energy
+        capacity (float): The capacity of the battery
+        tolerance (float, optional): The relative tolerance. Defaults to 1e-9.
 
-    @property
-    def __len__(self) -> int:
-        """
-        Returns:
-            int: The length of the load timeserie
-        """
-        return len(self.load_ts)
-
-    @property
-    def __mean__(self) -> int:
-        """
-        Returns:
-            int: The mean of the load accross the timeserie
-        """
-        return np.mean(self.load_ts)
+    Returns:
+        Optional[int]: The index of the first violating step, None if there is \
+            none
+    """
+    stored = np.asarray(energies["stored"])
+    balance = np.asarray(energies["balance"])
+    expected_balance = (
+        np.asarray(energies["pv"])
+        + np.asarray(energies["grid"])
+        - np.asarray(energies["load"])
+        - np.asarray(energies["battery"])
+    )
+    threshold = tolerance * (1 + np.abs(expected_balance) + capacity)
+    violations = (
+        (stored < 0)
+        | (stored > capacity * (1 + tolerance))
+        | ~(np.abs(balance - expected_balance) <= threshold)
+    )
+    indexes = np.flatnonzero(violations)
+    return int(indexes[0]) if len(indexes) else None
+
+
+def sample_start(
+    rng: np.random.Generator, start_sampler: str, max_start: int, steps_per_day: int
+) -> int:
+    """
+    Sample the first timestep of an episode
 
-    def get_load(self, t: int) -> float:
-        """
-        Method to get the load required for the given timestep.\
-            Not really interesting, it exists for an easier framework.
+    Args:
+        rng (np.random.Generator): The random generator
+        start_sampler (str): "zero", "uniform" or "daily" (see MicrogridConfig)
+        max_start (int): The last timestep at which an episode can start
+        steps_per_day (int): The number of timesteps in a day
 
-        Args:
-            t (int): the timestep for which to return load
-        Returns:
-            float: the corresponding load required by the local network
-        """
-        return self.load_ts[t]
+    Returns:
+        int: The sampled start
+    """
+    if start_sampler == "uniform":
+        return int(rng.integers(0, max_start + 1))
+    if start_sampler == "daily":
+        return int(rng.integers(0, max_start // steps_per_day + 1)) * steps_per_day
+    return 0
+
+
+def sample_starts(
+    rngs: Sequence[np.random.Generator],
+    start_sampler: str,
+    max_start: int,
+    steps_per_day: int,
+) -> np.ndarray:
+    """
+    Sample the first timestep of the episodes of several microgrids, each with \
+        its own random generator (see sample_start)
+
+    Args:
+        rngs (Sequence[np.random.Generator]): The random generator of each \
+            microgrid
+        start_sampler (str): "zero", "uniform" or "daily" (see MicrogridConfig)
+        max_start (int): The last timestep at which an episode can start
+        steps_per_day (int): The number of timesteps in a day
+
+    Returns:
+        np.ndarray: The sampled starts
+    """
+    return np.array(
+        [sample_start(rng, start_sampler, max_start, steps_per_day) for rng in rngs],
+        dtype=np.int64,
+    )
@@ -0,0 +1,292 @@
+"""
+This module builds the observations of the microgrid from a precomputed \
+feature matrix
+"""
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from easygrid.scenarios import SERIES_NAMES, ScenarioSampler
+
+if TYPE_CHECKING:
+    from easygrid.microgrid import Microgrid
+
+HOURS_PER_DAY = 24
+DAYS_PER_WEEK = 7
+
+
+class ObservationBuilder:  # pylint: disable=too-many-instance-attributes
+    """
+    Builds the observations of a microgrid: the state of charge of the battery\
+        followed by a window of the next `horizon` timesteps of features.
+    Features are stacked once in a (T + horizon - 1, k) matrix, so windows are \
+        zero-copy views and their cost doesn't depend on the horizon. The \
+        matrix is padded with the last values, or with the first ones when the \
+        microgrid loops over its timeseries.
+    ...
+
+    Attributes
+    ----------
+    horizon : int
+        The number of future timesteps in the observation
+    calendar_features : bool
+        Wether or not to add the hour of day and day of week to the features
+    feature_names : List[str]
+        The names of the k features
+    n_features : int
+        The number k of features per timestep
+    size : int
+        The size of the flat observation
+    features (property) : np.ndarray
+        The (T + horizon - 1, k) feature matrix, rebuilt if the microgrid \
+            timeseries changed
+
+    Methods
+    -------
+    window : Get the (horizon, k) features window starting at a given timestep
+    build : Get the flat observation for a given timestep and state of charge
+    """
+
+    def __init__(
+        self, microgrid: "Microgrid", horizon: int = 1, calendar_features: bool = False
+    ) -> None:
+        """
+        Args:
+            microgrid (Microgrid): The microgrid to observe
+            horizon (int, optional): The number of future timesteps in the \
+                observation. Defaults to 1.
+            calendar_features (bool, optional): Wether or not to add the hour of\
+                day and day of week to the features. Defaults to False.
+        """
+        if horizon < 1:
+            raise ValueError(f"Horizon must be at least 1 ({horizon})")
+        self.microgrid = microgrid
+        self.horizon = horizon
+        self.calendar_features = calendar_features
+        self.feature_names = ["import_price", "export_price", "load", "pv"]
+        if calendar_features:
+            self.feature_names += ["hour_of_day", "day_of_week"]
+        self._sources: Tuple[np.ndarray, ...] = ()
+        self._features = np.empty((0, len(self.feature_names)), dtype=np.float32)
+        self._windows = self._features
+        # wether or not the feature matrix can be updated in place
+        self._owns_features = False
+
+        self.n_features = len(self.feature_names)
+        # size of the flat observation
+        self.size = 1 + self.horizon * self.n_features
+
+    def _get_sources(self) -> Tuple[np.ndarray, ...]:
+        microgrid = self.microgrid
+        return (
+            microgrid.grid.import_prices,
+            microgrid.grid.export_prices,
+            microgrid.load.load_ts,
+            microgrid.pv.pv_production_ts,
+        )
+
+    def __copy__(self) -> "ObservationBuilder":
+        copied = self.__class__.__new__(self.__class__)
+        copied.__dict__.update(self.__dict__)
+        # the feature matrix is now shared: the next update of either copy \
+        # rebuilds it instead of writing in place
+        self._owns_features = copied._owns_features = False
+        return copied
+
+    def _update(self) -> None:
+        """
+        Update the feature matrix if a timeserie of the microgrid changed \
+            (e.g. a scaling factor was modified or a scenario swapped in). \
+            Only the changed columns are written when the lengths are unchanged.
+        """
+        microgrid = self.microgrid
+        sources = self._sources
+        if (
+            sources
+            and microgrid.grid.import_prices is sources[0]
+            and microgrid.grid.export_prices is sources[1]
+            and microgrid.load.load_ts is sources[2]
+            and microgrid.pv.pv_production_ts is sources[3]
+        ):
+            return
+        new_sources = self._get_sources()
+        if not (
+            self._owns_features
+            and all(len(new) == len(old) for new, old in zip(new_sources, sources))
+        ):
+            self._build_features(new_sources)
+            return
+        wrap = self.microgrid.loops > 1
+        for column, (new, old) in enumerate(zip(new_sources, sources)):
+            if new is not old:
+                write_column(self._features[:, column], new, wrap)
+        self._sources = new_sources
+
+    @property
+    def features(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The (T + horizon - 1, k) feature matrix
+        """
+        self._update()
+        return self._features
+
+    def _build_features(self, sources: Tuple[np.ndarray, ...]) -> None:
+        """
+        Stack the timeseries (and calendar features) in the feature matrix, \
+            padded so that all windows are full.
+
+        Args:
+            sources (Tuple[np.ndarray, ...]): The timeseries of the microgrid
+        """
+        self._features = build_features(
+            sources,
+            self.horizon,
+            self.calendar_features,
+            self.microgrid.delta_t,
+            self.microgrid.loops > 1,
+        )
+        self._windows = sliding_window_view(
+            self._features, (self.horizon, self.n_features)
+        )[:, 0]
+        self._sources = sources
+        self._owns_features = True
+
+    def window(self, t: int) -> np.ndarray:
+        """
+        Args:
+            t (int): The first timestep of the window
+
+        Returns:
+            np.ndarray: A read-only (horizon, k) view of the features from t to \
+                t + horizon - 1
+        """
+        self._update()
+        return self._windows[t]
+
+    def build(self, t: int, state_of_charge: float) -> np.ndarray:
+        """
+        Args:
+            t (int): The first timestep of the features window
+            state_of_charge (float): The state of charge of the battery
+
+        Returns:
+            np.ndarray: A new flat observation [soc, window(t).ravel()], that \
+                callers can keep. Use window for a zero-copy view of the \
+                features.
+        """
+        self._update()
+        obs = np.empty(self.size, dtype=np.float32)
+        obs[0] = state_of_charge
+        end = t + self.horizon
+        obs[1:] = self._features[t:end].reshape(-1)
+        return obs
+
+    @property
+    def max_values(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The max possible values of the flat observation
+        """
+        _, high = get_feature_bounds(self.features, *self._get_scenarios())
+        return np.concatenate((np.ones(1), np.tile(high, self.horizon))).astype(
+            np.float32
+        )
+
+    @property
+    def min_values(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The min possible values of the flat observation
+        """
+        low, _ = get_feature_bounds(self.features, *self._get_scenarios())
+        return np.concatenate((np.zeros(1), np.tile(low, self.horizon))).astype(
+            np.float32
+        )
+
+    def _get_scenarios(self) -> Tuple[Optional[ScenarioSampler], List[float]]:
+        microgrid = self.microgrid
+        return microgrid.scenario_sampler, [
+            microgrid.grid.import_price_factor,
+            microgrid.grid.export_price_factor,
+            microgrid.load.load_factor,
+            microgrid.pv.production_factor,
+        ]
+
+
+def get_feature_bounds(
+    features: np.ndarray,
+    sampler: Optional[ScenarioSampler] = None,
+    factors: Sequence[float] = (1.0, 1.0, 1.0, 1.0),
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Args:
+        features (np.ndarray): The (T, k) feature matrix
+        sampler (Optional[ScenarioSampler], optional): The sampler of the \
+            scenarios swapped in the timeseries. Defaults to None (no scenarios).
+        factors (Sequence[float], optional): The scaling factors of the \
+            timeseries, in the SERIES_NAMES order. Defaults to 1.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The min and max of each feature, over \
+            all the scenarios of the sampler
+    """
+    low, high = features.min(axis=0), features.max(axis=0)
+    if sampler is not None:
+        for name, (min_value, max_value) in sampler.get_bounds().items():
+            column = SERIES_NAMES.index(name)
+            low[column] = min(low[column], factors[column] * min_value)
+            high[column] = max(high[column], factors[column] * max_value)
+    return low, high
+
+
+def build_features(
+    sources: Sequence[np.ndarray],
+    horizon: int,
+    calendar_features: bool,
+    delta_t: float,
+    wrap: bool,
+) -> np.ndarray:
+    """
+    Stack timeseries (and calendar features) in a feature matrix, padded so \
+        that all windows of horizon timesteps are full.
+
+    Args:
+        sources (Sequence[np.ndarray]): The (T,) timeseries
+        horizon (int): The number of timesteps of a window
+        calendar_features (bool): Wether or not to add the hour of day and day \
+            of week
+        delta_t (float): The duration (hours) of a timestep
+        wrap (bool): Wether or not the timeseries are looped over
+
+    Returns:
+        np.ndarray: The (T + horizon - 1, k) float32 feature matrix
+    """
+    columns: List[np.ndarray] = [
+        np.pad(np.asarray(source), (0, horizon - 1), mode="wrap" if wrap else "edge")
+        for source in sources
+    ]
+    if calendar_features:
+        hours = np.arange(len(columns[0])) * delta_t
+        columns.append(hours % HOURS_PER_DAY)
+        columns.append((hours // HOURS_PER_DAY) % DAYS_PER_WEEK)
+    return np.column_stack(columns).astype(np.float32)
+
+
+def write_column(column: np.ndarray, timeserie: np.ndarray, wrap: bool) -> None:
+    """
+    Write a timeserie in a column of a feature matrix, padded with its last \
+        value or, when wrapping, with its first values.
+
+    Args:
+        column (np.ndarray): The (T + horizon - 1,) column view
+        timeserie (np.ndarray): The (T,) timeserie
+        wrap (bool): Wether or not the timeserie is looped over
+    """
+    n_steps = len(timeserie)
+    column[:n_steps] = timeserie
+    # np.resize repeats the timeserie to the requested size
+    column[n_steps:] = (
+        np.resize(timeserie, len(column) - n_steps) if wrap else timeserie[-1]
+    )
@@ -0,0 +1,330 @@
+"""
+Stochastic perturbations of the timeseries of a microgrid (load, pv and \
+prices uncertainty), drawn in batches so that a new scenario can be swapped \
+in at each reset without generating it
+"""
+import copy
+from math import sqrt
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from easygrid.data.data_utils import DATA_FOLDER, get_indexes, load_data
+from easygrid.types import ScenarioConfig
+
+# in the order of the observation features
+SERIES_NAMES = ("import_prices", "export_prices", "load", "pv")
+DAYS_PER_WEEK = 7
+# the perturbation factors are clipped at this many standard deviations above 1,\
+# so that the perturbed timeseries are bounded (see ScenarioSampler.get_bounds)
+MAX_DEVIATIONS = 6.0
+
+
+def ar1_filter(
+    values: np.ndarray, coefficient: float, tolerance: float = 1e-12
+) -> np.ndarray:
+    """
+    Apply x_t = values_t + coefficient * x_{t-1} in place along the last axis, \
+        with a log-depth scan (lags whose weight is below the tolerance are \
+        neglected) instead of a python loop over timesteps.
+
+    Args:
+        values (np.ndarray): The innovations, overwritten by the process
+        coefficient (float): The autoregressive coefficient, in ]-1, 1[
+        tolerance (float, optional): The smallest weight of a lag. \
+            Defaults to 1e-12.
+
+    Returns:
+        np.ndarray: The AR(1) process (values)
+    """
+    shift, weight = 1, coefficient
+    while shift < values.shape[-1] and abs(weight) > tolerance:
+        # the right hand side is computed before the in place addition
+        values[..., shift:] += weight * values[..., :-shift]
+        shift, weight = 2 * shift, weight * weight
+    return values
+
+
+class ScenarioSampler:  # pylint: disable=too-many-instance-attributes
+    """
+    Draws perturbed versions of base timeseries: multiplicative white noise, \
+        AR(1) forecast error, bootstrap of days within a seasonal window and \
+        swaps of pv days with the weather of other sites (see ScenarioConfig).
+    Scenarios are drawn batch_size at a time into a preallocated buffer, so \
+        that sampling a scenario only returns views of the buffer. The noise \
+        and forecast error are only applied to the window of timesteps used by \
+        the episode, so that their cost doesn't depend on the length of the \
+        timeseries.
+    ...
+
+    Attributes
+    ----------
+    config : ScenarioConfig
+        The perturbations
+    names : List[str]
+        The names of the perturbed timeseries
+    buffer : np.ndarray
+        The (batch_size, n_series, T) drawn scenarios
+    rng : np.random.Generator
+        The random generator of the perturbations
+
+    Methods
+    -------
+    sample : Get the next scenario, drawing a new batch if needed
+    current : Get the last sampled scenario
+    draw : Draw a new batch of scenarios into the buffer
+    fork : Copy the sampler with its own buffer and random generator
+    """
+
+    def __init__(
+        self,
+        base: Dict[str, np.ndarray],
+        config: ScenarioConfig,
+        delta_t: float = 1.0,
+        window: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            base (Dict[str, np.ndarray]): The (unscaled) timeseries to perturb, \
+                by name (see SERIES_NAMES)
+            config (ScenarioConfig): The perturbations
+            delta_t (float, optional): The duration (hours) of a timestep of \
+                the timeseries, the other pv sites are resampled to it. \
+                Defaults to 1.0.
+            window (Optional[int], optional): The number of timesteps used by an\
+                episode, from its start. Defaults to None (whole timeseries).
+        """
+        if not -1 < config.forecast_error_correlation < 1:
+            raise ValueError(
+                f"The forecast error correlation must be in ]-1, 1[ \
+                    ({config.forecast_error_correlation})"
+            )
+        if not 0 <= config.regime_swap_probability <= 1:
+            raise ValueError(
+                f"The regime swap probability must be in [0, 1] \
+                    ({config.regime_swap_probability})"
+            )
+        self.config = config
+        self.names = list(dict.fromkeys(config.series))
+        self._base = np.stack(
+            [np.asarray(base[name], dtype=np.float64) for name in self.names]
+        )
+        n_steps = self._base.shape[1]
+        self.delta_t = delta_t
+        self.steps_per_day = max(1, round(24 / delta_t))
+        self._n_days = n_steps // self.steps_per_day
+        self.buffer = np.empty((config.batch_size, len(self.names), n_steps))
+        self._perturbed = config.noise > 0 or config.forecast_error > 0
+        self._max_factor = 1 + MAX_DEVIATIONS * sqrt(
+            config.noise**2 + config.forecast_error**2
+        )
+        self._factors = np.empty(
+            (
+                config.batch_size if self._perturbed else 0,
+                len(self.names),
+                n_steps if window is None else min(window, n_steps),
+            )
+        )
+        self._sites = None
+        if config.regime_swap_probability > 0 and "pv" in self.names:
+            self._sites = self._get_sites(base["pv"])
+        self.rng = np.random.default_rng(config.seed)
+        self._next = config.batch_size
+        self._current: Optional[int] = None
+        # the buffer is shared with forks, and copied on write
+        self._shared = False
+
+    def _get_sites(self, pv: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            pv (np.ndarray): The base pv production
+
+        Returns:
+            np.ndarray: The (n_sites, n_days, steps_per_day) productions of the \
+                other sites, rescaled to the mean of the base production
+        """
+        paths = self.config.pv_sites or sorted(get_indexes(DATA_FOLDER)["pv"])
+        sites = [np.asarray(load_data(path, delta_t=self.delta_t)) for path in paths]
+        sites = [site for site in sites if not np.array_equal(site, pv)]
+        if not sites or any(len(site) != len(pv) for site in sites):
+            raise ValueError(
+                f"Regime swaps need other pv sites with {len(pv)} timesteps"
+            )
+        end = self._n_days * self.steps_per_day
+        return np.stack(
+            [
+                (site * (np.mean(pv) / np.mean(site)))[:end].reshape(
+                    self._n_days, self.steps_per_day
+                )
+                for site in sites
+            ]
+        )
+
+    def _draw_factors(self) -> None:
+        """
+        Draw the (batch_size, n_series, window) non-negative multiplicative \
+            perturbations of the timeseries
+        """
+        config = self.config
+        factors = self._factors
+        factors.fill(1.0)
+        if config.noise > 0:
+            factors += config.noise * self.rng.standard_normal(factors.shape)
+        if config.forecast_error > 0:
+            correlation = config.forecast_error_correlation
+            error = self.rng.standard_normal(factors.shape)
+            # stationary process with unit variance
+            error[..., 1:] *= sqrt(1 - correlation**2)
+            ar1_filter(error, correlation)
+            factors += config.forecast_error * error
+        np.clip(factors, 0, self._max_factor, out=factors)
+
+    def _bootstrap(self) -> np.ndarray:
+        """
+        Copy the base timeseries into the buffer, with their days resampled \
+            within the bootstrap window
+
+        Returns:
+            np.ndarray: The (batch_size, n_days) base day of each scenario day
+        """
+        config = self.config
+        batch_size, n_series, _ = self.buffer.shape
+        n_days, steps_per_day = self._n_days, self.steps_per_day
+        end = n_days * steps_per_day
+        days = np.broadcast_to(np.arange(n_days), (batch_size, n_days))
+        if config.bootstrap_window is None:
+            self.buffer[:] = self._base
+            return days
+        window, step = config.bootstrap_window, 1
+        if config.bootstrap_same_weekday:
+            window, step = window // DAYS_PER_WEEK, DAYS_PER_WEEK
+        offsets = step * self.rng.integers(
+            -window, window + 1, size=(batch_size, n_days)
+        )
+        # days out of the timeseries are reflected to stay on the same weekday
+        shifted = days + offsets
+        days = np.where((shifted < 0) | (shifted >= n_days), days - offsets, shifted)
+        base_days = self._base[:, :end].reshape(n_series, n_days, steps_per_day)
+        for i in range(n_series):
+            self.buffer[:, i, :end] = base_days[i][days].reshape(batch_size, end)
+        self.buffer[:, :, end:] = self._base[:, end:]
+        return days
+
+    def _swap_regimes(self, days: np.ndarray) -> None:
+        """
+        Replace pv days of the buffer by the same days of other sites
+
+        Args:
+            days (np.ndarray): The (batch_size, n_days) base day of each \
+                scenario day
+        """
+        batch_size, n_days = days.shape
+        end = n_days * self.steps_per_day
+        swaps = self.rng.random(days.shape) < self.config.regime_swap_probability
+        scenarios, swapped_days = np.nonzero(swaps)
+        sites = self.rng.integers(len(self._sites), size=len(scenarios))
+        pv = self.buffer[:, self.names.index("pv"), :end]
+        pv.shape = (batch_size, n_days, self.steps_per_day)  # view, never a copy
+        pv[scenarios, swapped_days] = self._sites[sites, days[scenarios, swapped_days]]
+
+    def draw(self) -> None:
+        """
+        Draw a new batch of scenarios into the buffer. Views returned by \
+            sample are overwritten, unless the buffer is shared with a fork.
+        """
+        if self._shared:
+            self.buffer = np.empty_like(self.buffer)
+            self._factors = np.empty_like(self._factors)
+            self._shared = False
+        days = self._bootstrap()
+        if self._sites is not None:
+            self._swap_regimes(days)
+        if self._perturbed:
+            self._draw_factors()
+        self._next = 0
+
+    def sample(self, start: int = 0) -> Dict[str, np.ndarray]:
+        """
+        Get the next scenario of the buffer, drawing a new batch when all were \
+            used.
+
+        Args:
+            start (int, optional): The first timestep of the episode, from \
+                which the noise and forecast error are applied (wrapping around\
+                the end of the timeseries). Defaults to 0.
+
+        Returns:
+            Dict[str, np.ndarray]: Read-only views of the perturbed timeseries,\
+                by name. They are valid until the next batch is drawn.
+        """
+        if self._next >= len(self.buffer):
+            self.draw()
+        if self._perturbed and self._shared:
+            # the perturbations are applied in place
+            self.buffer = self.buffer.copy()
+            self._shared = False
+        timeseries = self.buffer[self._next]
+        if self._perturbed:
+            factors = self._factors[self._next]
+            length = min(factors.shape[1], timeseries.shape[1] - start)
+            stop = start + length
+            timeseries[:, start:stop] *= factors[:, :length]
+            wrapped = factors.shape[1] - length
+            timeseries[:, :wrapped] *= factors[:, length:]
+        self._current = self._next
+        self._next += 1
+        return self._views(self._current)
+
+    def current(self) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Returns:
+            Optional[Dict[str, np.ndarray]]: Read-only views of the last \
+                sampled timeseries by name, None if none was sampled. They are \
+                valid until the next batch is drawn.
+        """
+        return None if self._current is None else self._views(self._current)
+
+    def get_bounds(self) -> Dict[str, Tuple[float, float]]:
+        """
+        Returns:
+            Dict[str, Tuple[float, float]]: The min and max values of each \
+                perturbed (unscaled) timeserie over all the scenarios, by name
+        """
+        low_factor = 0.0 if self._perturbed else 1.0
+        bounds: Dict[str, Tuple[float, float]] = {}
+        for name, base in zip(self.names, self._base):
+            values = [base.min(), base.max()]
+            if name == "pv" and self._sites is not None:
+                values += [self._sites.min(), self._sites.max()]
+            products = [
+                value * factor
+                for value in values
+                for factor in (low_factor, self._max_factor)
+            ]
+            bounds[name] = (float(min(products)), float(max(products)))
+        return bounds
+
+    def _views(self, index: int) -> Dict[str, np.ndarray]:
+        scenario: Dict[str, np.ndarray] = {}
+        for name, serie in zip(self.names, self.buffer[index]):
+            serie = serie.view()
+            serie.flags.writeable = False
+            scenario[name] = serie
+        return scenario
+
+    def fork(self) -> "ScenarioSampler":
+        """
+        Copy the sampler in its current state. The copy has its own random \
+            generator and shares the buffer with the original until one of \
+            them writes to it: a private buffer is then allocated, so that \
+            forking doesn't depend on the length of the timeseries and the \
+            scenarios of the other are never overwritten.
+
+        Returns:
+            ScenarioSampler: The forked sampler
+        """
+        # pylint: disable=protected-access
+        forked = copy.copy(self)
+        forked.rng = copy.deepcopy(self.rng)
+        self._shared = forked._shared = True
+        return forked
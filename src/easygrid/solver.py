@@ -0,0 +1,541 @@
+"""
+Perfect-foresight optimal dispatch of the microgrid, to be used as a baseline
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from easygrid.microgrid import Microgrid
+
+
+def get_problem(
+    microgrid: Microgrid, n_steps: int, start: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Extract the data of the dispatch problem over the next timesteps of the \
+        microgrid (as seen by run_timestep).
+
+    Args:
+        microgrid (Microgrid): The microgrid
+        n_steps (int): The number of timesteps
+        start (Optional[int], optional): The first timestep. Defaults to None \
+            (the next timestep of the microgrid).
+
+    Returns:
+        Dict[str, np.ndarray]: The net load (load - pv energy), import and \
+            export prices of each timestep
+    """
+    start = microgrid.t + 1 if start is None else start
+    timesteps = microgrid.get_index(np.arange(start, start + n_steps))
+    delta_t = microgrid.delta_t
+    return {
+        "net_load": (
+            microgrid.load.load_ts[timesteps] - microgrid.pv.pv_production_ts[timesteps]
+        )
+        * delta_t,
+        "import_prices": microgrid.grid.import_prices[timesteps],
+        "export_prices": microgrid.grid.export_prices[timesteps],
+    }
+
+
+def get_step_costs(
+    microgrid: Microgrid, problem: Dict[str, np.ndarray], energy_battery: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the cost of each timestep for each battery energy, the grid energy \
+        being chosen optimally. The cost (grid cost and penalties on the \
+        absolute energy imbalance) is piecewise linear in the grid energy, so its\
+        minimum is either at 0, at the balance or at the grid limits.
+
+    Args:
+        microgrid (Microgrid): The microgrid
+        problem (Dict[str, np.ndarray]): The problem data, see get_problem
+        energy_battery (np.ndarray): The battery energies, broadcastable with \
+            the (T, 1) problem data
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The minimal costs and corresponding grid \
+            energies
+    """
+    max_grid = microgrid.max_actions[1]
+    net_load = problem["net_load"][:, None]
+    import_prices = problem["import_prices"][:, None]
+    export_prices = problem["export_prices"][:, None]
+    # grid energy required to balance the microgrid
+    required = net_load + energy_battery
+    candidates = np.clip(
+        np.stack(
+            [
+                np.zeros_like(required),
+                required,
+                np.full_like(required, -max_grid),
+                np.full_like(required, max_grid),
+            ]
+        ),
+        -max_grid,
+        max_grid,
+    )
+    balance = candidates - required
+    costs = (
+        candidates * np.where(candidates >= 0, import_prices, export_prices)
+        + np.maximum(balance, 0) * microgrid.overproduction_penalty
+        + np.maximum(-balance, 0) * microgrid.underproduction_penalty
+    )
+    best = np.argmin(costs, axis=0)
+    return (
+        np.take_along_axis(costs, best[None], axis=0)[0],
+        np.take_along_axis(candidates, best[None], axis=0)[0],
+    )
+
+
+def get_bins(microgrid: Microgrid, n_bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Discretize the battery energy between its low and high capacities
+
+    Args:
+        microgrid (Microgrid): The microgrid
+        n_bins (int): The number of state of charge bins
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The energy of each bin, and the offsets \
+            (in bins) reachable in a single timestep given the max output
+    """
+    battery = microgrid.battery
+    energies = np.linspace(battery.low_capacity, battery.high_capacity, n_bins)
+    step = energies[1] - energies[0]
+    max_offset = int(
+        min(n_bins - 1, np.floor(battery.max_output * microgrid.delta_t / step))
+    )
+    return energies, np.arange(-max_offset, max_offset + 1)
+
+
+def get_bin(energies: np.ndarray, energy: float) -> int:
+    """
+    Args:
+        energies (np.ndarray): The energy of each bin
+        energy (float): A battery energy
+
+    Returns:
+        int: The closest bin
+    """
+    step = energies[1] - energies[0]
+    return int(np.clip(np.rint((energy - energies[0]) / step), 0, len(energies) - 1))
+
+
+def backward_pass(
+    step_costs: np.ndarray,
+    n_bins: int,
+    offsets: np.ndarray,
+    terminal_values: np.ndarray = None,
+    deadline: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dynamic programming over the state of charge bins, vectorized across bins.
+
+    Args:
+        step_costs (np.ndarray): The (T, n_offsets) cost of each timestep and \
+            battery move
+        n_bins (int): The number of state of charge bins
+        offsets (np.ndarray): The battery moves (in bins)
+        terminal_values (np.ndarray, optional): The (n_bins,) values after the \
+            last timestep. Defaults to None (zeros).
+        deadline (Optional[float], optional): The time.perf_counter value after\
+            which the pass is aborted with a TimeoutError. Defaults to None.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The (T, n_bins) optimal move index of each\
+            timestep and bin, and the (n_bins,) optimal cost-to-go of each bin
+    """
+    next_bins = np.arange(n_bins)[:, None] + offsets[None, :]
+    unreachable = np.where((next_bins < 0) | (next_bins >= n_bins), np.inf, 0.0)
+    next_bins = np.clip(next_bins, 0, n_bins - 1)
+    rows = np.arange(n_bins)
+    values = np.zeros(n_bins) if terminal_values is None else terminal_values
+    policy = np.empty((len(step_costs), n_bins), dtype=np.int16)
+    for t in range(len(step_costs) - 1, -1, -1):
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError("The dynamic programming deadline was exceeded")
+        total = values[next_bins] + unreachable + step_costs[t]
+        policy[t] = np.argmin(total, axis=1)
+        values = total[rows, policy[t]]
+    return policy, values
+
+
+def forward_pass(policy: np.ndarray, offsets: np.ndarray, start_bin: int) -> np.ndarray:
+    """
+    Follow the optimal policy from a given bin
+
+    Args:
+        policy (np.ndarray): The (T, n_bins) optimal move index
+        offsets (np.ndarray): The battery moves (in bins)
+        start_bin (int): The initial bin
+
+    Returns:
+        np.ndarray: The (T + 1,) bins trajectory
+    """
+    bins = np.empty(len(policy) + 1, dtype=np.int64)
+    bins[0] = start_bin
+    for t, moves in enumerate(policy):
+        bins[t + 1] = bins[t] + offsets[moves[bins[t]]]
+    return bins
+
+
+def solve_dispatch(
+    microgrid: Microgrid, n_bins: int = 101, backend: str = "dp"
+) -> dict:
+    """
+    Compute the cost-optimal battery and grid schedule from the current state \
+        of the microgrid until the end of the episode, with perfect foresight.
+    The battery stays between its low and high capacities and moves at most \
+        max_output per timestep, the grid is limited by max_actions, and the \
+        energy imbalance is penalized in absolute value (over/underproduction \
+        penalties).
+
+    Args:
+        microgrid (Microgrid): The microgrid, which is not modified
+        n_bins (int, optional): The number of state of charge bins of the dynamic\
+            programming backend. Defaults to 101.
+        backend (str, optional): "dp" (dynamic programming) or "lp" (linear \
+            programming, exact, requires scipy). Defaults to "dp".
+
+    Returns:
+        dict: The (T, 2) normalized actions to give to run_timestep, the \
+            (T + 1,) battery energy trajectory and the optimal cost
+    """
+    n_steps = microgrid.end - microgrid.t
+    problem = get_problem(microgrid, n_steps)
+    if backend == "lp":
+        energy = solve_lp(microgrid, problem)
+    elif backend == "dp":
+        energy = solve_dp(microgrid, problem, n_bins)
+    else:
+        raise ValueError(f"Unknown backend {backend}, should be dp or lp")
+    return get_solution(microgrid, problem, energy)
+
+
+def solve_dp(
+    microgrid: Microgrid, problem: Dict[str, np.ndarray], n_bins: int
+) -> np.ndarray:
+    """
+    Dynamic programming backend of solve_dispatch
+
+    Args:
+        microgrid (Microgrid): The microgrid
+        problem (Dict[str, np.ndarray]): The problem data, see get_problem
+        n_bins (int): The number of state of charge bins
+
+    Returns:
+        np.ndarray: The (T + 1,) optimal battery energy trajectory
+    """
+    energies, offsets = get_bins(microgrid, n_bins)
+    step = energies[1] - energies[0]
+    step_costs, _ = get_step_costs(microgrid, problem, offsets * step)
+    policy, _ = backward_pass(step_costs, n_bins, offsets)
+    energy = microgrid.battery.energy
+    start_bin = get_bin(energies, energy)
+    trajectory = energies[forward_pass(policy, offsets, start_bin)]
+    trajectory[0] = energy
+    return trajectory
+
+
+def solve_lp(microgrid: Microgrid, problem: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Linear programming backend of solve_dispatch, requires scipy
+
+    Args:
+        microgrid (Microgrid): The microgrid
+        problem (Dict[str, np.ndarray]): The problem data, see get_problem
+
+    Returns:
+        np.ndarray: The (T + 1,) optimal battery energy trajectory
+    """
+    # pylint: disable=import-outside-toplevel, too-many-locals
+    try:
+        from scipy import sparse
+        from scipy.optimize import linprog
+    except ImportError as error:
+        raise ImportError("The lp backend requires scipy") from error
+
+    battery = microgrid.battery
+    n_steps = len(problem["net_load"])
+    max_grid = microgrid.max_actions[1]
+    max_output = battery.max_output * microgrid.delta_t
+    # variables: charge, discharge, import, export, overprod, underprod, energy
+    ones = sparse.identity(n_steps, format="csr")
+    zeros = sparse.csr_matrix((n_steps, n_steps))
+    # energy[t] - energy[t - 1] - charge[t] + discharge[t] = 0
+    energy_diff = ones - sparse.eye(n_steps, k=-1, format="csr")
+    a_eq = sparse.bmat(
+        [
+            [-ones, ones, zeros, zeros, zeros, zeros, energy_diff],
+            [-ones, ones, ones, -ones, -ones, ones, zeros],
+        ],
+        format="csr",
+    )
+    b_eq = np.concatenate(
+        [np.eye(1, n_steps).ravel() * battery.energy, problem["net_load"]]
+    )
+    cost = np.concatenate(
+        [
+            np.zeros(2 * n_steps),
+            problem["import_prices"],
+            -problem["export_prices"],
+            np.full(n_steps, microgrid.overproduction_penalty),
+            np.full(n_steps, microgrid.underproduction_penalty),
+            np.zeros(n_steps),
+        ]
+    )
+    bounds = (
+        [(0, max_output)] * 2 * n_steps
+        + [(0, max_grid)] * 2 * n_steps
+        + [(0, None)] * 2 * n_steps
+        + [(battery.low_capacity, battery.high_capacity)] * n_steps
+    )
+    result = linprog(cost, A_eq=a_eq, b_eq=b_eq, bounds=bounds, method="highs")
+    if not result.success:
+        raise ValueError(f"The dispatch problem could not be solved: {result.message}")
+    return np.concatenate([[battery.energy], result.x[-n_steps:]])
+
+
+def get_solution(
+    microgrid: Microgrid, problem: Dict[str, np.ndarray], energy: np.ndarray
+) -> dict:
+    """
+    Build the solution from the battery energy trajectory
+
+    Args:
+        microgrid (Microgrid): The microgrid
+        problem (Dict[str, np.ndarray]): The problem data, see get_problem
+        energy (np.ndarray): The (T + 1,) battery energy trajectory
+
+    Returns:
+        dict: The (T, 2) normalized actions, the battery energy trajectory and \
+            the cost
+    """
+    energy_battery = np.diff(energy)
+    costs, energy_grid = get_step_costs(microgrid, problem, energy_battery[:, None])
+    max_actions = microgrid.max_actions
+    actions = np.column_stack(
+        [energy_battery / max_actions[0], energy_grid[:, 0] / max_actions[1]]
+    )
+    return {
+        "actions": np.clip(actions, -1, 1),
+        "battery_energy": energy,
+        "cost": float(costs.sum()),
+    }
+
+
+def dispatch_cost(microgrid: Microgrid, logs: dict) -> float:
+    """
+    Compute the cost minimized by solve_dispatch from microgrid logs (e.g. of \
+        an RL policy), to compute its regret: grid costs and penalties on the \
+        absolute energy imbalance.
+
+    Args:
+        microgrid (Microgrid): The microgrid
+        logs (dict): The logs, as returned by get_logs or evaluate_actions
+
+    Returns:
+        float: The cost
+    """
+    balance = np.asarray(logs["energies"]["balance"])
+    error_cost = np.where(
+        balance >= 0,
+        balance * microgrid.overproduction_penalty,
+        -balance * microgrid.underproduction_penalty,
+    )
+    return float(np.sum(logs["costs"]["grid"]) + error_cost.sum())
+
+
+class MPCController:
+    """
+    Receding horizon controller: at each decision, the dispatch problem over the\
+        next `horizon` timesteps is solved by dynamic programming from the \
+        current battery energy and only the first action is applied.
+    The step cost table is warm-started from the previous decision: it is \
+        shifted by the elapsed timesteps and only the new timesteps are computed.\
+        If a solve exceeds the latency budget, the plan of the previous decision\
+        is followed instead.
+    ...
+
+    Attributes
+    ----------
+    microgrid : Microgrid
+        The controlled microgrid (e.g. GridEnv.microgrid)
+    horizon : int
+        The number of timesteps of each dispatch problem
+    n_bins : int
+        The number of state of charge bins
+    latency_budget : Optional[float]
+        The maximum duration (s) of a solve, None for no limit
+    solve_times : List[float]
+        The duration (s) of each decision
+    n_overruns : int
+        The number of decisions that exceeded the latency budget
+
+    Methods
+    -------
+    act : Get the normalized action for the next timestep of the microgrid
+    reset : Clear the warm start and the statistics
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    def __init__(
+        self,
+        microgrid: Microgrid,
+        horizon: int = 48,
+        n_bins: int = 101,
+        latency_budget: Optional[float] = 0.01,
+    ) -> None:
+        """
+        Args:
+            microgrid (Microgrid): The controlled microgrid
+            horizon (int, optional): The number of timesteps of each dispatch \
+                problem. Defaults to 48.
+            n_bins (int, optional): The number of state of charge bins. \
+                Defaults to 101.
+            latency_budget (Optional[float], optional): The maximum duration (s)\
+                of a solve. Defaults to 0.01.
+        """
+        if horizon < 1:
+            raise ValueError(f"Horizon must be at least 1 ({horizon})")
+        self.microgrid = microgrid
+        self.horizon = horizon
+        self.n_bins = n_bins
+        self.latency_budget = latency_budget
+        self.solve_times: List[float] = []
+        self.n_overruns = 0
+        # warm start: the step costs and plan of the previous decision
+        self._key: tuple = ()
+        self._costs_start = 0
+        self._step_costs = np.empty((0, 0))
+        self._plan_start = 0
+        self._plan = np.empty(0)
+
+    def reset(self) -> None:
+        """
+        Clear the warm start and the statistics
+        """
+        self.solve_times = []
+        self.n_overruns = 0
+        self._key = ()
+        self._costs_start = 0
+        self._step_costs = np.empty((0, 0))
+        self._plan_start = 0
+        self._plan = np.empty(0)
+
+    def _get_key(self) -> tuple:
+        """
+        Returns:
+            tuple: Everything the step costs depend on, they are reused as long\
+                as it doesn't change (the timeseries are compared by identity)
+        """
+        microgrid = self.microgrid
+        battery = microgrid.battery
+        return (
+            microgrid.grid.import_prices,
+            microgrid.grid.export_prices,
+            microgrid.load.load_ts,
+            microgrid.pv.pv_production_ts,
+            battery.low_capacity,
+            battery.high_capacity,
+            battery.max_output,
+            microgrid.delta_t,
+            microgrid.overproduction_penalty,
+            microgrid.underproduction_penalty,
+            *microgrid.max_actions.tolist(),
+        )
+
+    def _is_cached(self, key: tuple) -> bool:
+        return len(key) == len(self._key) and all(
+            new is old or (np.isscalar(new) and new == old)
+            for new, old in zip(key, self._key)
+        )
+
+    def _get_step_costs(
+        self, start: int, n_steps: int, moves: np.ndarray
+    ) -> np.ndarray:
+        """
+        Get the step costs of the timesteps [start, start + n_steps), reusing \
+            the ones of the previous decision.
+        """
+        key = self._get_key()
+        if self._is_cached(key) and self._costs_start <= start:
+            shift = start - self._costs_start
+            end = shift + n_steps
+            reused = self._step_costs[shift:end]
+        else:
+            reused = self._step_costs[:0].reshape(0, len(moves))
+        n_missing = n_steps - len(reused)
+        if n_missing > 0:
+            problem = get_problem(self.microgrid, n_missing, start + len(reused))
+            missing, _ = get_step_costs(self.microgrid, problem, moves)
+            reused = np.concatenate([reused, missing])
+        self._key = key
+        self._costs_start = start
+        self._step_costs = reused
+        return reused
+
+    def _follow_plan(self, start: int) -> float:
+        """
+        Returns:
+            float: The next battery energy of the previous plan, or the \
+                current energy if there is none
+        """
+        battery = self.microgrid.battery
+        index = start - self._plan_start + 1
+        if 0 < index < len(self._plan):
+            max_move = battery.max_output * self.microgrid.delta_t
+            return float(
+                np.clip(
+                    self._plan[index],
+                    max(battery.low_capacity, battery.energy - max_move),
+                    min(battery.high_capacity, battery.energy + max_move),
+                )
+            )
+        return battery.energy
+
+    def act(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The normalized action to give to run_timestep
+        """
+        start_time = time.perf_counter()
+        microgrid = self.microgrid
+        n_steps = min(self.horizon, microgrid.end - microgrid.t)
+        if n_steps <= 0:
+            return np.zeros(2)
+        start = microgrid.t + 1
+        deadline = (
+            None if self.latency_budget is None else start_time + self.latency_budget
+        )
+        energy = microgrid.battery.energy
+        energies, offsets = get_bins(microgrid, self.n_bins)
+        try:
+            step_costs = self._get_step_costs(
+                start, n_steps, offsets * (energies[1] - energies[0])
+            )
+            policy, _ = backward_pass(
+                step_costs, self.n_bins, offsets, deadline=deadline
+            )
+            plan = energies[forward_pass(policy, offsets, get_bin(energies, energy))]
+            plan[0] = energy
+            self._plan_start, self._plan = start, plan
+            next_energy = plan[1]
+        except TimeoutError:
+            self.n_overruns += 1
+            next_energy = self._follow_plan(start)
+        solution = get_solution(
+            microgrid, get_problem(microgrid, 1), np.array([energy, next_energy])
+        )
+        self.solve_times.append(time.perf_counter() - start_time)
+        return solution["actions"][0]
+
+    def __call__(self, observation: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Policy interface, the observation is not used as the controller reads \
+            the state of its microgrid.
+        """
+        # pylint: disable=unused-argument
+        return self.act()
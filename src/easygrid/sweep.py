@@ -0,0 +1,339 @@
+"""
+Parallel sweep of policy evaluations over a grid of microgrid scenarios \
+(battery size, scaling factors, load and pv profiles, timestep duration)
+"""
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from easygrid.cache import ResultCache, get_key
+from easygrid.data.data_utils import DATA_FOLDER, get_indexes, share_config
+from easygrid.data.shared import published, unpublish
+from easygrid.microgrid import Microgrid
+from easygrid.solver import MPCController, dispatch_cost, solve_dispatch
+from easygrid.types import MicrogridConfig
+
+# scenario parameter -> (component, field) of the config
+CONFIG_PARAMETERS = {
+    "load": ("load", "load_ts"),
+    "pv": ("pv", "pv_production_ts"),
+    "load_factor": ("load", "load_factor"),
+    "production_factor": ("pv", "production_factor"),
+    "import_price_factor": ("grid", "import_price_factor"),
+    "export_price_factor": ("grid", "export_price_factor"),
+}
+# scenario parameters that are fields of the config itself
+MICROGRID_PARAMETERS = ["delta_t"]
+PARAMETERS = list(CONFIG_PARAMETERS) + MICROGRID_PARAMETERS + ["battery_duration"]
+
+
+def optimal_policy(microgrid: Microgrid) -> dict:
+    """
+    Perfect-foresight optimal dispatch, see solve_dispatch
+    """
+    return microgrid.evaluate_actions(solve_dispatch(microgrid)["actions"])
+
+
+def mpc_policy(microgrid: Microgrid) -> dict:
+    """
+    Receding horizon (48 timesteps) controller, see MPCController
+    """
+    controller = MPCController(microgrid, latency_budget=None)
+    while not microgrid.done:
+        microgrid.run_timestep(controller.act(), observe=False)
+    return microgrid.get_logs()
+
+
+def idle_policy(microgrid: Microgrid) -> dict:
+    """
+    The battery is not used and the grid balances the microgrid
+    """
+    timesteps = microgrid.get_index(np.arange(microgrid.t + 1, microgrid.end + 1))
+    net_load = (
+        microgrid.load.load_ts[timesteps] - microgrid.pv.pv_production_ts[timesteps]
+    ) * microgrid.delta_t
+    actions = np.zeros((len(timesteps), 2))
+    actions[:, 1] = np.clip(net_load / microgrid.max_actions[1], -1, 1)
+    return microgrid.evaluate_actions(actions)
+
+
+def random_policy(microgrid: Microgrid) -> dict:
+    """
+    Uniform random actions, seeded by the microgrid random generator
+    """
+    actions = microgrid.rng.uniform(-1, 1, size=(microgrid.end - microgrid.t, 2))
+    return microgrid.evaluate_actions(actions)
+
+
+POLICIES: Dict[str, Callable[[Microgrid], dict]] = {
+    "optimal": optimal_policy,
+    "mpc": mpc_policy,
+    "idle": idle_policy,
+    "random": random_policy,
+}
+
+
+def get_scenarios(param_grid: Dict[str, Sequence]) -> List[dict]:
+    """
+    Expand a parameter grid into scenarios
+
+    Args:
+        param_grid (Dict[str, Sequence]): The values of each parameter (see \
+            PARAMETERS), e.g. {"battery_duration": [2, 4], "pv": [...]}
+
+    Returns:
+        List[dict]: One dict of parameters per combination of values
+    """
+    unknown = set(param_grid) - set(PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters {unknown}, should be {PARAMETERS}")
+    names = list(param_grid)
+    return [
+        dict(zip(names, values))
+        for values in itertools.product(*(param_grid[name] for name in names))
+    ]
+
+
+def get_scenario_id(scenario: dict, policy: str) -> str:
+    """
+    Args:
+        scenario (dict): The parameters of the scenario
+        policy (str): The evaluated policy
+
+    Returns:
+        str: A stable identifier of the evaluation, used to resume sweeps
+    """
+    content = json.dumps({"policy": policy, **scenario}, sort_keys=True, default=str)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+
+def get_scenario_config(
+    base_config: MicrogridConfig, scenario: dict
+) -> MicrogridConfig:
+    """
+    Args:
+        base_config (MicrogridConfig): The config to modify
+        scenario (dict): The parameters of the scenario
+
+    Returns:
+        MicrogridConfig: A copy of the config with the parameters of the scenario
+    """
+    config = base_config.copy(deep=True)
+    for name, value in scenario.items():
+        if name in CONFIG_PARAMETERS:
+            component, field = CONFIG_PARAMETERS[name]
+            setattr(getattr(config, component), field, value)
+        elif name in MICROGRID_PARAMETERS:
+            setattr(config, name, value)
+    return config
+
+
+def run_scenario(
+    config: MicrogridConfig,
+    scenario: dict,
+    policy: str = "optimal",
+    cache: Optional[ResultCache] = None,
+    store_logs: bool = False,
+) -> dict:
+    """
+    Evaluate a policy on a scenario, or get its result from the cache
+
+    Args:
+        config (MicrogridConfig): The config of the scenario (see \
+            get_scenario_config)
+        scenario (dict): The parameters of the scenario
+        policy (str, optional): The policy, see POLICIES. Defaults to "optimal".
+        cache (Optional[ResultCache], optional): The result cache. Defaults to \
+            None (no cache).
+        store_logs (bool, optional): Wether or not to also store the logs in \
+            the cache. Defaults to False.
+
+    Returns:
+        dict: The summary row of the scenario
+    """
+    start = time.perf_counter()
+    microgrid = Microgrid(config)
+    if "battery_duration" in scenario:
+        microgrid.set_battery_from_duration(scenario["battery_duration"])
+    summary, key = None, ""
+    if cache is not None:
+        key = get_key(microgrid.config, policy)
+        summary = cache.get(key)
+    cached = summary is not None
+    if summary is None:
+        logs = POLICIES[policy](microgrid)
+        summary = summarize(microgrid, logs)
+        if cache is not None:
+            cache.put(key, summary, logs if store_logs else None)
+    return {
+        "scenario_id": get_scenario_id(scenario, policy),
+        **{
+            name: os.path.basename(str(value)) if name in ("load", "pv") else value
+            for name, value in scenario.items()
+        },
+        "policy": policy,
+        **summary,
+        "cached": cached,
+        "runtime_s": time.perf_counter() - start,
+    }
+
+
+def summarize(microgrid: Microgrid, logs: dict) -> dict:
+    """
+    Args:
+        microgrid (Microgrid): The evaluated microgrid
+        logs (dict): The logs of the evaluation
+
+    Returns:
+        dict: The total costs, grid energies and final battery health of the \
+            evaluation
+    """
+    costs, energies = logs["costs"], logs["energies"]
+    grid_energy = np.asarray(energies["grid"])
+    return {
+        "n_steps": len(grid_energy),
+        "total_cost": float(np.sum(costs["total"])),
+        "overcharge_cost": float(np.sum(costs["overcharge"])),
+        "grid_cost": float(np.sum(costs["grid"])),
+        "error_cost": float(np.sum(costs["error"])),
+        "dispatch_cost": dispatch_cost(microgrid, logs),
+        "imported_energy": float(grid_energy[grid_energy > 0].sum()),
+        "exported_energy": float(-grid_energy[grid_energy < 0].sum()),
+        "battery_health": microgrid.battery.health,
+    }
+
+
+def read_done(output: str) -> List[str]:
+    """
+    Args:
+        output (str): The summary csv file of a sweep
+
+    Returns:
+        List[str]: The ids of the scenarios already in the file
+    """
+    if not os.path.exists(output):
+        return []
+    with open(output, newline="", encoding="utf-8") as csv_file:
+        return [row["scenario_id"] for row in csv.DictReader(csv_file)]
+
+
+def run_sweep(
+    param_grid: Dict[str, Sequence],
+    output: str,
+    base_config: Optional[MicrogridConfig] = None,
+    policy: str = "optimal",
+    max_workers: Optional[int] = None,
+    share: bool = True,
+    cache: Optional[ResultCache] = None,
+    store_logs: bool = False,
+) -> List[dict]:
+    """
+    Evaluate a policy on all the scenarios of a parameter grid, in parallel, and\
+        append one summary row per scenario to a csv file as they complete.
+    Scenarios already in the file are skipped, so an interrupted sweep can be \
+        resumed by running it again.
+
+    Args:
+        param_grid (Dict[str, Sequence]): The values of each parameter, see \
+            get_scenarios
+        output (str): The summary csv file
+        base_config (Optional[MicrogridConfig], optional): The config modified \
+            by the scenarios. Defaults to None (pymgrid config).
+        policy (str, optional): The policy, see POLICIES. Defaults to "optimal".
+        max_workers (Optional[int], optional): The number of worker processes. \
+            Defaults to None (number of cpus).
+        share (bool, optional): Wether or not to load the datasets once in \
+            shared memory for all workers. Defaults to True.
+        cache (Optional[ResultCache], optional): The cache of the evaluations \
+            results, evicted once the sweep is done if it exceeds its maximum \
+            size. Defaults to None (no cache).
+        store_logs (bool, optional): Wether or not to also store the logs in \
+            the cache. Defaults to False.
+
+    Returns:
+        List[dict]: The summary rows of the scenarios run by this call
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy {policy}, should be in {list(POLICIES)}")
+    if base_config is None:
+        # pylint: disable=import-outside-toplevel
+        from easygrid.config.pymgrid_config import mg_config
+
+        base_config = mg_config
+    done = set(read_done(output))
+    scenarios = [
+        scenario
+        for scenario in get_scenarios(param_grid)
+        if get_scenario_id(scenario, policy) not in done
+    ]
+    already_published = set(published())
+    configs = [get_scenario_config(base_config, scenario) for scenario in scenarios]
+    if share:
+        configs = [share_config(config) for config in configs]
+    rows = []
+    try:
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [
+                executor.submit(
+                    run_scenario, config, scenario, policy, cache, store_logs
+                )
+                for config, scenario in zip(configs, scenarios)
+            ]
+            for future in as_completed(futures):
+                rows.append(future.result())
+                write_row(output, rows[-1])
+        if cache is not None and cache.enabled:
+            # each task puts its result in a copy of the cache that only counts\
+            # its own writes: the size of the whole sweep is checked once here
+            cache.evict()
+    finally:
+        for name in set(published()) - already_published:
+            unpublish(name)
+    return rows
+
+
+def write_row(output: str, row: dict) -> None:
+    """
+    Append a summary row to the csv file, creating it with a header if needed
+
+    Args:
+        output (str): The summary csv file
+        row (dict): The summary row
+    """
+    new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+    if new_file:
+        fields = list(row)
+    else:
+        with open(output, newline="", encoding="utf-8") as csv_file:
+            fields = next(csv.reader(csv_file))
+    with open(output, "a", newline="", encoding="utf-8") as csv_file:
+        writer = csv.DictWriter(csv_file, fields, extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+        writer.writerow(row)
+
+
+def get_profiles(names: Sequence[str], data_type: str) -> List[str]:
+    """
+    Args:
+        names (Sequence[str]): Paths or names of files bundled in easygrid's \
+            data folder, or ["all"] for all bundled files
+        data_type (str): The data folder ("load" or "pv")
+
+    Returns:
+        List[str]: The paths of the profiles
+    """
+    if list(names) == ["all"]:
+        return sorted(get_indexes(DATA_FOLDER)[data_type])
+    return [
+        name if os.path.exists(name) else os.path.join(DATA_FOLDER, data_type, name)
+        for name in names
+    ]
@@ -2,10 +2,29 @@
 Type helpers for the project
 """
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Literal, Optional, Type, TypeVar, cast
 
 from pydantic import BaseModel
 
+ConfigT = TypeVar("ConfigT", bound=BaseModel)
+
+
+class DegradationConfig(BaseModel):
+    """
+    This TypedDict represents the battery degradation model, see \
+        easygrid.degradation
+    """
+
+    # number of full depth cycles until the end of life
+    cycle_life: float = 5000
+    # relative capacity at the end of life
+    end_of_life: float = 0.8
+    # a cycle of depth d (relative to the nominal capacity) counts as \
+    # d ** dod_exponent full cycles
+    dod_exponent: float = 2.0
+    # relative capacity lost per equivalent full cycle of energy throughput
+    throughput_fade: float = 0.0
+
 
 class BatteryConfig(BaseModel):
     """
@@ -20,6 +39,8 @@ class BatteryConfig(BaseModel):
     min_output: float
     initial_energy: Optional[float] = 0
     overcharge_penalty: float
+    # capacity fade with cycling, None for a battery that doesn't degrade
+    degradation: Optional[DegradationConfig] = None
 
 
 class GridConfig(BaseModel):
@@ -56,16 +77,143 @@ class LoadConfig(BaseModel):
     load_factor: Optional[float] = 1.0
 
 
+class ObservationConfig(BaseModel):
+    """
+    This TypedDict represents the observation config template to be fed \
+        to the microgrid
+    """
+
+    # number of future timesteps observed
+    horizon: int = 1
+    calendar_features: bool = False
+
+
+class ScenarioConfig(BaseModel):
+    """
+    This TypedDict represents the config of the stochastic perturbations of \
+        the timeseries, drawn at each reset of the microgrid
+    """
+
+    # timeseries to perturb
+    series: List[Literal["import_prices", "export_prices", "load", "pv"]] = [
+        "load",
+        "pv",
+    ]
+    # std of the multiplicative white noise
+    noise: float = 0.0
+    # std and correlation of the multiplicative AR(1) forecast error
+    forecast_error: float = 0.0
+    forecast_error_correlation: float = 0.9
+    # days are drawn (jointly for all series) within +/- this number of days, \
+    # among the same days of the week to keep weekly patterns
+    bootstrap_window: Optional[int] = None
+    bootstrap_same_weekday: bool = True
+    # probability to replace a pv day by the same day of another pv site
+    regime_swap_probability: float = 0.0
+    # the other pv sites, the ones bundled with easygrid if None
+    pv_sites: Optional[List[Path]] = None
+    # number of scenarios drawn at once
+    batch_size: int = 16
+    seed: Optional[int] = None
+
+
 class MicrogridConfig(BaseModel):
     """
     This TypedDict represents the battery config template to be fed \
         to the microgrid
     """
 
+    # number of (hourly) timesteps of the timeseries
     max_timestep: int
+    # duration (hours) of a timestep, the timeseries are resampled to it
+    delta_t: float = 1.0
+    # number of times the timeseries are looped over (e.g. 20 for a 20 years \
+    # horizon from yearly timeseries), by index arithmetic without copies
+    loops: int = 1
     overprod_penalty: float
     underprod_penalty: float
     pv: PvConfig
     load: LoadConfig
     grid: GridConfig
     battery: BatteryConfig
+    observation: ObservationConfig = ObservationConfig()
+    # episodes run until the end of the timeseries if no length is given
+    episode_length: Optional[int] = None
+    # "zero": episodes start at t=0, "uniform": at any timestep, "daily": at the \
+    # start of any day
+    start_sampler: Literal["zero", "uniform", "daily"] = "zero"
+    seed: Optional[int] = None
+    # perturbations of the timeseries drawn at each reset, see easygrid.scenarios
+    scenarios: Optional[ScenarioConfig] = None
+
+
+_FROZEN: Dict[type, type] = {}
+
+
+def frozen(config_class: Type[ConfigT]) -> Type[ConfigT]:
+    """
+    Get the immutable version of a config class, used for the config snapshots\
+        of the microgrid. Copies of immutable configs are mutable.
+
+    Args:
+        config_class (Type[ConfigT]): The config class
+
+    Returns:
+        Type[ConfigT]: The immutable subclass
+    """
+    if config_class not in _FROZEN:
+
+        class FrozenConfig(config_class):  # type: ignore
+            # pylint: disable=too-few-public-methods
+            class Config:
+                allow_mutation = False
+
+            def _copy_and_set_values(self, values, fields_set, *, deep):
+                return thaw(super()._copy_and_set_values(values, fields_set, deep=deep))
+
+            def __reduce__(self):
+                return freeze, (thaw(self),)
+
+        FrozenConfig.__name__ = config_class.__name__
+        FrozenConfig.__qualname__ = config_class.__qualname__
+        _FROZEN[config_class] = FrozenConfig
+    return _FROZEN[config_class]
+
+
+def freeze(config: ConfigT) -> ConfigT:
+    """
+    Args:
+        config (ConfigT): A config
+
+    Returns:
+        ConfigT: An immutable copy of the config (and of its sub-configs), \
+            without validation
+    """
+    config_class = type(config)
+    if config_class in _FROZEN.values():
+        return config
+    values = {
+        name: freeze(value) if isinstance(value, BaseModel) else value
+        for name, value in config.__dict__.items()
+    }
+    return frozen(config_class).construct(config.__fields_set__, **values)
+
+
+def thaw(config: ConfigT) -> ConfigT:
+    """
+    Args:
+        config (ConfigT): A config
+
+    Returns:
+        ConfigT: A mutable version of the config (and of its sub-configs), \
+            without validation
+    """
+    config_class = type(config)
+    if config_class not in _FROZEN.values():
+        return config
+    values = {
+        name: thaw(value) if isinstance(value, BaseModel) else value
+        for name, value in config.__dict__.items()
+    }
+    base_class = cast(Type[ConfigT], config_class.__bases__[0])
+    return base_class.construct(config.__fields_set__, **values)
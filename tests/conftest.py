@@ -0,0 +1,22 @@
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# keep the cached datasets and results of the tests out of the user cache, \
+# before the test modules load datasets at import time
+CACHE_FOLDER = tempfile.mkdtemp(prefix="easygrid_cache_")
+
+
+def pytest_configure(config):
+    os.environ["EASYGRID_CACHE_DIR"] = CACHE_FOLDER
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(CACHE_FOLDER, ignore_errors=True)
+
+
+@pytest.fixture
+def cache_folder():
+    return CACHE_FOLDER
@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from easygrid.batch import BatchMicrogrid
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.microgrid import Microgrid
+
+
+def test_batch_matches_microgrid():
+    n_grids = 4
+    batch = BatchMicrogrid(mg_config, n_grids=n_grids)
+    microgrids = [Microgrid(mg_config) for _ in range(n_grids)]
+    assert len(batch) == n_grids
+    assert np.allclose(batch.reset(), np.stack([mg.reset() for mg in microgrids]))
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        actions = rng.uniform(-1, 1, size=(n_grids, 2))
+        obs, done, costs = batch.run_timestep(actions)
+        for i, mg in enumerate(microgrids):
+            mg_obs, mg_done, mg_costs = mg.run_timestep(actions[i], logging=False)
+            assert np.allclose(obs[i], mg_obs)
+            assert np.allclose(costs[i], mg_costs)
+            assert done[i] == mg_done
+    assert obs.shape == (n_grids, 5) and costs.shape == (n_grids, 3)
+
+
+def test_batch_reset():
+    batch = BatchMicrogrid([mg_config, mg_config])
+    batch.run_timestep(np.ones((2, 2)))
+    batch.reset(mask=np.array([True, False]))
+    assert list(batch.t) == [0, 1]
+    assert batch.energy[0] == batch.initial_energy[0]
+    batch.t[:] = batch.MAX_TIMESTEP - 3
+    _, done, _ = batch.run_timestep(np.zeros((2, 2)))
+    assert done.all()
+    with pytest.raises(ValueError):
+        BatchMicrogrid([mg_config], n_grids=2)
+
+
+def test_batch_different_lengths(tmp_path):
+    short_file = tmp_path / "short.csv"
+    np.savetxt(short_file, np.ones(11), header="value", comments="")
+    short_config = mg_config.copy(deep=True)
+    short_config.max_timestep = 11
+    short_config.pv.pv_production_ts = short_file
+    short_config.load.load_ts = short_file
+    short_config.grid.import_prices = short_file
+    short_config.grid.export_prices = short_file
+    # both microgrids are valid on their own
+    Microgrid(short_config)
+    Microgrid(mg_config)
+    with pytest.raises(ValueError, match="same maximum number of timesteps"):
+        BatchMicrogrid([mg_config, short_config])
+    short_config.max_timestep = 10
+    with pytest.raises(ValueError, match="Prices timeseries lengths"):
+        BatchMicrogrid(short_config)
+
+
+def test_batch_episode_windows():
+    config = mg_config.copy(deep=True)
+    config.episode_length = 24
+    config.start_sampler = "uniform"
+    batch = BatchMicrogrid(config, n_grids=8)
+    batch.seed(0)
+    batch.reset()
+    assert len(set(batch.start)) > 1
+    # each microgrid has its own generator, seeded by its config
+    seeded = config.copy(update={"seed": 0})
+    replicated = BatchMicrogrid(seeded, n_grids=8)
+    replicated.reset()
+    assert len(set(replicated.start)) > 1
+    starts = batch.start.copy()
+    batch.seed([0] * 8)
+    batch.reset()
+    assert np.array_equal(batch.start, starts)
+    first = BatchMicrogrid([seeded, config.copy(update={"seed": 1})])
+    first.reset()
+    second = BatchMicrogrid([seeded, config.copy(update={"seed": 2})])
+    second.reset()
+    assert first.start[0] == second.start[0] and first.start[1] != second.start[1]
+    with pytest.raises(ValueError, match="Number of seeds"):
+        batch.seed([0, 1])
+    assert np.array_equal(batch.t, batch.start)
+    for _ in range(23):
+        _, done, _ = batch.run_timestep(np.zeros((8, 2)))
+        assert not done.any()
+    _, done, _ = batch.run_timestep(np.zeros((8, 2)))
+    assert done.all()
+    other_config = config.copy()
+    other_config.episode_length = 48
+    with pytest.raises(ValueError):
+        BatchMicrogrid([config, other_config])
+    other_config.episode_length = batch.MAX_TIMESTEP
+    with pytest.raises(ValueError, match="longer than"):
+        BatchMicrogrid(other_config)
+
+
+def test_batch_resolution():
+    config = mg_config.copy(deep=True)
+    config.delta_t = 0.5
+    batch = BatchMicrogrid(config, n_grids=2)
+    mg = Microgrid(config)
+    assert batch.delta_t == 0.5 and batch.MAX_TIMESTEP == mg.MAX_TIMESTEP
+    batch.reset()
+    mg.reset()
+    for _ in range(10):
+        _, _, costs = batch.run_timestep(np.full((2, 2), 0.1))
+        _, _, mg_costs = mg.run_timestep(np.full(2, 0.1), logging=False)
+        assert np.allclose(costs[0], mg_costs)
+    with pytest.raises(ValueError, match="same timestep duration"):
+        BatchMicrogrid([mg_config, config])
+
+
+def test_batch_loops():
+    config = mg_config.copy(deep=True)
+    config.loops = 2
+    batch = BatchMicrogrid(config, n_grids=2)
+    mg = Microgrid(config)
+    assert batch.MAX_TIMESTEP == mg.MAX_TIMESTEP == 2 * batch.load.shape[1]
+    batch.reset()
+    mg.reset()
+    batch.t[:] = mg.t = mg.period - 5
+    for _ in range(10):
+        obs, _, costs = batch.run_timestep(np.full((2, 2), 0.1))
+        mg_obs, _, mg_costs = mg.run_timestep(np.full(2, 0.1), logging=False)
+        assert np.allclose(obs[0], mg_obs) and np.allclose(costs[0], mg_costs)
+    with pytest.raises(ValueError, match="same loops"):
+        BatchMicrogrid([mg_config, config])
+    config.loops = 0
+    with pytest.raises(ValueError, match="Loops must be at least 1"):
+        BatchMicrogrid(config)
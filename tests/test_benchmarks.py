@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+BENCHMARK_SCRIPT = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "benchmarks", "run_benchmarks.py"
+)
+
+
+def test_benchmarks(tmp_path):
+    output = tmp_path / "results.json"
+    subprocess.run(
+        [
+            sys.executable,
+            BENCHMARK_SCRIPT,
+            "--n-steps",
+            "10",
+            "--repeat",
+            "1",
+            "--only",
+            "microgrid_step",
+            "batch_step",
+            "construction",
+            "--output",
+            str(output),
+        ],
+        check=True,
+    )
+    results = json.loads(output.read_text())
+    assert set(results["benchmarks"]) == {
+        "microgrid_step",
+        "batch_step",
+        "construction",
+    }
+    assert results["benchmarks"]["microgrid_step"]["steps_per_s"] > 0
@@ -0,0 +1,121 @@
+import os
+import shutil
+from operator import itemgetter
+
+import numpy as np
+
+from easygrid.cache import ResultCache, get_key
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.data.data_utils import share_config
+from easygrid.data.shared import cleanup
+from easygrid.sweep import run_sweep
+
+
+def test_get_key(tmp_path):
+    key = get_key(mg_config, "optimal")
+    assert key == get_key(mg_config.copy(deep=True), "optimal")
+    assert key != get_key(mg_config, "idle")
+    config = mg_config.copy(deep=True)
+    config.pv.production_factor = 2
+    assert key != get_key(config, "optimal")
+    # keys depend on the data, not on where it is stored
+    config = mg_config.copy(deep=True)
+    config.load.load_ts = str(tmp_path / "load.csv")
+    shutil.copy(mg_config.load.load_ts, config.load.load_ts)
+    assert key == get_key(config, "optimal")
+    shared = share_config(mg_config)
+    try:
+        assert key == get_key(shared, "optimal")
+    finally:
+        cleanup()
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.get("a") is None
+    logs = {"costs": {"total": np.arange(3.0)}, "energies": {"grid": np.ones(3)}}
+    cache.put("a", {"total_cost": 3.0}, logs)
+    assert cache.get("a") == {"total_cost": 3.0}
+    cached_logs = cache.get_logs("a")
+    np.testing.assert_array_equal(cached_logs["costs"]["total"], np.arange(3.0))
+    assert cache.get_logs("b") is None
+
+    disabled = ResultCache(str(tmp_path), enabled=False)
+    assert disabled.get("a") is None and disabled.get_logs("a") is None
+    disabled.put("b", {})
+    assert ResultCache(str(tmp_path)).get("b") is None
+
+    cache.clear()
+    assert cache.size() == 0
+
+
+def test_result_cache_eviction(tmp_path):
+    cache = ResultCache(str(tmp_path), max_size=None)
+    for key in "abc":
+        cache.put(key, {"data": "x" * 100})
+    entry_size = cache.size() // 3
+    assert cache.evict() == []  # no maximum size
+    cache.get("a")  # a is now more recently used than b
+    cache.max_size = 2 * entry_size
+    assert cache.evict() == ["b"]
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_result_cache_size(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_size=10**6)
+    scans = []
+    entries = cache._entries
+    monkeypatch.setattr(cache, "_entries", lambda: scans.append(1) or entries())
+    for key in "abcde":
+        cache.put(key, {"data": "x" * 100})
+    # the directory is only scanned to count the initial size
+    assert len(scans) == 1
+    size = cache.size()
+    assert cache._size == size
+    cache.put("a", {"data": "y" * 100})
+    assert cache._size == size
+
+    # the results are removed by another process during the eviction
+    remove = os.remove
+
+    def concurrent_remove(path):
+        remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os, "remove", concurrent_remove)
+    cache.max_size = 1
+    cache.put("f", {})
+    assert cache.size() == cache._size == 0
+    assert not any(cache.get(key) for key in "abcdef")
+
+
+def test_sweep_cache(tmp_path):
+    config = mg_config.copy(deep=True)
+    config.episode_length = 24
+    cache = ResultCache(str(tmp_path / "cache"))
+    param_grid = {"battery_duration": [2, 4]}
+    first = run_sweep(
+        param_grid, str(tmp_path / "a.csv"), config, "idle", 1, cache=cache
+    )
+    second = run_sweep(
+        param_grid, str(tmp_path / "b.csv"), config, "idle", 1, cache=cache
+    )
+    assert not any(row["cached"] for row in first)
+    cache_size = cache.size() // 2
+    assert all(row["cached"] for row in second)
+    key = itemgetter("battery_duration")
+    for row, cached_row in zip(sorted(first, key=key), sorted(second, key=key)):
+        assert row["total_cost"] == cached_row["total_cost"]
+
+    # the results written by all the workers fit the maximum size
+    cache.clear()
+    cache.max_size = 3 * cache_size // 2
+    run_sweep(
+        {"battery_duration": [1, 2, 3, 4]},
+        str(tmp_path / "c.csv"),
+        config,
+        "idle",
+        2,
+        cache=cache,
+    )
+    assert cache.size() == cache._size <= cache.max_size
@@ -1,8 +1,19 @@
 import os
 
+import numpy as np
 import pytest
 
-from easygrid.data.data_utils import DATA_FOLDER, get_indexes, load_data
+from easygrid.data.data_utils import (
+    DATA_FOLDER,
+    get_cache_file,
+    get_cache_folder,
+    get_indexes,
+    get_n_steps,
+    load_data,
+    read_csv,
+    read_csv_legacy,
+    resample,
+)
 
 
 def test_data_utils():
@@ -11,3 +22,87 @@ def test_data_utils():
     INDEXES = get_indexes(DATA_FOLDER)
     assert ("pv" in INDEXES.keys()) and ("load" in INDEXES.keys())
     assert len(load_data(INDEXES["pv"][0])) > 0
+
+
+def test_load_data_cache(tmp_path):
+    csv_file = tmp_path / "data.csv"
+    cache_folder = str(tmp_path / "cache")
+    np.savetxt(csv_file, np.arange(10), header="value", comments="")
+    data = load_data(csv_file, cache_folder=cache_folder)
+    assert isinstance(data, np.memmap)
+    assert np.array_equal(data, np.arange(10))
+    assert os.path.exists(get_cache_file(csv_file, cache_folder))
+    assert np.array_equal(load_data(csv_file, cache_folder=cache_folder), data)
+    assert not isinstance(load_data(csv_file, cache=False), np.memmap)
+
+    # modified files are parsed again, and the stale cache files removed
+    stale_file = get_cache_file(csv_file, cache_folder)
+    load_data(csv_file, cache_folder=cache_folder, delta_t=2)
+    np.savetxt(csv_file, np.arange(20), header="value", comments="")
+    os.utime(csv_file, ns=(0, 0))
+    assert np.array_equal(load_data(csv_file, cache_folder=cache_folder), np.arange(20))
+    assert os.listdir(cache_folder) == [
+        os.path.basename(get_cache_file(csv_file, cache_folder))
+    ]
+    assert not os.path.exists(stale_file)
+
+    # unwritable cache folder falls back to the parsed data
+    blocked = tmp_path / "blocked"
+    blocked.write_text("not a folder")
+    data = load_data(csv_file, cache_folder=str(blocked))
+    assert np.array_equal(data, np.arange(20))
+
+
+def test_cache_folder(cache_folder, monkeypatch):
+    assert get_cache_folder() == cache_folder
+    csv_file = get_indexes(DATA_FOLDER)["pv"][0]
+    load_data(csv_file)
+    assert os.path.exists(get_cache_file(csv_file, cache_folder))
+    monkeypatch.delenv("EASYGRID_CACHE_DIR")
+    assert get_cache_folder().endswith(os.path.join(".cache", "easygrid"))
+
+
+def test_read_csv(tmp_path):
+    INDEXES = get_indexes(DATA_FOLDER)
+    for file in INDEXES["prices"] + INDEXES["load"]:
+        assert np.allclose(read_csv(file), read_csv_legacy(file), rtol=1e-14)
+    missing_values = tmp_path / "missing.csv"
+    missing_values.write_text("value\n1\n\n3\n")
+    assert len(read_csv(missing_values)) == 2
+    # numpy can't parse the quoted empty value, pandas reads it as nan
+    quoted_values = tmp_path / "quoted.csv"
+    quoted_values.write_text('value\n1\n""\n3\n')
+    assert np.array_equal(read_csv(quoted_values), [1, np.nan, 3], equal_nan=True)
+    two_columns = tmp_path / "two_columns.csv"
+    two_columns.write_text("a,b\n1,2\n3,4\n")
+    with pytest.raises(AssertionError):
+        read_csv(two_columns)
+
+
+def test_resample(tmp_path):
+    data = np.arange(48, dtype=np.float64)
+    assert resample(data, 1.0) is data
+    daily = resample(data, 24)
+    assert np.allclose(daily, [data[:24].mean(), data[24:].mean()])
+    # energies are conserved over complete timesteps
+    assert np.isclose(resample(data, 5).sum() * 5, data[:45].sum())
+    quarter_hourly = resample(data, 0.25)
+    assert len(quarter_hourly) == get_n_steps(48, 0.25) == 192
+    # linear between the centers of the hours, constant before the first one
+    centers = (np.arange(192) + 0.5) * 0.25
+    assert np.allclose(quarter_hourly, np.clip(centers - 0.5, 0, 47))
+    assert np.isclose(resample(quarter_hourly, 1.0, 0.25)[1:-1], data[1:-1]).all()
+    with pytest.raises(ValueError):
+        resample(data, 0)
+
+    csv_file = tmp_path / "data.csv"
+    cache_folder = str(tmp_path / "cache")
+    np.savetxt(csv_file, data, header="value", comments="")
+    cached = load_data(csv_file, cache_folder=cache_folder, delta_t=24)
+    assert isinstance(cached, np.memmap)
+    assert np.allclose(cached, daily)
+    assert os.path.exists(get_cache_file(csv_file, cache_folder, 24))
+    assert get_cache_file(csv_file, cache_folder, 24) != get_cache_file(
+        csv_file, cache_folder
+    )
+    assert np.allclose(load_data(csv_file, cache=False, delta_t=24), daily)
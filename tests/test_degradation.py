@@ -0,0 +1,105 @@
+import numpy as np
+
+from easygrid.batch import BatchMicrogrid
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.degradation import BatchDegradation, Degradation, RainflowCounter
+from easygrid.microgrid import Microgrid
+from easygrid.types import DegradationConfig
+
+
+def degradation_config(**kwargs) -> "MicrogridConfig":  # noqa: F821
+    config = mg_config.copy(deep=True)
+    config.battery.degradation = DegradationConfig(**kwargs)
+    return config
+
+
+def test_rainflow_counter():
+    counter = RainflowCounter(exponent=2.0)
+    for value in (1.0, 0.2, 0.8, 0.0):
+        assert counter.add(value) == 0
+    # the 0.2 -> 0.8 cycle is closed by the reversal at 0
+    assert np.isclose(counter.add(1.0), 0.6**2)
+    assert counter.n_cycles == 1
+    counter.reset(0.5)
+    assert counter.damage == 0 and counter.n_cycles == 0
+
+    # full cycles of a periodic signal, the first and last half cycles are \
+    # left in the residual
+    for _ in range(10):
+        counter.add(1.0)
+        counter.add(0.0)
+    assert counter.n_cycles == 8 and np.isclose(counter.damage, 8)
+    # a constant signal has no reversal
+    assert counter.add(0.0) == 0 and counter.n_cycles == 8
+
+
+def test_batch_degradation():
+    rng = np.random.default_rng(0)
+    config = DegradationConfig(cycle_life=100, throughput_fade=0.01)
+    configs = [config, None, config.copy(update={"dod_exponent": 1.0})]
+    start = np.array([0.5, 0.5, 0.2])
+    batch = BatchDegradation(configs, start)
+    degradations = [
+        Degradation(c or DegradationConfig(), s) for c, s in zip(configs, start)
+    ]
+    soc = start.copy()
+    for _ in range(500):
+        new_soc = np.clip(soc + rng.uniform(-0.3, 0.3, size=3), 0, 1)
+        health = batch.update(new_soc - soc, new_soc, np.ones(3))
+        for i, degradation in enumerate(degradations):
+            degradation.update(new_soc[i] - soc[i], new_soc[i], 1.0)
+            assert np.isclose(batch.damage[i], degradation.counter.damage)
+            assert batch.n_cycles[i] == degradation.counter.n_cycles
+        soc = new_soc
+    assert np.isclose(health[0], degradations[0].health)
+    assert np.isclose(health[2], degradations[2].health)
+    assert health[1] == 1 and health[0] < 1
+    batch.reset(np.array([True, False, False]), start)
+    assert batch.health[0] == 1 and batch.n_cycles[0] == 0
+
+    # cycles of increasing depth are never closed, the stacks grow
+    batch = BatchDegradation([config], np.zeros(1))
+    soc = np.zeros(1)
+    for i in range(1, 40):
+        new_soc = np.array([(-1) ** i * i / 40])
+        batch.update(new_soc - soc, new_soc, np.ones(1))
+        soc = new_soc
+    assert batch.n_cycles[0] == 0 and batch._n_reversals[0] == 39
+
+
+def test_battery_degradation():
+    config = degradation_config(cycle_life=50)
+    mg = Microgrid(config)
+    battery = mg.battery
+    assert mg.config.battery.degradation.cycle_life == 50
+    assert battery.health == 1
+    actions = np.tile([[1.0, 0.0], [-1.0, 0.0]], (24, 1))
+    state = mg.get_state()
+    fork = mg.fork()
+    logs = mg.evaluate_actions(actions)
+    # full cycles between the low and high capacities
+    n_cycles = battery.degradation.counter.n_cycles
+    assert n_cycles >= 20
+    assert battery.health < 1 - 0.2 * n_cycles / 50 * 0.4
+    # the faded battery can't be charged up to its nominal high capacity
+    assert np.max(logs["energies"]["stored"][-2:]) < 0.99 * battery.high_capacity
+    assert fork.battery.health == 1
+    for action in actions:
+        fork.run_timestep(action)
+    assert fork.battery.health == battery.health
+    mg.set_state(state)
+    assert mg.battery.health == 1
+    mg.reset()
+    assert battery.health == 1
+
+    # the batched engine follows the same degradation
+    batch = BatchMicrogrid([config, mg_config])
+    batch.reset()
+    mg = Microgrid(config)
+    mg.reset()
+    for action in actions:
+        batch.run_timestep(np.stack([action, action]))
+        mg.run_timestep(action, logging=False)
+        assert np.isclose(batch.energy[0], mg.battery.energy)
+    assert np.isclose(batch.degradation.health[0], mg.battery.health)
+    assert batch.degradation.health[1] == 1
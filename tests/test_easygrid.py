@@ -1,7 +1,9 @@
+import numpy as np
 import pytest
 
 from easygrid.config.pymgrid_config import mg_config
-from easygrid.env import GridEnv
+from easygrid.data.data_utils import DATA_FOLDER, get_indexes, load_data
+from easygrid.env import GridEnv, VectorGridEnv
 from easygrid.types import MicrogridConfig
 
 
@@ -21,3 +23,61 @@ def test_env():
         obs, reward, done, _ = env.step(env.action_space.sample())
         i += 1
     assert i == env.microgrid.__len__ - 1
+
+
+def test_vector_env():
+    num_envs = 3
+    env = VectorGridEnv(mg_config, num_envs=num_envs)
+    obs = env.reset()
+    assert obs.shape == (num_envs, 5)
+    assert env.action_space.shape == (num_envs, 2)
+    assert env.observation_space.shape == (num_envs, 5)
+    obs, rewards, dones, infos = env.step(env.action_space.sample())
+    assert obs.shape == (num_envs, 5) and rewards.shape == (num_envs,)
+    assert len(infos) == num_envs and not dones.any()
+    # the empty infos are not rebuilt at each step
+    assert env.step(env.action_space.sample())[3] is infos
+
+    # auto-reset
+    env.microgrids.t[0] = env.microgrids.MAX_TIMESTEP - 3
+    obs, rewards, dones, infos = env.step(env.action_space.sample())
+    assert list(dones) == [True, False, False]
+    assert "terminal_observation" in infos[0]
+    assert infos[1] == {} and infos is not env._empty_infos
+    assert env.microgrids.t[0] == 0 and env.microgrids.t[1] == 3
+
+    # seeded resets
+    obs = env.reset_wait(seed=0)
+    np.testing.assert_array_equal(env.reset_wait(seed=0), obs)
+
+
+def test_vector_env_profiles():
+    env = VectorGridEnv.from_profiles(mg_config, num_envs=6)
+    loads = env.microgrids.load
+    assert not np.allclose(loads[0], loads[1])
+    assert np.allclose(loads[0], loads[5])
+    # the given profiles are not reordered
+    profiles = sorted(get_indexes(DATA_FOLDER)["load"], reverse=True)
+    env = VectorGridEnv.from_profiles(mg_config, 2, load_profiles=profiles)
+    for load, profile in zip(env.microgrids.load, profiles):
+        assert np.allclose(load, load_data(profile) * mg_config.load.load_factor)
+    with pytest.raises(NotImplementedError):
+        env.render()
+    env = VectorGridEnv([mg_config.dict(), mg_config.dict()])
+    assert env.num_envs == 2
+    env.close()
+    assert env.closed
+
+
+def test_env_seed():
+    config = mg_config.copy(deep=True)
+    config.episode_length = 24
+    config.start_sampler = "uniform"
+    env = GridEnv(config)
+    env.seed(0)
+    first = env.reset()
+    env.seed(0)
+    assert np.array_equal(env.reset(), first)
+    vector_env = VectorGridEnv(config, num_envs=2)
+    vector_env.seed([0, 1])
+    assert vector_env.reset().shape == (2, 5)
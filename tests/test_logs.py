@@ -0,0 +1,153 @@
+import sys
+
+import numpy as np
+import pytest
+
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.logs import (
+    CsvLogSink,
+    LogBuffer,
+    LogSink,
+    NpzLogSink,
+    ParquetLogSink,
+    read_logs,
+)
+from easygrid.microgrid import Microgrid
+
+
+def test_log_buffer_growth():
+    buffer = LogBuffer(["a", "b"], size=2)
+    for i in range(5):
+        buffer.append(0, (i, 2 * i))
+    buffer.extend(1, {"a": np.arange(5, 10), "b": 2 * np.arange(5, 10)})
+    assert len(buffer) == 10
+    assert np.array_equal(buffer["a"], np.arange(10))
+    assert np.array_equal(buffer["b"], 2 * np.arange(10))
+    assert np.array_equal(buffer.episodes, [0] * 5 + [1] * 5)
+    assert buffer["a"].base is not None  # view
+    buffer.clear()
+    assert len(buffer) == 0
+
+
+def test_log_buffer_episodes():
+    buffer = LogBuffer(["a"], size=2, max_episodes=2)
+    for episode in range(10):
+        for i in range(3):
+            buffer.append(episode, (10 * episode + i,))
+        first = max(0, episode - 1)
+        expected = [10 * e + i for e in range(first, episode + 1) for i in range(3)]
+        assert np.array_equal(buffer["a"], expected)
+        assert set(buffer.episodes) == {first, episode}
+    buffer.extend(10, {"a": np.arange(100, 150)})
+    assert np.array_equal(buffer.to_dict()["a"], [90, 91, 92, *range(100, 150)])
+    assert np.array_equal(buffer.episodes, [9] * 3 + [10] * 50)
+    assert buffer.last_episode == 10
+    removed, rows = buffer.get_last_episode()
+    assert removed == 0 and np.array_equal(rows["a"], np.arange(100, 150))
+    # the cleared rows of the last episode are counted
+    buffer.clear()
+    buffer.append(10, (150,))
+    removed, rows = buffer.get_last_episode()
+    assert removed == 50 and np.array_equal(rows["a"], [150])
+    buffer.append(11, (0,))
+    assert buffer.get_last_episode()[0] == 0
+    with pytest.raises(ValueError, match="At least one episode"):
+        LogBuffer(["a"], size=2, max_episodes=0)
+
+
+def test_microgrid_log_episodes():
+    mg = Microgrid(mg_config, max_logged_episodes=1)
+    # nothing was logged, the episode index is not used
+    mg.reset()
+    assert mg.episode == 0
+    for _ in range(2):
+        for _ in range(3):
+            mg.run_timestep(np.zeros(2))
+        mg.reset()
+    assert mg.episode == 2
+    assert len(mg.costs["total"]) == 3
+    assert set(mg.costs_log.episodes) == {1}
+    mg.evaluate_actions(np.zeros((mg.MAX_TIMESTEP - 2, 2)))
+    assert len(mg.energies["pv"]) == mg.MAX_TIMESTEP - 2
+    assert set(mg.energies_log.episodes) == {2}
+
+
+@pytest.mark.parametrize("sink_class", [NpzLogSink, CsvLogSink])
+def test_log_sink(tmp_path, sink_class):
+    sink = sink_class(str(tmp_path), chunk_size=100)
+    mg = Microgrid(mg_config, log_sink=sink)
+    reference = Microgrid(mg_config)
+    actions = np.random.uniform(-1, 1, size=(250, 2))
+    for action in actions[:150]:
+        mg.run_timestep(action)
+        reference.run_timestep(action)
+    assert len(mg.costs["total"]) == 50
+    mg.reset()
+    reference.reset()
+    mg.evaluate_actions(actions[150:])
+    reference.evaluate_actions(actions[150:])
+    mg.close()
+    assert len(mg.costs["total"]) == 0
+
+    logs = read_logs(str(tmp_path))
+    for log_type, log in reference.get_logs().items():
+        assert list(logs[log_type]) == list(log)
+        assert len(logs[log_type]) == len(log)
+        for name, values in log.items():
+            assert np.allclose(logs[log_type][name], values)
+    assert np.array_equal(logs["costs"].episodes, reference.costs_log.episodes)
+
+
+def test_parquet_sink(tmp_path):
+    pytest.importorskip("pyarrow")
+    sink = ParquetLogSink(str(tmp_path), chunk_size=10)
+    buffer = LogBuffer(["a"], 10, sink=sink, name="costs")
+    buffer.extend(0, {"a": np.arange(25)})
+    buffer.flush()
+    sink.close()
+    logs = read_logs(str(tmp_path))
+    assert np.array_equal(logs["costs"]["a"], np.arange(25))
+    assert np.array_equal(logs["costs"].episodes, np.zeros(25))
+
+
+def test_parquet_sink_missing(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    with pytest.raises(ImportError, match="requires pyarrow"):
+        ParquetLogSink(str(tmp_path))
+
+
+def test_log_sink_errors(tmp_path):
+    class FailingSink(NpzLogSink):
+        def write(self, file_name, episodes, columns):
+            if file_name.endswith("000001.npz"):
+                raise OSError("disk full")
+            super().write(file_name, episodes, columns)
+
+    with pytest.raises(TypeError):
+        LogSink(str(tmp_path))  # pylint: disable=abstract-class-instantiated
+    sink = FailingSink(str(tmp_path), chunk_size=10, max_pending=1)
+    buffer = LogBuffer(["a"], 10, sink=sink, name="costs")
+    for _ in range(2):
+        buffer.extend(0, {"a": np.arange(10)})
+    # the error of a chunk is raised when waiting for it
+    with pytest.raises(OSError, match="disk full"):
+        buffer.extend(0, {"a": np.arange(10)})
+    sink.close()
+    assert np.array_equal(read_logs(str(tmp_path))["costs"]["a"], np.arange(10))
+
+
+def test_reset_logs_sink(tmp_path):
+    sink = NpzLogSink(str(tmp_path), chunk_size=100)
+    mg = Microgrid(mg_config, log_sink=sink)
+    for _ in range(10):
+        mg.run_timestep(np.zeros(2))
+    mg.reset(reset_logs=True)
+    assert len(mg.costs["total"]) == 0
+    # the rows in memory were written before being dropped
+    assert len(read_logs(str(tmp_path))["costs"]["total"]) == 10
+    mg.close()
+    # without sink, closing keeps the logs in memory
+    mg = Microgrid(mg_config)
+    mg.run_timestep(np.zeros(2))
+    mg.close()
+    assert len(mg.costs["total"]) == 1
@@ -15,7 +15,16 @@ from easygrid.config.pymgrid_config import (
     mg_config,
     pv_config,
 )
-from easygrid.microgrid import Battery, Grid, Load, Microgrid, Photovoltaic
+from easygrid.logs import NpzLogSink
+from easygrid.microgrid import (
+    Battery,
+    ConfigAttribute,
+    Grid,
+    Load,
+    Microgrid,
+    Photovoltaic,
+    check_invariants,
+)
 from easygrid.types import GridConfig, LoadConfig, PvConfig
 
 battery = 1000
@@ -80,12 +89,19 @@ def test_microgrid():
     mg.get_error_cost(-1000)  # test error cost computation for negative energy
     mg.get_error_cost(1000)  # test error cost computation for positive energy
     mg.log_energies(1, 1, 1, 1)  # test auto balance computation
+    mg.log_energies(1, 1, 1, 1, balance=0, stored=2)
+    assert mg.energies["stored"][-2:].tolist() == [mg.battery.energy, 2]
     figs = mg.show_logs(show=False)
     assert figs is not None
     assert mg.config is not None
     duration = 10
     mg.set_battery_from_duration(duration)
     assert mg.battery.capacity == mg.load.__mean__ * duration
+    mg.set_battery_from_duration(duration / 2)
+    assert mg.battery.high_capacity / mg.battery.capacity == pytest.approx(
+        mg_config.battery.high_capacity / mg_config.battery.capacity
+    )
+    mg.set_battery_from_duration(duration)
     mg.reset()
     assert mg.t == 0
     mg.reset(reset_logs=True)
@@ -105,7 +121,8 @@ def test_microgrid():
 
 
 def test_battery():
-    battery = Battery(battery_config)
+    assert not Battery(battery_config).debug
+    battery = Battery(battery_config, debug=True)
     battery.charge_discharge(1000)
     battery.charge_discharge(-1000)
     assert (
@@ -132,6 +149,22 @@ def test_battery():
     assert battery.config is not None
 
 
+def test_set_battery_from_duration():
+    mg = Microgrid(mg_config)
+    capacity = mg_config.battery.capacity
+    for duration in (0.5, 8):
+        mg.set_battery_from_duration(duration)
+        battery = mg.battery
+        assert battery.capacity == pytest.approx(mg.load.__mean__ * duration)
+        # the thresholds and initial energy keep their state of charge
+        for name in ("low_capacity", "high_capacity", "initial_energy"):
+            expected = getattr(mg_config.battery, name) / capacity
+            assert getattr(battery, name) / battery.capacity == pytest.approx(expected)
+        assert battery.low_capacity <= battery.energy <= battery.high_capacity
+        mg.evaluate_actions(np.ones((24, 2)))
+        assert np.max(mg.energies["stored"]) <= battery.high_capacity + 1e-9
+
+
 def test_grid():
     grid = Grid(grid_config)
     assert grid.get_cost(energy=1e3, t=np.random.randint(grid.__len__)) >= 0
@@ -157,6 +190,12 @@ def test_grid():
     os.remove(faulty_import)
     os.remove(faulty_export)
     assert grid.config is not None
+    grid.import_price_factor = 2.0
+    grid.export_price_factor = 3.0
+    assert np.allclose(grid.import_prices, grid.import_prices_ * 2.0)
+    assert np.allclose(grid.export_prices, grid.export_prices_ * 3.0)
+    assert grid.get_import_price(1) == grid.import_prices_[1] * 2.0
+    assert grid.get_export_price(1) == grid.export_prices_[1] * 3.0
 
 
 def test_pv():
@@ -164,9 +203,273 @@ def test_pv():
     pv.get_power(np.random.randint(pv.__len__))
     assert pv.config is not None
     assert pv.__mean__ > 0
+    mean = pv.__mean__
+    pv.production_factor = 2.0
+    assert np.allclose(pv.pv_production_ts, pv.pv_production_ts_ * 2.0)
+    assert np.isclose(pv.__mean__, 2 * mean)
 
 
 def test_load():
     load = Load(load_config)
     load.get_load(np.random.randint(load.__len__))
     assert load.config is not None
+    max_load = load.__max__
+    load.load_factor = 0.5
+    assert np.allclose(load.load_ts, load.load_ts_ * 0.5)
+    assert load.__max__ == 0.5 * max_load
+    assert load.get_load(1) == load.load_ts_[1] * 0.5
+
+
+def test_evaluate_actions():
+    mg = Microgrid(mg_config)
+    reference = Microgrid(mg_config)
+    n_steps = 200
+    actions = np.random.uniform(-1, 1, size=(n_steps, 2))
+    logs = mg.evaluate_actions(actions)
+    for step_action in actions:
+        reference.run_timestep(step_action)
+    assert mg.t == reference.t
+    assert np.isclose(mg.battery.energy, reference.battery.energy)
+    for log_type, log in reference.get_logs().items():
+        for name, values in log.items():
+            assert np.allclose(logs[log_type][name], values)
+            assert np.allclose(mg.get_logs()[log_type][name], values)
+    mg.evaluate_actions(actions[:10], logging=False)
+    assert len(mg.costs["total"]) == n_steps
+    with pytest.raises(ValueError):
+        mg.evaluate_actions(np.zeros((MAX_TIMESTEP, 2)))
+
+
+def test_state_and_fork():
+    mg = Microgrid(mg_config)
+    actions = np.random.uniform(-1, 1, size=(20, 2))
+    for step_action in actions[:10]:
+        mg.run_timestep(step_action)
+    state = mg.get_state()
+
+    forked = mg.fork()
+    assert forked.load.load_ts is mg.load.load_ts
+    assert forked.grid.import_prices is mg.grid.import_prices
+    assert len(forked.costs["total"]) == 0
+    forked_results = [forked.run_timestep(step_action) for step_action in actions[10:]]
+    assert mg.t == 10 and forked.t == 20
+    assert len(mg.costs["total"]) == 10
+
+    results = [mg.run_timestep(step_action) for step_action in actions[10:]]
+    for (obs, done, costs), (f_obs, f_done, f_costs) in zip(results, forked_results):
+        assert np.array_equal(obs, f_obs) and done == f_done and costs == f_costs
+
+    mg.set_state(state)
+    assert mg.t == 10
+    assert np.array_equal(mg.run_timestep(actions[10])[0], results[0][0])
+
+    forked.load.load_factor = 2.0
+    assert not np.array_equal(forked.load.load_ts, mg.load.load_ts)
+
+
+def test_episode_windows():
+    config = mg_config.copy(deep=True)
+    config.episode_length = 168
+    config.start_sampler = "daily"
+    config.seed = 0
+    mg = Microgrid(config)
+    load_ts = mg.load.load_ts
+    starts = set()
+    for _ in range(5):
+        mg.reset()
+        assert mg.t == mg.start and mg.start % 24 == 0
+        assert 0 <= mg.start <= MAX_TIMESTEP - 2 - 168
+        starts.add(mg.start)
+        n_steps = 0
+        done = False
+        while not done:
+            _, done, _ = mg.run_timestep(np.zeros(2))
+            n_steps += 1
+        assert n_steps == 168
+    assert len(starts) > 1
+    assert mg.load.load_ts is load_ts
+
+    mg.reset()
+    state = mg.get_state()
+    start = mg.start
+    mg.evaluate_actions(np.zeros((168, 2)))
+    with pytest.raises(ValueError):
+        mg.evaluate_actions(np.zeros((1, 2)))
+    mg.reset()
+    next_start = mg.start
+    mg.set_state(state)
+    assert mg.start == start
+    mg.reset()
+    assert mg.start == next_start  # rng state restored
+    assert mg.config.start_sampler == "daily"
+
+    config.start_sampler = "uniform"
+    mg = Microgrid(config)
+    mg.seed(1)
+    starts = set()
+    for _ in range(10):
+        mg.reset()
+        starts.add(mg.start)
+    assert len(starts) > 1
+
+    config.episode_length = MAX_TIMESTEP
+    with pytest.raises(ValueError):
+        Microgrid(config)
+
+
+def test_config_snapshots():
+    mg = Microgrid(mg_config)
+    config = mg.config
+    assert mg.config is config
+    assert config == mg_config
+    with pytest.raises(TypeError):
+        config.battery.capacity = 1
+    # copies of the snapshot can be modified
+    modified = config.copy(deep=True)
+    modified.battery.capacity = 1
+    assert mg.config.battery.capacity == mg_config.battery.capacity
+
+    mg.set_battery_from_duration(2)
+    assert mg.config is not config
+    assert mg.config.battery.capacity == mg.battery.capacity
+    grid_config = mg.grid.config
+    mg.grid.import_price_factor = 2
+    assert mg.grid.config is not grid_config
+    assert mg.config.grid.import_price_factor == 2
+    mg.overproduction_penalty = 3
+    assert mg.config.overprod_penalty == 3
+    mg.seed(4)
+    assert mg.config.seed == 4
+
+    load_config = mg_config.load.copy()
+    load_config.load_factor = 2
+    assert Load(load_config).config.load_factor == 2
+
+
+def test_component_slots():
+    mg = Microgrid(mg_config)
+    for component in (mg.battery, mg.grid, mg.pv, mg.load):
+        assert not hasattr(component, "__dict__")
+        copied = copy.copy(component)
+        assert copied.config == component.config
+    with pytest.raises(AttributeError):
+        mg.battery.unknown_attribute = 1
+    # the config attributes are descriptors of the component classes
+    assert isinstance(Battery.capacity, ConfigAttribute)
+
+
+def test_debug_mode():
+    config = mg_config.copy(deep=True)
+    config.episode_length = 24
+    fast = Microgrid(config)
+    assert not fast.battery.debug
+    fast.battery._energy = -1.0
+    assert fast.battery.energy == -1.0  # no check on the fast path
+    debug = Microgrid(config, debug=True)
+    debug.battery._energy = -1.0
+    with pytest.raises(ValueError):
+        debug.battery.energy
+
+    # a valid episode passes the end of episode check
+    microgrid = Microgrid(config)
+    microgrid.evaluate_actions(np.random.default_rng(0).uniform(-1, 1, (24, 2)))
+    energies = microgrid.get_logs()["energies"]
+    assert len(energies["stored"]) == 24
+    assert np.all(energies["stored"] >= microgrid.battery.low_capacity)
+    assert check_invariants(energies, microgrid.battery.capacity) is None
+
+    # the first violating timestep is reported
+    microgrid.reset()
+    start = microgrid.start
+    for _ in range(4):
+        microgrid.run_timestep(np.zeros(2))
+    battery = microgrid.battery
+    battery._energy = battery.capacity + 100 * battery.max_output
+    for _ in range(2):
+        microgrid.run_timestep(np.array([-1, 0]))
+    with pytest.raises(ValueError, match=f"timestep {start + 5} "):
+        microgrid.check_logs()
+    with pytest.raises(ValueError, match=f"timestep {start + 5} "):
+        for _ in range(18):
+            microgrid.run_timestep(np.array([-1, 0]))
+
+
+def test_check_logs_episode(tmp_path):
+    config = mg_config.copy(deep=True)
+    config.episode_length = 24
+    sink = NpzLogSink(str(tmp_path), chunk_size=3)
+    microgrid = Microgrid(config, log_sink=sink)
+    battery = microgrid.battery
+    # the invalid rows of a previous episode are not checked again
+    battery._energy = battery.capacity + 100 * battery.max_output
+    microgrid.run_timestep(np.array([-1, 0]))
+    microgrid.reset()
+    microgrid.check_logs()
+    # the rows flushed to the sink are counted in the reported timestep
+    start = microgrid.start
+    for _ in range(3):
+        microgrid.run_timestep(np.zeros(2))
+    assert len(microgrid.energies_log) == 1
+    battery._energy = battery.capacity + 100 * battery.max_output
+    microgrid.run_timestep(np.array([-1, 0]))
+    with pytest.raises(ValueError, match=f"timestep {start + 4} "):
+        microgrid.check_logs()
+    microgrid.close()
+
+
+def test_resolution():
+    hourly = Microgrid(mg_config)
+    for delta_t in (0.25, 24):
+        config = mg_config.copy(deep=True)
+        config.delta_t = delta_t
+        mg = Microgrid(config)
+        assert mg.MAX_TIMESTEP == MAX_TIMESTEP / delta_t
+        assert mg.config.delta_t == delta_t
+        # the energies of the timeseries don't depend on the resolution
+        for series, reference in (
+            (mg.load.load_ts, hourly.load.load_ts),
+            (mg.pv.pv_production_ts, hourly.pv.pv_production_ts),
+        ):
+            assert np.isclose(np.sum(series) * delta_t, np.sum(reference), rtol=1e-3)
+        logs = mg.evaluate_actions(np.zeros((mg.MAX_TIMESTEP - 2, 2)))
+        timesteps = np.arange(1, mg.MAX_TIMESTEP - 1)
+        energies = logs["energies"]
+        assert np.allclose(energies["load"], mg.load.load_ts[timesteps] * delta_t)
+        assert np.allclose(energies["pv"], mg.pv.pv_production_ts[timesteps] * delta_t)
+        assert mg.max_actions[1] == np.float32(
+            mg.battery.capacity + mg.load.__max__ * delta_t
+        )
+
+
+def test_loops():
+    config = mg_config.copy(deep=True)
+    config.loops = 3
+    config.observation.horizon = 24
+    mg = Microgrid(config)
+    reference = Microgrid(config)
+    assert mg.MAX_TIMESTEP == 3 * MAX_TIMESTEP and mg.period == MAX_TIMESTEP
+    assert mg.config.loops == 3
+    # the timeseries and features are never tiled
+    assert len(mg.load.load_ts) == MAX_TIMESTEP
+    assert len(mg.observation.features) == MAX_TIMESTEP + 23
+    # the third year, and across the end of the first year
+    mg._set_start(2 * MAX_TIMESTEP + 100)
+    reference._set_start(100)
+    actions = np.random.default_rng(0).uniform(-1, 1, size=(50, 2))
+    for action in actions:
+        obs, _, costs = mg.run_timestep(action, logging=False)
+        reference_obs, _, reference_costs = reference.run_timestep(action, False)
+        assert np.allclose(obs, reference_obs)
+        assert np.allclose(costs, reference_costs)
+    mg._set_start(MAX_TIMESTEP - 24)
+    mg.battery.reset()
+    assert np.allclose(mg.forecast[-1], mg.observation.features[0])
+    state = mg.get_state()
+    logs = mg.evaluate_actions(actions)
+    mg.set_state(state)
+    for i, action in enumerate(actions):
+        _, _, costs = mg.run_timestep(action, logging=False)
+        assert np.isclose(sum(costs), logs["costs"]["total"][i])
+    config.loops = 0
+    with pytest.raises(ValueError):
+        Microgrid(config)
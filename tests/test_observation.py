@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from easygrid.batch import BatchMicrogrid
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.env import GridEnv
+from easygrid.microgrid import Microgrid
+from easygrid.observation import ObservationBuilder
+
+
+def forecast_config(horizon, calendar_features):
+    config = mg_config.copy(deep=True)
+    config.observation.horizon = horizon
+    config.observation.calendar_features = calendar_features
+    return config
+
+
+def test_default_observation():
+    mg = Microgrid(mg_config)
+    mg.run_timestep(np.zeros(2))
+    expected = [
+        mg.battery.state_of_charge,
+        mg.grid.import_prices[2],
+        mg.grid.export_prices[2],
+        mg.load.load_ts[2],
+        mg.pv.pv_production_ts[2],
+    ]
+    assert np.array_equal(mg.obs, np.array(expected, dtype=np.float32))
+    assert mg.max_values.shape == mg.min_values.shape == (5,)
+    assert mg.max_values[0] == 1.0
+
+
+def test_forecast_window():
+    horizon = 48
+    mg = Microgrid(forecast_config(horizon, True))
+    assert mg.forecast.shape == (horizon, 6)
+    assert np.shares_memory(mg.forecast, mg.observation.features)
+    stop = 1 + horizon
+    assert np.allclose(mg.forecast[:, 2], mg.load.load_ts[1:stop])
+    assert np.array_equal(mg.forecast[:, 4], np.arange(1, 1 + horizon) % 24)
+    assert mg.obs.shape == (1 + horizon * 6,)
+    mg.t = mg.MAX_TIMESTEP - 2  # last window is padded
+    assert mg.forecast.shape == (horizon, 6)
+    assert np.all(mg.forecast[:, 2] == np.float32(mg.load.load_ts[-1]))
+
+    # timeseries changes are taken into account
+    mg.t = 0
+    mg.load.load_factor = 2.0
+    assert np.allclose(mg.forecast[:, 2], mg.load.load_ts[1:stop])
+
+    # the zero-copy window is returned to callers that don't keep the observation
+    obs = mg.run_timestep(np.zeros(2), observe=False)[0]
+    assert obs.shape == (horizon, 6) and np.shares_memory(obs, mg.forecast)
+
+    env = GridEnv(forecast_config(horizon, True))
+    assert env.observation_space.shape == (1 + horizon * 6,)
+    assert env.observation_space.contains(env.reset())
+    with pytest.raises(ValueError):
+        ObservationBuilder(mg, horizon=0)
+
+
+def test_batch_forecast():
+    config = forecast_config(4, False)
+    batch = BatchMicrogrid(config, n_grids=2)
+    mg = Microgrid(config)
+    assert np.array_equal(batch.reset()[0], mg.reset())
+    actions = np.random.uniform(-1, 1, size=(2, 2))
+    obs, _, _ = batch.run_timestep(actions)
+    assert np.allclose(obs[0], mg.run_timestep(actions[0])[0])
+    with pytest.raises(ValueError):
+        BatchMicrogrid([config, mg_config])
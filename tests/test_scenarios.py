@@ -0,0 +1,223 @@
+import numpy as np
+import pytest
+
+from easygrid.batch import BatchMicrogrid
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.env import GridEnv, VectorGridEnv
+from easygrid.microgrid import Microgrid
+from easygrid.scenarios import ScenarioSampler, ar1_filter
+from easygrid.types import ScenarioConfig
+
+
+def scenario_config(**kwargs) -> "MicrogridConfig":  # noqa: F821
+    config = mg_config.copy(deep=True)
+    config.scenarios = ScenarioConfig(seed=0, **kwargs)
+    return config
+
+
+def test_ar1_filter():
+    values = np.random.default_rng(0).standard_normal((3, 500))
+    expected = values.copy()
+    for t in range(1, 500):
+        expected[:, t] += 0.9 * expected[:, t - 1]
+    np.testing.assert_allclose(ar1_filter(values, 0.9), expected, atol=1e-9)
+
+
+def test_sampler():
+    base = Microgrid(mg_config)
+    series = {"load": base.load.load_ts_, "pv": base.pv.pv_production_ts_}
+    config = ScenarioConfig(
+        noise=0.1,
+        forecast_error=0.2,
+        bootstrap_window=3,
+        regime_swap_probability=0.2,
+        batch_size=4,
+        seed=0,
+    )
+    sampler = ScenarioSampler(series, config)
+    scenarios = [sampler.sample() for _ in range(4)]
+    assert sampler.buffer.shape == (4, 2, 8760)
+    for scenario in scenarios:
+        assert not scenario["load"].flags.writeable
+        assert np.all(scenario["load"] >= 0) and np.all(scenario["pv"] >= 0)
+        assert not np.allclose(scenario["load"], series["load"])
+        assert np.corrcoef(scenario["load"], series["load"])[0, 1] > 0.5
+    # seeded draws
+    other = ScenarioSampler(series, config)
+    np.testing.assert_array_equal(other.sample()["pv"], scenarios[0]["pv"])
+    with pytest.raises(ValueError):
+        ScenarioSampler(series, ScenarioConfig(forecast_error_correlation=1))
+    with pytest.raises(ValueError, match="regime swap probability"):
+        ScenarioSampler(series, ScenarioConfig(regime_swap_probability=2))
+    # the base site is not one of the other sites
+    config = ScenarioConfig(
+        regime_swap_probability=0.5, pv_sites=[mg_config.pv.pv_production_ts]
+    )
+    with pytest.raises(ValueError, match="other pv sites"):
+        ScenarioSampler(series, config)
+
+    # the noise window wraps around the end of the timeseries
+    config = ScenarioConfig(noise=0.1, batch_size=1, seed=0)
+    load = ScenarioSampler(series, config, window=48).sample(8760 - 24)["load"]
+    assert not np.allclose(load[:24], series["load"][:24])
+    assert np.array_equal(load[24:-24], series["load"][24:-24])
+    assert not np.allclose(load[-24:], series["load"][-24:])
+
+    # days are drawn from the base days within the window
+    base_days = series["load"].reshape(365, 24)
+    for same_weekday, step in ((False, 1), (True, 7)):
+        config = ScenarioConfig(
+            bootstrap_window=14, bootstrap_same_weekday=same_weekday, seed=0
+        )
+        load = ScenarioSampler(series, config).sample()["load"].reshape(365, 24)
+        assert not np.array_equal(load, base_days)
+        for day in (0, 100, 364):
+            candidates = [
+                base_days[candidate]
+                for candidate in range(day - 14, day + 15, step)
+                if 0 <= candidate < 365
+            ]
+            assert any(np.array_equal(load[day], other) for other in candidates)
+
+    # pv days are swapped with the (rescaled) days of the other sites
+    config = ScenarioConfig(series=["pv"], regime_swap_probability=1, seed=0)
+    pv = ScenarioSampler(series, config).sample()["pv"]
+    assert not np.any(np.all(pv.reshape(365, 24) == base_days, axis=1))
+    assert np.mean(pv) == pytest.approx(np.mean(series["pv"]), rel=0.1)
+
+
+def test_microgrid_scenarios():
+    config = scenario_config(noise=0.1, batch_size=2)
+    microgrid = Microgrid(config)
+    assert microgrid.config.scenarios == config.scenarios
+    base_load = microgrid.load.load_ts
+    max_load = microgrid.load.__max__
+    forked = microgrid.fork()
+    forked_obs = forked.obs
+    loads = []
+    for _ in range(3):
+        obs = microgrid.reset()
+        load = microgrid.load.load_ts
+        assert load is not base_load
+        assert microgrid.load.__max__ == max_load
+        t = microgrid.t + 1
+        assert obs[3] == pytest.approx(load[t], rel=1e-6)
+        microgrid.run_timestep(np.zeros(2))
+        assert microgrid.get_logs()["energies"]["load"][-1] == load[t]
+        loads.append(load.copy())
+    assert not np.array_equal(loads[0], loads[1])
+    # the feature matrix is not shared with forks anymore
+    np.testing.assert_array_equal(forked.obs, forked_obs)
+
+    # the scaling factors apply to the scenarios
+    microgrid.load.load_factor = 2
+    np.testing.assert_allclose(microgrid.load.load_ts, 2 * load)
+    microgrid.set_scenario()
+    assert np.array_equal(microgrid.load.load_ts, 2 * microgrid.load.load_ts_)
+    # restoring the original timeseries again doesn't rescale them
+    load = microgrid.load.load_ts
+    microgrid.set_scenario()
+    assert microgrid.load.load_ts is load
+    with pytest.raises(ValueError):
+        microgrid.set_scenario({"unknown": load})
+
+
+def test_fork_scenarios():
+    microgrid = Microgrid(scenario_config(noise=0.1, batch_size=2))
+    microgrid.reset()
+    load = microgrid.load.load_ts.copy()
+    forked = microgrid.fork()
+    assert forked.scenario_sampler is not microgrid.scenario_sampler
+    # the drawn batch and the scenario are shared, not copied
+    assert forked.scenario_sampler.buffer is microgrid.scenario_sampler.buffer
+    assert forked.load.load_ts is microgrid.load.load_ts
+    # resetting the fork draws new batches without touching the original
+    for _ in range(5):
+        forked.reset()
+    np.testing.assert_array_equal(microgrid.load.load_ts, load)
+    forked_load = forked.load.load_ts.copy()
+    for _ in range(5):
+        microgrid.reset()
+    np.testing.assert_array_equal(forked.load.load_ts, forked_load)
+    # the fork follows the same scenarios as the original
+    assert np.array_equal(forked_load, microgrid.load.load_ts)
+    # a fork drawing a new batch allocates its own buffer
+    forked = microgrid.fork()
+    buffer = microgrid.scenario_sampler.buffer.copy()
+    for _ in range(3):
+        forked.reset()
+    assert forked.scenario_sampler.buffer is not microgrid.scenario_sampler.buffer
+    np.testing.assert_array_equal(microgrid.scenario_sampler.buffer, buffer)
+    assert Microgrid(scenario_config()).scenario_sampler.current() is None
+
+    # scaled scenarios are written in a preallocated buffer, the fork's own one
+    microgrid.load.load_factor = 2
+    forked = microgrid.fork()
+    load = microgrid.load.load_ts.copy()
+    microgrid.reset()
+    buffer = microgrid.load.load_ts.base
+    microgrid.reset()
+    assert microgrid.load.load_ts.base is buffer
+    np.testing.assert_array_equal(forked.load.load_ts, load)
+
+
+def test_batch_scenarios():
+    config = scenario_config(
+        series=["load", "import_prices", "export_prices"], forecast_error=0.1
+    )
+    config.grid.import_price_factor = 2
+    batch = BatchMicrogrid(config, n_grids=3)
+    assert len({id(sampler) for sampler in batch._samplers}) == 1
+    obs = batch.reset()
+    microgrid = Microgrid(config)
+    assert not np.allclose(batch.load[0], microgrid.load.load_ts)
+    assert not np.allclose(batch.load[0], batch.load[1])
+    assert np.array_equal(batch.pv_production[0], microgrid.pv.pv_production_ts)
+    # the scaled scenario is observed
+    microgrid.set_scenario(
+        {
+            "load": batch.load[0],
+            "import_prices": batch.import_prices[0] / 2,
+            "export_prices": batch.export_prices[0],
+        }
+    )
+    microgrid._set_start(0)
+    np.testing.assert_allclose(obs[0], microgrid.obs, rtol=1e-6)
+
+
+def test_scenario_window():
+    config = scenario_config(noise=0.1, forecast_error=0.1)
+    config.episode_length = 24
+    config.start_sampler = "daily"
+    microgrid = Microgrid(config)
+    for _ in range(3):
+        microgrid.reset()
+        start, stop = microgrid.start, microgrid.end + 2
+        load, base = microgrid.load.load_ts, microgrid.load.load_ts_
+        # only the timesteps of the episode and of its observations are perturbed
+        assert not np.allclose(load[start:stop], base[start:stop])
+        np.testing.assert_array_equal(load[:start], base[:start])
+        np.testing.assert_array_equal(load[stop:], base[stop:])
+
+
+def test_observation_bounds():
+    config = scenario_config(
+        noise=0.5, forecast_error=0.5, regime_swap_probability=0.5, batch_size=4
+    )
+    config.episode_length = 24
+    env = GridEnv(config)
+    high = GridEnv(mg_config).observation_space.high
+    assert np.all(env.observation_space.high >= high)
+    outside = False
+    for _ in range(8):
+        obs, done = env.reset(), False
+        while not done:
+            assert env.observation_space.contains(obs)
+            outside = outside or np.any(obs > high)
+            obs, _, done, _ = env.step(env.action_space.sample())
+    # the scenarios exceed the bounds of the base timeseries
+    assert outside
+    env = VectorGridEnv(config, num_envs=4)
+    for _ in range(24):
+        obs, _, _, _ = env.step(env.action_space.sample())
+        assert env.observation_space.contains(obs)
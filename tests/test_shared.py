@@ -0,0 +1,78 @@
+import multiprocessing
+import warnings
+
+import numpy as np
+import pytest
+
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.data import shared
+from easygrid.data.data_utils import get_checksum, load_data, share_config
+from easygrid.microgrid import Microgrid
+
+
+def _worker_sum(name):
+    return float(shared.attach(name).sum())
+
+
+def test_publish_attach():
+    path = shared.publish("test_serie", np.arange(5))
+    try:
+        assert shared.is_shared(path)
+        data = load_data(path)
+        assert np.array_equal(data, np.arange(5))
+        assert not data.flags.writeable
+        with pytest.raises(ValueError):
+            shared.publish("test_serie", np.arange(5))
+        # workers attach zero-copy, and their exit does not destroy the segment
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1) as pool:
+            assert pool.apply(_worker_sum, (str(path),)) == 10
+        assert np.array_equal(shared.attach("test_serie"), np.arange(5))
+    finally:
+        shared.unpublish("test_serie")
+    assert "test_serie" not in shared.published()
+
+
+def test_share_config():
+    config = share_config(mg_config)
+    assert shared.is_shared(config.load.load_ts)
+    assert share_config(config) == config
+    mg = Microgrid(config)
+    reference = Microgrid(mg_config)
+    assert np.array_equal(mg.load.load_ts, reference.load.load_ts)
+    assert np.array_equal(mg.grid.import_prices, reference.grid.import_prices)
+    assert len(shared.published()) == 4
+    assert len(shared.cleanup()) == 4
+    assert shared.published() == []
+
+
+def test_attach_detach():
+    shared.publish("test_attach", np.ones(3))
+    segment = shared._PUBLISHED.pop("test_attach")
+    try:
+        # simulate a worker process attaching to the segment
+        path = shared.shared_path("test_attach")
+        assert np.array_equal(shared.attach("test_attach"), np.ones(3))
+        assert "test_attach" in shared._ATTACHED
+        assert get_checksum(path) == get_checksum(path)
+        assert shared._CHECKSUMS["test_attach"] == get_checksum(path)
+        shared.detach(str(path))
+        assert "test_attach" not in shared._ATTACHED
+        assert "test_attach" not in shared._CHECKSUMS
+        shared.attach(str(path))
+        shared.cleanup()
+        assert "test_attach" not in shared._ATTACHED
+        shared.detach("test_attach")
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+def test_leak_warning():
+    shared.publish("test_leak", np.ones(3))
+    with pytest.warns(ResourceWarning):
+        shared._cleanup_at_exit()
+    assert shared.published() == []
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        shared._cleanup_at_exit()
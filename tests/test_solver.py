@@ -0,0 +1,147 @@
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from easygrid import solver
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.env import GridEnv
+from easygrid.microgrid import Microgrid
+from easygrid.solver import MPCController, dispatch_cost, get_step_costs, solve_dispatch
+
+
+def short_microgrid(episode_length: int = 168) -> Microgrid:
+    config = mg_config.copy(deep=True)
+    config.episode_length = episode_length
+    return Microgrid(config)
+
+
+def test_solve_dispatch():
+    microgrid = short_microgrid()
+    solution = solve_dispatch(microgrid)
+    assert solution["actions"].shape == (168, 2)
+    assert np.all(np.abs(solution["actions"]) <= 1)
+    battery = microgrid.battery
+    energy = solution["battery_energy"]
+    assert np.all(energy >= battery.low_capacity - 1e-9)
+    assert np.all(energy <= battery.high_capacity + 1e-9)
+    assert np.all(np.abs(np.diff(energy)) <= battery.max_output + 1e-9)
+    assert microgrid.t == 0  # the microgrid is not modified
+
+    logs = microgrid.evaluate_actions(solution["actions"])
+    np.testing.assert_allclose(logs["energies"]["battery"], np.diff(energy))
+    assert dispatch_cost(microgrid, logs) == pytest.approx(solution["cost"])
+
+    # the optimal schedule beats doing nothing with the battery
+    idle = np.column_stack([np.zeros(168), solution["actions"][:, 1]])
+    idle[:, 1] = (
+        microgrid.load.load_ts[1:169] - microgrid.pv.pv_production_ts[1:169]
+    ) / microgrid.max_actions[1]
+    microgrid.reset()
+    idle_logs = microgrid.evaluate_actions(idle)
+    assert solution["cost"] <= dispatch_cost(microgrid, idle_logs)
+
+    with pytest.raises(ValueError):
+        solve_dispatch(microgrid, backend="unknown")
+
+
+def test_solve_dispatch_lp():
+    pytest.importorskip("scipy")
+    microgrid = short_microgrid()
+    exact = solve_dispatch(microgrid, backend="lp")
+    approximate = solve_dispatch(microgrid, n_bins=201)
+    assert exact["cost"] <= approximate["cost"] + 1e-6
+    assert approximate["cost"] == pytest.approx(exact["cost"], rel=1e-2)
+    logs = microgrid.evaluate_actions(exact["actions"])
+    assert dispatch_cost(microgrid, logs) == pytest.approx(exact["cost"])
+
+
+def test_solve_dispatch_year():
+    microgrid = Microgrid(mg_config)
+    start = time.perf_counter()
+    solution = solve_dispatch(microgrid)
+    assert time.perf_counter() - start < 10
+    assert len(solution["actions"]) == microgrid.end - microgrid.t
+
+
+def test_mpc_controller():
+    config = mg_config.copy(deep=True)
+    config.episode_length = 168
+    env = GridEnv(config)
+    controller = MPCController(env.microgrid, horizon=48, latency_budget=None)
+    obs, done = env.reset(), False
+    while not done:
+        obs, _, done, _ = env.step(controller(obs))
+    assert len(controller.solve_times) == 168
+    assert np.median(controller.solve_times) < 0.01
+    mpc_cost = dispatch_cost(env.microgrid, env.microgrid.get_logs())
+
+    # with a horizon covering the episode, MPC matches the optimal dispatch
+    microgrid = short_microgrid()
+    optimal = solve_dispatch(microgrid)["cost"]
+    controller = MPCController(microgrid, horizon=168, latency_budget=None)
+    while not microgrid.done:
+        microgrid.run_timestep(controller.act())
+    assert dispatch_cost(microgrid, microgrid.get_logs()) == pytest.approx(optimal)
+    assert optimal <= mpc_cost + 1e-6
+
+
+def test_mpc_controller_latency_budget():
+    microgrid = short_microgrid()
+    controller = MPCController(microgrid, horizon=48, latency_budget=0)
+    energy = microgrid.battery.energy
+    action = controller.act()
+    # no previous plan to follow: the battery is idle
+    assert action[0] == 0
+    assert controller.n_overruns == 1
+    assert microgrid.battery.energy == energy
+
+    controller.latency_budget = None
+    microgrid.run_timestep(controller.act())
+    plan = controller._plan
+    controller.latency_budget = 0
+    microgrid.run_timestep(controller.act())
+    assert controller.n_overruns == 2
+    assert microgrid.battery.energy == pytest.approx(plan[2])
+
+
+def test_solve_dispatch_lp_errors(monkeypatch):
+    pytest.importorskip("scipy")
+    microgrid = short_microgrid(24)
+    battery = microgrid.battery
+    # the battery can't reach its capacity range in a single timestep
+    battery._energy = battery.high_capacity + 2 * battery.max_output
+    with pytest.raises(ValueError, match="could not be solved"):
+        solve_dispatch(microgrid, backend="lp")
+    monkeypatch.setitem(sys.modules, "scipy.optimize", None)
+    with pytest.raises(ImportError, match="requires scipy"):
+        solve_dispatch(microgrid, backend="lp")
+
+
+def test_mpc_controller_warm_start(monkeypatch):
+    computed = []
+
+    def spy(microgrid, problem, energy_battery):
+        computed.append(len(problem["net_load"]))
+        return get_step_costs(microgrid, problem, energy_battery)
+
+    monkeypatch.setattr(solver, "get_step_costs", spy)
+    microgrid = short_microgrid(24)
+    controller = MPCController(microgrid, horizon=24, latency_budget=None)
+    controller.act()
+    controller.act()
+    # get_solution computes the cost of the chosen step only
+    assert computed.count(24) == 1
+    # the step costs are computed again when the penalties change
+    microgrid.overproduction_penalty += 100
+    controller.act()
+    assert computed.count(24) == 2
+
+    while not microgrid.done:
+        microgrid.run_timestep(controller.act())
+    assert np.array_equal(controller.act(), np.zeros(2))
+    controller.reset()
+    assert controller.solve_times == [] and len(controller._plan) == 0
+    with pytest.raises(ValueError, match="Horizon"):
+        MPCController(microgrid, horizon=0)
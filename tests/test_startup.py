@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+# Generous budget in seconds, to catch heavy imports rather than machine noise
+IMPORT_TIME_BUDGET = float(os.environ.get("EASYGRID_IMPORT_TIME_BUDGET", 3.0))
+
+IMPORT_SCRIPT = """
+import sys
+import time
+
+start = time.perf_counter()
+import easygrid.env
+
+print(time.perf_counter() - start)
+print(",".join(name for name in ("pandas", "matplotlib") if name in sys.modules))
+"""
+
+
+def test_import_time():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout.splitlines()
+    import_time, heavy_modules = float(output[0]), output[1]
+    assert heavy_modules == ""
+    assert import_time < IMPORT_TIME_BUDGET
@@ -0,0 +1,131 @@
+import csv
+
+import pytest
+
+from easygrid.__main__ import main
+from easygrid.cache import ResultCache
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.data.shared import published
+from easygrid.microgrid import Microgrid
+from easygrid.sweep import (
+    get_profiles,
+    get_scenario_config,
+    get_scenario_id,
+    get_scenarios,
+    run_scenario,
+    run_sweep,
+    write_row,
+)
+
+LOADS = get_profiles(["all"], "load")[:2]
+PV = get_profiles(["Houston_722430TYA.csv"], "pv")
+
+
+def short_config():
+    config = mg_config.copy(deep=True)
+    config.episode_length = 48
+    return config
+
+
+def read_rows(output):
+    with open(output, newline="", encoding="utf-8") as csv_file:
+        return list(csv.DictReader(csv_file))
+
+
+def test_get_scenarios():
+    scenarios = get_scenarios({"battery_duration": [2, 4], "load": LOADS, "pv": PV})
+    assert len(scenarios) == 4
+    assert scenarios[0] == {"battery_duration": 2, "load": LOADS[0], "pv": PV[0]}
+    with pytest.raises(ValueError):
+        get_scenarios({"unknown": [1]})
+
+
+def test_run_scenario():
+    scenario = {"battery_duration": 4, "production_factor": 2}
+    optimal = run_scenario(short_config(), scenario, "optimal")
+    idle = run_scenario(short_config(), scenario, "idle")
+    assert optimal["n_steps"] == 48
+    assert optimal["production_factor"] == 2
+    assert optimal["dispatch_cost"] <= idle["dispatch_cost"]
+    assert optimal["scenario_id"] != idle["scenario_id"]
+    daily = {"delta_t": 24}
+    assert get_scenario_config(short_config(), daily).delta_t == 24
+    assert run_scenario(short_config(), daily, "idle")["n_steps"] == 48
+    for policy in ("mpc", "random"):
+        row = run_scenario(short_config(), scenario, policy)
+        assert row["n_steps"] == 48 and not row["cached"]
+
+
+def test_run_scenario_cache(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    scenario = {"battery_duration": 4}
+    row = run_scenario(short_config(), scenario, "idle", cache, store_logs=True)
+    cached_row = run_scenario(short_config(), scenario, "idle", cache)
+    assert not row["cached"] and cached_row["cached"]
+    assert cached_row["total_cost"] == row["total_cost"]
+    assert len(cache._entries()) == 2  # summary and logs
+
+
+def test_run_sweep(tmp_path):
+    output = str(tmp_path / "sweep.csv")
+    param_grid = {"battery_duration": [2, 4], "load": LOADS, "pv": PV}
+    rows = run_sweep(param_grid, output, short_config(), "idle", max_workers=2)
+    assert len(rows) == 4
+    assert published() == []
+    assert len(read_rows(output)) == 4
+    # already evaluated scenarios are skipped
+    param_grid["battery_duration"].append(8)
+    rows = run_sweep(
+        param_grid, output, short_config(), "idle", max_workers=2, share=False
+    )
+    assert len(rows) == 2
+    saved = read_rows(output)
+    assert len(saved) == 6
+    assert len({row["scenario_id"] for row in saved}) == 6
+    assert {row["load"] for row in saved} == {path.split("/")[-1] for path in LOADS}
+    # the default cache is not used
+    assert ResultCache().size() == 0
+    with pytest.raises(ValueError, match="Unknown policy"):
+        run_sweep(param_grid, output, policy="unknown")
+    # nothing to run with the default config
+    scenario = {"battery_duration": 2}
+    write_row(output, {"scenario_id": get_scenario_id(scenario, "idle")})
+    assert run_sweep({"battery_duration": [2]}, output, policy="idle") == []
+
+
+def test_sweep_cli(tmp_path):
+    output = str(tmp_path / "sweep.csv")
+    main(
+        [
+            "sweep",
+            "--output",
+            output,
+            "--loads",
+            LOADS[0],
+            "--pvs",
+            "all",
+            "--battery-durations",
+            "2",
+            "--episode-length",
+            "24",
+            "--policy",
+            "mpc",
+            "--workers",
+            "2",
+            "--cache-dir",
+            str(tmp_path / "cache"),
+        ]
+    )
+    rows = read_rows(output)
+    assert len(rows) == 5
+    assert all(row["n_steps"] == "24" for row in rows)
+    assert len(ResultCache(str(tmp_path / "cache"))._entries()) == 5
+
+    # whole episodes of the default config, without cache
+    output = str(tmp_path / "full.csv")
+    main(
+        ["sweep", "--output", output, "--loads", LOADS[0], "--pvs", PV[0]]
+        + ["--policy", "idle", "--workers", "1"]
+    )
+    assert int(read_rows(output)[0]["n_steps"]) == Microgrid(mg_config).end
+    assert ResultCache().size() == 0
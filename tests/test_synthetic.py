@@ -0,0 +1,74 @@
+import time
+
+import numpy as np
+import pytest
+
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.data import shared
+from easygrid.data.data_utils import load_data
+from easygrid.data.synthetic import generate_pv, generate_timeseries, synthetic_configs
+from easygrid.microgrid import Microgrid
+
+
+def test_generate_timeseries():
+    # the bundled artificial prices are a pure daily seasonality
+    prices = generate_timeseries(mean=8, daily_amplitude=2, daily_peak=15)
+    np.testing.assert_allclose(prices[0], load_data(mg_config.grid.import_prices))
+
+    kwargs = dict(
+        n_scenarios=3,
+        n_steps=24 * 14,
+        mean=[1.0, 2.0, 3.0],
+        weekly_amplitude=0.5,
+        noise=0.1,
+        spike_probability=0.05,
+        spike_scale=10,
+        min_value=0,
+        seed=42,
+    )
+    series = generate_timeseries(**kwargs)
+    assert series.shape == (3, 24 * 14)
+    assert np.all(series >= 0)
+    np.testing.assert_array_equal(series, generate_timeseries(**kwargs))
+    assert not np.array_equal(series, generate_timeseries(**{**kwargs, "seed": 0}))
+    assert np.max(series) > 5  # spikes
+    np.testing.assert_allclose(np.median(series, axis=1), [1, 2, 3], atol=0.3)
+    with pytest.raises(ValueError):
+        generate_timeseries(n_scenarios=3, mean=[1.0, 2.0])
+
+    start = time.perf_counter()
+    generate_timeseries(1000, daily_amplitude=2, noise=0.5, spike_probability=0.01)
+    assert time.perf_counter() - start < 5
+
+
+def test_generate_pv():
+    pv = generate_pv(n_scenarios=2, n_steps=24 * 365, peak=[1.0, 2.0], seed=0)
+    assert pv.shape == (2, 24 * 365)
+    assert np.all(pv >= 0)
+    assert np.all(pv[:, 0] == 0)  # night
+    assert np.all(pv[1].reshape(365, 24).max(axis=1) > 0)
+    # more production in summer than in winter
+    summer, winter = slice(24 * 160, 24 * 190), slice(0, 24 * 30)
+    assert pv[0, summer].sum() > pv[0, winter].sum()
+    half_hourly = generate_pv(n_steps=48 * 365, delta_t=0.5, seed=0)
+    np.testing.assert_allclose(half_hourly[0, ::2], pv[0])
+
+
+def test_synthetic_configs():
+    prices = generate_timeseries(2, mean=[5.0, 10.0], daily_amplitude=2, seed=0)
+    configs = synthetic_configs(
+        mg_config, "test_synthetic", import_prices=prices, export_prices=prices - 5
+    )
+    try:
+        assert len(configs) == 2
+        for config, serie in zip(configs, prices):
+            assert shared.is_shared(config.grid.import_prices)
+            assert config.load == mg_config.load
+            microgrid = Microgrid(config)
+            np.testing.assert_array_equal(microgrid.grid.import_prices, serie)
+        with pytest.raises(ValueError):
+            synthetic_configs(mg_config, "test_mismatch", pv=prices, load=prices[:1])
+        with pytest.raises(ValueError, match="No timeserie"):
+            synthetic_configs(mg_config, "test_empty")
+    finally:
+        shared.cleanup()
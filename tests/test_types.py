@@ -1,7 +1,10 @@
+import pickle
+
 import pytest
 from pydantic.error_wrappers import ValidationError
 
-from easygrid.types import PvConfig
+from easygrid.config.pymgrid_config import mg_config
+from easygrid.types import MicrogridConfig, PvConfig, freeze, thaw
 
 
 def test_NDArray():
@@ -11,3 +14,18 @@ def test_NDArray():
                 "pv_production_ts": [12, 3],
             }
         )
+
+
+def test_frozen_config():
+    config = freeze(mg_config)
+    assert config == mg_config
+    assert isinstance(config, MicrogridConfig)
+    assert freeze(config) is config
+    assert thaw(mg_config) is mg_config
+    with pytest.raises(TypeError):
+        config.seed = 1
+    assert pickle.loads(pickle.dumps(config)) == config
+    mutable = thaw(config)
+    mutable.battery.capacity = 1
+    assert config.battery.capacity == mg_config.battery.capacity
+    assert MicrogridConfig.parse_obj(config).battery.copy() == mg_config.battery
@@ -1,8 +1,9 @@
 from unittest.mock import patch
 
 import matplotlib.pyplot as plt
+import numpy as np
 
-from easygrid.math_utils import get_hourly_variation
+from easygrid.math_utils import get_hourly_variation, hourly_variation
 
 
 @patch("matplotlib.pyplot.show")
@@ -11,5 +12,6 @@ def test_hourly_variation(mock_show):
         max_val=10, min_val=3, period=24, time_max=15, time_min=3, size=100
     )
     points = [i for i in gen]
+    np.testing.assert_allclose(points, hourly_variation(10, 3, 24, 15, 3, 100))
     plt.plot(points)
     plt.show()